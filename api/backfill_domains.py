@@ -0,0 +1,29 @@
+"""
+Backfill script to add email_domain to existing waitlist entries.
+Also rebuilds the per-domain count table used by admin search.
+"""
+
+import os
+import sys
+
+# Add parent directory to path to import firestore_service
+sys.path.insert(0, os.path.dirname(__file__))
+
+from firestore_service import backfill_email_domains, get_domain_counts
+
+
+def main():
+    """Backfill email_domain and per-domain counts."""
+    print("Backfilling email_domain on waitlist entries...")
+    
+    backfill_email_domains()
+    
+    domains = get_domain_counts(limit=10)
+    if domains:
+        print(f"\n  Top domains:")
+        for row in domains:
+            print(f"    - {row['domain']}: {row['count']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""
+Backfill script to add order_shard to existing waitlist entries.
+Run it before setting WAITLIST_ORDER_SHARDS_READY and deploying the sharded
+created_at indexes in firestore.indexes.json, and after changing
+WAITLIST_ORDER_SHARDS.
+"""
+
+import os
+import sys
+
+# Add parent directory to path to import firestore_service
+sys.path.insert(0, os.path.dirname(__file__))
+
+from firestore_service import backfill_order_shards, ORDER_SHARDS
+
+
+def main():
+    """Backfill order_shard on waitlist entries."""
+    print(f"Backfilling order_shard on waitlist entries ({ORDER_SHARDS} shards)...")
+    
+    backfill_order_shards()
+
+
+if __name__ == '__main__':
+    main()
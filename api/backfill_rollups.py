@@ -0,0 +1,35 @@
+"""
+Backfill script to rebuild signup rollup buckets from existing entries.
+Run this once after deploying rollups, or whenever the buckets drift.
+"""
+
+import os
+import sys
+
+# Add parent directory to path to import firestore_service
+sys.path.insert(0, os.path.dirname(__file__))
+
+from firestore_service import rebuild_signup_rollups, get_signup_rollups
+
+
+def main():
+    """Rebuild hourly and daily signup rollups."""
+    print("Rebuilding signup rollups from waitlist entries...")
+    
+    written = rebuild_signup_rollups()
+    
+    if written > 0:
+        print(f"\n✓ Backfill complete!")
+        
+        # Show the most recent daily buckets
+        days = get_signup_rollups('day')
+        if days:
+            print(f"\n  Recent days:")
+            for bucket in days[-7:]:
+                print(f"    - {bucket['bucket_start'][:10]}: {bucket['count']}")
+    else:
+        print("\n⚠ No rollup buckets written.")
+
+
+if __name__ == '__main__':
+    main()
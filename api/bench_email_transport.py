@@ -0,0 +1,180 @@
+"""
+Benchmark email transports against a local SMTP stand-in.
+Compares a fresh smtplib connection per message with SMTPPoolTransport
+(sequential, pipelined, and concurrent across the pool), and optionally the
+Gmail API path. The stand-in delays every reply by --latency-ms to model the
+network round trip to a real relay.
+
+Usage:
+    python bench_email_transport.py --messages 200 --latency-ms 20
+    python bench_email_transport.py --messages 20 --gmail-to you@example.com
+"""
+
+import time
+import smtplib
+import argparse
+import threading
+import socketserver
+from typing import Callable, List, Tuple
+
+from gmail_service import GmailAPITransport, build_mime_message
+from smtp_transport import SMTPPoolTransport
+
+
+class SMTPStandInHandler(socketserver.BaseRequestHandler):
+    """
+    Minimal SMTP server: accepts AUTH, any sender and recipient, and counts
+    delivered messages. Replies to everything received in one read together,
+    after one simulated round trip, so pipelined clients benefit as they would
+    against a real relay.
+    """
+
+    def _reply(self, replies: List[str]) -> None:
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.request.sendall(''.join(reply + '\r\n' for reply in replies).encode('ascii'))
+
+    def handle(self) -> None:
+        self._reply(['220 localhost SMTP stand-in'])
+        buffer = b''
+        in_data = False
+        while True:
+            try:
+                chunk = self.request.recv(65536)
+            except OSError:
+                return
+            if not chunk:
+                return
+            buffer += chunk
+            replies = []
+            while True:
+                if in_data:
+                    end = buffer.find(b'\r\n.\r\n')
+                    if end < 0:
+                        break
+                    buffer = buffer[end + 5:]
+                    in_data = False
+                    with self.server.lock:
+                        self.server.delivered += 1
+                    replies.append('250 OK queued')
+                    continue
+                line_end = buffer.find(b'\r\n')
+                if line_end < 0:
+                    break
+                line = buffer[:line_end].decode('ascii', 'replace')
+                buffer = buffer[line_end + 2:]
+                verb = line.split(' ', 1)[0].upper()
+                if verb in ('EHLO', 'HELO'):
+                    features = ['250-localhost', '250-AUTH PLAIN', '250-8BITMIME']
+                    if self.server.pipelining:
+                        features.append('250-PIPELINING')
+                    replies.extend(features[:-1] + ['250 ' + features[-1][4:]])
+                elif verb == 'AUTH':
+                    replies.append('235 Authentication successful')
+                elif verb == 'DATA':
+                    in_data = True
+                    replies.append('354 End data with <CR><LF>.<CR><LF>')
+                elif verb == 'QUIT':
+                    self._reply(replies + ['221 Bye'])
+                    return
+                else:
+                    replies.append('250 OK')
+            if replies:
+                self._reply(replies)
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Local SMTP stand-in bound to an ephemeral port."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency: float = 0.0, pipelining: bool = True):
+        super().__init__(('127.0.0.1', 0), SMTPStandInHandler)
+        self.latency = latency
+        self.pipelining = pipelining
+        self.delivered = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def __enter__(self) -> 'SMTPStandIn':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def connect_per_message(port: int, messages: list) -> List[bool]:
+    """Baseline: open, authenticate and quit a connection for every message."""
+    results = []
+    for message in messages:
+        with smtplib.SMTP('127.0.0.1', port) as smtp:
+            smtp.login('bench', 'bench')
+            smtp.send_message(message, from_addr='bench@localhost')
+            results.append(True)
+    return results
+
+
+def run_case(name: str, send: Callable[[list], List[bool]], messages: list) -> Tuple[str, float, int]:
+    start = time.perf_counter()
+    results = send(messages)
+    elapsed = time.perf_counter() - start
+    return name, elapsed, sum(1 for ok in results if ok)
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Benchmark email transports')
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Simulated relay round trip')
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--gmail-to', help='Also send --messages real emails to this address through the Gmail API')
+    args = parser.parse_args()
+
+    def make_messages() -> list:
+        return [build_mime_message(f"user{i}@example.com", f"Benchmark {i}", "<p>Benchmark</p>")
+                for i in range(args.messages)]
+
+    latency = args.latency_ms / 1000.0
+    rows = []
+
+    with SMTPStandIn(latency, pipelining=False) as server:
+        rows.append(run_case('smtplib, connect per message', lambda m: connect_per_message(server.port, m),
+                             make_messages()))
+        pool = SMTPPoolTransport('127.0.0.1', server.port, 'bench', 'bench', 'none', 'bench@localhost', pool_size=1)
+        rows.append(run_case('pooled, 1 connection', lambda m: [pool.send(x) for x in m], make_messages()))
+        pool.close()
+
+    with SMTPStandIn(latency, pipelining=True) as server:
+        pool = SMTPPoolTransport('127.0.0.1', server.port, 'bench', 'bench', 'none', 'bench@localhost', pool_size=1)
+        rows.append(run_case('pooled + pipelined, 1 connection', lambda m: [pool.send(x) for x in m],
+                             make_messages()))
+        pool.close()
+        pool = SMTPPoolTransport('127.0.0.1', server.port, 'bench', 'bench', 'none', 'bench@localhost',
+                                 pool_size=args.pool_size)
+        rows.append(run_case(f"pooled + pipelined, {args.pool_size} connections", pool.send_many, make_messages()))
+        pool.close()
+
+    if args.gmail_to:
+        gmail = GmailAPITransport()
+        gmail_messages = [build_mime_message(args.gmail_to, f"Benchmark {i}", "<p>Benchmark</p>")
+                          for i in range(args.messages)]
+        rows.append(run_case('Gmail API (real sends)', lambda m: [gmail.send(x) for x in m], gmail_messages))
+
+    print(f"{args.messages} messages, {args.latency_ms:.0f} ms simulated relay round trip\n")
+    baseline = rows[0][1]
+    for name, elapsed, ok in rows:
+        print(f"  {name:38s} {elapsed:7.2f}s  {args.messages / elapsed:8.1f} msg/s  "
+              f"{baseline / elapsed:5.1f}x  ({ok}/{args.messages} ok)")
+    if not args.gmail_to:
+        print("\n  Gmail API: skipped (pass --gmail-to to send real messages)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark the Firestore retry policy against the in-memory stand-in.
+Injects slow RPCs and transient UNAVAILABLE errors into fake_firestore and
+compares, with and without retries and hedged reads:
+- get_waitlist_entry latency percentiles and how many calls failed
+- signups through api/waitlist.handler and how many were diverted to the
+  JSON fallback by a transient error
+
+Usage:
+    python bench_firestore_retry.py
+    python bench_firestore_retry.py --reads 2000 --signups 300 --error-rate 0.05 --slow-rate 0.02 --slow-ms 150
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Any, Dict, List
+
+# Add parent directory to path to import sibling modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_firestore
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max of a list of milliseconds (nearest rank)."""
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(round(p * len(ordered))) - 1))]
+
+    return {'p50': rank(0.50), 'p95': rank(0.95), 'p99': rank(0.99), 'max': ordered[-1]}
+
+
+def configure(retries: bool, hedging: bool) -> None:
+    """Switch the retry policy for the next case."""
+    import retry
+    retry.RETRY_MAX_ATTEMPTS = 4 if retries else 1
+    retry.HEDGED_READS_ENABLED = hedging
+
+
+def bench_reads(emails: List[str], reads: int) -> Dict[str, Any]:
+    """Time get_waitlist_entry over existing emails."""
+    import firestore_service
+    store = fake_firestore.store
+    faults_before, reads_before = store.stats['faults'], store.stats['reads']
+    latencies = []
+    misses = 0
+    for i in range(reads):
+        start = time.perf_counter()
+        if firestore_service.get_waitlist_entry(emails[i % len(emails)]) is None:
+            misses += 1
+        latencies.append((time.perf_counter() - start) * 1000)
+    return dict(percentiles(latencies), failed=misses,
+                faults=store.stats['faults'] - faults_before, reads=store.stats['reads'] - reads_before)
+
+
+def bench_signups(signups: int, prefix: str) -> Dict[str, Any]:
+    """Sign up new emails through the API handler and count JSON fallback writes."""
+    import waitlist
+    fallback_writes = []
+    waitlist.load_waitlist = lambda: []
+    waitlist.save_waitlist = lambda entries: fallback_writes.append(entries[-1]['email'])
+    waitlist.send_waitlist_notification = lambda email, total_count: None
+
+    latencies = []
+    for i in range(signups):
+        request = {'method': 'POST', 'headers': {'x-forwarded-for': '10.0.0.1'},
+                   'body': json.dumps({'email': f"{prefix}-{i}@example.com"})}
+        start = time.perf_counter()
+        waitlist.handler(request)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return dict(percentiles(latencies), fallback_writes=len(fallback_writes))
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Benchmark Firestore retries and hedged reads')
+    parser.add_argument('--reads', type=int, default=1000)
+    parser.add_argument('--signups', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='Normal RPC round trip')
+    parser.add_argument('--slow-rate', type=float, default=0.02, help='Share of RPCs that are slow')
+    parser.add_argument('--slow-ms', type=float, default=150.0, help='Round trip of a slow RPC')
+    parser.add_argument('--error-rate', type=float, default=0.03, help='Share of RPCs failing with UNAVAILABLE')
+    args = parser.parse_args()
+
+    os.environ.pop('TRAFFIC_CAPTURE_PATH', None)
+    store = fake_firestore.install()
+    import firestore_service
+
+    # Seed before turning on latency and faults
+    emails = [f"seed-{i}@example.com" for i in range(200)]
+    for email in emails:
+        firestore_service.add_waitlist_entry(email)
+    store.latency = args.latency_ms / 1000.0
+    store.slow_rate = args.slow_rate
+    store.slow_latency = args.slow_ms / 1000.0
+    store.error_rate = args.error_rate
+
+    cases = (('no retries', False, False), ('retries', True, False), ('retries + hedged reads', True, True))
+    print(f"RPC {args.latency_ms:g} ms, {args.slow_rate:.0%} slow at {args.slow_ms:g} ms, "
+          f"{args.error_rate:.0%} UNAVAILABLE")
+    print(f"\nget_waitlist_entry x{args.reads}")
+    print(f"  {'case':24s} {'p50':>7s} {'p95':>7s} {'p99':>7s} {'max':>7s} {'failed':>7s} {'reads':>6s}")
+    for label, retries, hedging in cases:
+        configure(retries, hedging)
+        result = bench_reads(emails, args.reads)
+        print(f"  {label:24s} {result['p50']:7.1f} {result['p95']:7.1f} {result['p99']:7.1f} "
+              f"{result['max']:7.1f} {result['failed']:7d} {result['reads']:6d}")
+
+    print(f"\nwaitlist.handler signups x{args.signups}")
+    print(f"  {'case':24s} {'p50':>7s} {'p99':>7s} {'JSON fallback':>14s}")
+    for index, (label, retries, hedging) in enumerate(cases):
+        configure(retries, hedging)
+        result = bench_signups(args.signups, f"bench{index}")
+        print(f"  {label:24s} {result['p50']:7.1f} {result['p99']:7.1f} {result['fallback_writes']:14d}")
+
+
+if __name__ == '__main__':
+    main()
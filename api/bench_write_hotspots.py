@@ -0,0 +1,128 @@
+"""
+Benchmark signup bursts against write hotspots in the in-memory stand-in.
+fake_firestore rejects commits with Aborted once an index key range takes
+more appends per second than one tablet serves, and (with --doc-writes)
+once a single document takes more writes per second than it sustains, as
+the rollup and domain counters would without sharding. This runs a
+sustained burst of add_waitlist_entry calls at a fixed rate under:
+- default single-field indexes, so created_at and timestamp append to one range
+- firestore.indexes.json, which exempts them and indexes (order_shard, created_at)
+
+and reports contention errors, retries, failed signups, latency percentiles,
+and whether the created_at-ordered shard merge returns every entry in order.
+
+Usage:
+    python bench_write_hotspots.py
+    python bench_write_hotspots.py --rate 3000 --seconds 5 --range-writes 500 --shards 16
+    python bench_write_hotspots.py --doc-writes 250 --counter-shards 1
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import threading
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+# Add parent directory to path to import sibling modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_firestore
+from bench_firestore_retry import percentiles
+
+INDEXES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'firestore.indexes.json')
+
+
+def configure(layout: str) -> None:
+    """Reset the store and model the index layout for the next case."""
+    import firestore_service
+    store = fake_firestore.store
+    store.reset()
+    # Every burst entry carries order_shard, as after the backfill
+    firestore_service.ORDER_SHARDS_READY = layout == 'sharded'
+    if layout == 'sharded':
+        store.load_indexes(INDEXES_PATH)
+    else:
+        store.configure_indexes('waitlist', composites=(('email_domain', 'email'),))
+
+
+def burst(rate: float, seconds: float, workers: int, prefix: str) -> Dict[str, Any]:
+    """Sign up rate * seconds new emails at a steady rate and time each call."""
+    import retry
+    import firestore_service
+    store = fake_firestore.store
+    retries_before = retry.retry_stats['retries']
+    latencies: List[float] = []
+    failed = []
+    lock = threading.Lock()
+
+    def signup(email: str) -> None:
+        start = time.perf_counter()
+        ok = firestore_service.add_waitlist_entry(email, '10.0.0.1')
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                failed.append(email)
+
+    total = int(rate * seconds)
+    start = time.perf_counter()
+    # Each retried abort logs a line; keep them out of the results table
+    with redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=workers) as executor:
+        for i in range(total):
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(signup, f"{prefix}-{i}@example.com")
+    elapsed = time.perf_counter() - start
+
+    client = firestore_service.get_firestore_client()
+    listed = [doc.get('created_at') for doc in firestore_service.iter_waitlist_by_created(client)]
+    return dict(percentiles(latencies), stored=len(store.collection('waitlist')), failed=len(failed),
+                contention=store.stats['contention'], retries=retry.retry_stats['retries'] - retries_before,
+                per_second=(total - len(failed)) / elapsed, listed=len(listed), ordered=listed == sorted(listed))
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Benchmark signup bursts against index hotspots')
+    parser.add_argument('--rate', type=float, default=2000.0, help='Signups per second')
+    parser.add_argument('--seconds', type=float, default=3.0, help='Length of the burst')
+    parser.add_argument('--workers', type=int, default=32, help='Concurrent signups')
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='RPC round trip')
+    parser.add_argument('--range-writes', type=int, default=500,
+                        help='Appends per second one index key range accepts')
+    parser.add_argument('--doc-writes', type=int, default=0,
+                        help='Writes per second one document accepts (0 disables)')
+    parser.add_argument('--shards', type=int, default=None, help='Override WAITLIST_ORDER_SHARDS')
+    parser.add_argument('--counter-shards', type=int, default=None, help='Override WAITLIST_COUNTER_SHARDS')
+    args = parser.parse_args()
+
+    os.environ.pop('TRAFFIC_CAPTURE_PATH', None)
+    fake_firestore.install(latency_ms=args.latency_ms, hotspot_writes_per_second=args.range_writes,
+                           document_writes_per_second=args.doc_writes)
+    import firestore_service
+    if args.shards is not None:
+        firestore_service.ORDER_SHARDS = max(1, min(args.shards, firestore_service.MAX_ORDER_SHARDS))
+    if args.counter_shards is not None:
+        firestore_service.COUNTER_SHARDS = max(1, args.counter_shards)
+
+    print(f"{args.rate:g} signups/s for {args.seconds:g} s, RPC {args.latency_ms:g} ms, "
+          f"{args.range_writes} appends/s per index range, {firestore_service.ORDER_SHARDS} order shards")
+    print(f"{args.doc_writes or 'unlimited'} writes/s per document, "
+          f"{firestore_service.COUNTER_SHARDS} counter shards")
+    print(f"\n  {'layout':26s} {'ok/s':>7s} {'failed':>7s} {'aborts':>7s} {'retries':>8s} "
+          f"{'p50':>7s} {'p99':>8s} {'listed':>7s} {'ordered':>8s}")
+    for index, (label, layout) in enumerate((('created_at indexed', 'default'),
+                                             ('sharded (indexes.json)', 'sharded'))):
+        configure(layout)
+        result = burst(args.rate, args.seconds, args.workers, f"burst{index}")
+        print(f"  {label:26s} {result['per_second']:7.0f} {result['failed']:7d} {result['contention']:7d} "
+              f"{result['retries']:8d} {result['p50']:7.1f} {result['p99']:8.1f} "
+              f"{result['listed']:7d} {str(result['ordered']):>8s}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,556 @@
+"""
+Static site build for production serving.
+Transcodes the screenshots to AVIF/WebP at several widths and rewrites the
+pages to use responsive <picture>/srcset markup, minifies the CSS and
+JavaScript, fingerprints asset filenames for immutable caching, and writes
+gzip and brotli variants next to each text file. The build is incremental:
+an asset whose content hash (and build settings) match the manifest from the
+previous build, and whose outputs still exist, is skipped.
+
+Serve the result with SITE_ROOT=dist (see server.py) or upload dist/ as is.
+
+Usage:
+    python build_assets.py
+    python build_assets.py --out /tmp/site --widths 480,960 --force
+"""
+
+import os
+import io
+import re
+import gzip
+import json
+import hashlib
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image
+    try:
+        import pillow_avif  # noqa: F401 - registers AVIF on Pillow < 11.2
+    except ImportError:
+        pass
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    print("⚠ Pillow not available; screenshots will be copied without transcoding. Install: pip install Pillow")
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+    print("⚠ brotli not available; only gzip variants will be written. Install: pip install brotli")
+
+
+# Root of the static site (repository root)
+SITE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_OUT_DIR = os.path.join(SITE_ROOT, 'dist')
+
+# Pages rewritten to point at the built assets (never fingerprinted)
+PAGES = ('index.html', 'privacy.html', 'roadmap.html', 'terms.html')
+
+# Stylesheets and scripts that are minified and fingerprinted
+TEXT_ASSETS = ('styles.css', 'script.js', 'assets/ui-showcase.css', 'assets/ui-showcase.js')
+
+# Screenshots transcoded to responsive variants
+SCREENSHOT_DIR = 'assets/screenshots'
+
+# Files copied verbatim
+COPY_FILES = ('CNAME',)
+
+# Target widths in pixels; the original width is always included
+IMAGE_WIDTHS = (480, 960, 1440)
+
+# Formats offered through <source>, best first, with encoder settings
+IMAGE_FORMATS = (
+    ('avif', 'AVIF', {'quality': 55, 'speed': 6}),
+    ('webp', 'WEBP', {'quality': 80, 'method': 6}),
+)
+
+# Rendered width of a showcase screenshot: one column on phones, two on
+# tablets and laptops, three from 1400px (see assets/ui-showcase.css)
+IMAGE_SIZES = '(max-width: 768px) 100vw, (max-width: 1399px) 50vw, 33vw'
+
+# Extensions that get .gz/.br variants
+COMPRESSIBLE = ('.html', '.css', '.js', '.svg', '.json', '.txt')
+
+MANIFEST_NAME = '.build-manifest.json'
+
+# Manifest format version; a manifest with another version is ignored
+BUILD_VERSION = 1
+
+_IMG_TAG_RE = re.compile(r'<img\b[^>]*?\bsrc="(' + re.escape(SCREENSHOT_DIR) + r'/[^"]+)"[^>]*>', re.S)
+
+_CSS_STRING_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+
+_CSS_TOKEN_RE = re.compile(r'(' + _CSS_STRING_RE.pattern + r')|/\*.*?\*/', re.S)
+
+# Keywords after which a '/' starts a regular expression rather than a division
+_JS_REGEX_KEYWORDS = {
+    'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'void', 'yield',
+    'await', 'delete', 'instanceof', 'new', 'throw',
+}
+
+
+def content_hash(data: bytes) -> str:
+    """Short hex digest used for fingerprints and change detection."""
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+with open(__file__, 'rb') as _f:
+    _BUILDER_HASH = content_hash(_f.read())
+
+
+def fingerprint_name(rel_path: str, data: bytes, suffix: str = '', ext: Optional[str] = None) -> str:
+    """
+    Build a fingerprinted output path.
+
+    Top-level files move under assets/ so that every fingerprinted file is
+    served from a static directory.
+
+    Args:
+        rel_path: Source path relative to the site root
+        data: Output bytes the fingerprint is taken from
+        suffix: Inserted before the hash (e.g. '-960w')
+        ext: Output extension, defaults to the source extension
+
+    Returns:
+        Output path such as 'assets/styles.3f2a9c1b7d.css'
+    """
+    directory, name = os.path.split(rel_path)
+    stem, source_ext = os.path.splitext(name)
+    return f"{directory or 'assets'}/{stem}{suffix}.{content_hash(data)}{ext or source_ext}"
+
+
+# ==================== Minification ====================
+
+def minify_css(source: str) -> str:
+    """Remove comments and redundant whitespace from a stylesheet, leaving strings untouched."""
+    source = _CSS_TOKEN_RE.sub(lambda m: m.group(1) or ' ', source)
+    parts = []
+    position = 0
+    for match in _CSS_STRING_RE.finditer(source):
+        parts.append(_squeeze_css(source[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_squeeze_css(source[position:]))
+    return ''.join(parts).replace(';}', '}').strip()
+
+
+def _squeeze_css(chunk: str) -> str:
+    chunk = re.sub(r'\s+', ' ', chunk)
+    chunk = re.sub(r'\s*([{};,>])\s*', r'\1', chunk)
+    # Only after a colon: a space before one is a descendant combinator (a :hover)
+    return re.sub(r':\s+', ':', chunk)
+
+
+def _skip_js_string(source: str, start: int) -> int:
+    """Return the index just past the string or template literal starting at start."""
+    quote = source[start]
+    i = start + 1
+    while i < len(source):
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == quote:
+            return i + 1
+        if quote == '`' and source.startswith('${', i):
+            i = _skip_js_braces(source, i + 2)
+            continue
+        i += 1
+    return i
+
+
+def _skip_js_braces(source: str, start: int) -> int:
+    """Return the index just past the '}' closing a template substitution."""
+    depth = 1
+    i = start
+    while i < len(source) and depth:
+        c = source[i]
+        if c in '"\'`':
+            i = _skip_js_string(source, i)
+            continue
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+        i += 1
+    return i
+
+
+def _skip_js_regex(source: str, start: int) -> int:
+    """Return the index just past the regular expression literal (and flags) starting at start."""
+    i = start + 1
+    in_class = False
+    while i < len(source) and source[i] != '\n':
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            i += 1
+            while i < len(source) and (source[i].isalnum() or source[i] == '_'):
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c in '_$' or ord(c) > 127
+
+
+def minify_js(source: str) -> str:
+    """
+    Remove comments, indentation and blank lines from a script.
+
+    Line breaks are kept (collapsed to one) so automatic semicolon insertion
+    behaves exactly as in the source; this is a safe whitespace/comment
+    stripper, not a renaming minifier.
+    """
+    out: List[str] = []
+    i = 0
+    n = len(source)
+    pending_space = False
+    pending_newline = False
+
+    def last_char() -> str:
+        return out[-1][-1] if out else ''
+
+    def emit(text: str) -> None:
+        nonlocal pending_space, pending_newline
+        if out and pending_newline:
+            out.append('\n')
+        elif out and pending_space:
+            prev, nxt = last_char(), text[0]
+            if (_is_word_char(prev) and _is_word_char(nxt)) or (prev in '+-' and prev == nxt) or (prev == '/' and nxt == '/'):
+                out.append(' ')
+        pending_space = pending_newline = False
+        out.append(text)
+
+    def regex_allowed() -> bool:
+        if pending_newline or not out:
+            return True
+        prev = last_char()
+        if _is_word_char(prev):
+            tail = re.search(r'[A-Za-z_$]+$', ''.join(out[-8:]))
+            return bool(tail) and tail.group(0) in _JS_REGEX_KEYWORDS
+        return prev not in ')]'
+
+    while i < n:
+        c = source[i]
+        if c in '"\'`':
+            end = _skip_js_string(source, i)
+            emit(source[i:end])
+            i = end
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            if '\n' in source[i:end]:
+                pending_newline = True
+            else:
+                pending_space = True
+            i = end
+        elif c == '/' and regex_allowed():
+            end = _skip_js_regex(source, i)
+            emit(source[i:end])
+            i = end
+        elif c in '\r\n':
+            pending_newline = True
+            i += 1
+        elif c.isspace():
+            pending_space = True
+            i += 1
+        else:
+            emit(c)
+            i += 1
+    return ''.join(out) + '\n'
+
+
+# ==================== Images ====================
+
+def supported_image_formats() -> List[Tuple[str, str, Dict[str, Any]]]:
+    """Formats from IMAGE_FORMATS that this Pillow build can encode."""
+    if not PIL_AVAILABLE:
+        return []
+    supported = []
+    probe = Image.new('RGB', (1, 1))
+    for ext, pil_format, options in IMAGE_FORMATS:
+        try:
+            probe.save(io.BytesIO(), pil_format)
+            supported.append((ext, pil_format, options))
+        except (KeyError, OSError, ValueError):
+            print(f"⚠ Pillow cannot encode {pil_format}; skipping .{ext} variants")
+    return supported
+
+
+def transcode_image(rel_path: str, data: bytes, widths: List[int],
+                    formats: List[Tuple[str, str, Dict[str, Any]]]) -> Tuple[Dict[str, Any], Dict[str, bytes]]:
+    """
+    Encode a screenshot at each width in each format.
+
+    Returns:
+        Tuple of (image info for the page rewrite, output path -> bytes).
+        The info holds the intrinsic size, the fallback URL and, per format,
+        a list of [url, width] pairs.
+    """
+    outputs: Dict[str, bytes] = {}
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        width, height = image.size
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        base = image.convert('RGBA' if has_alpha else 'RGB')
+
+        # Fallback for browsers without AVIF/WebP: the original, losslessly recompressed if smaller
+        buffer = io.BytesIO()
+        base.save(buffer, 'PNG', optimize=True)
+        fallback = min(data, buffer.getvalue(), key=len)
+        fallback_path = fingerprint_name(rel_path, fallback)
+        outputs[fallback_path] = fallback
+
+        targets = sorted({w for w in widths if w < width} | {width})
+        sources: Dict[str, List[List[Any]]] = {}
+        for target in targets:
+            resized = base if target == width else base.resize(
+                (target, max(1, round(height * target / width))), Image.LANCZOS)
+            for ext, pil_format, options in formats:
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, **options)
+                path = fingerprint_name(rel_path, buffer.getvalue(), f"-{target}w", f".{ext}")
+                outputs[path] = buffer.getvalue()
+                sources.setdefault(ext, []).append([path, target])
+
+    info = {'width': width, 'height': height, 'fallback': fallback_path, 'sources': sources}
+    return info, outputs
+
+
+def picture_markup(img_tag: str, info: Dict[str, Any]) -> str:
+    """Wrap an <img> tag in a <picture> offering the transcoded variants."""
+    img = img_tag.replace(f'src="{_IMG_TAG_RE.search(img_tag).group(1)}"', f'src="{info["fallback"]}"', 1)
+    if ' width=' not in img and 'width' in info:
+        img = img.replace('<img', f'<img width="{info["width"]}" height="{info["height"]}"', 1)
+    sources = ''.join(
+        f'<source type="image/{ext}" srcset="{", ".join(f"{url} {w}w" for url, w in variants)}" sizes="{IMAGE_SIZES}">'
+        for ext, variants in info['sources'].items()
+    )
+    return f'<picture>{sources}{img}</picture>' if sources else img
+
+
+def rewrite_page(html: str, asset_urls: Dict[str, str], images: Dict[str, Dict[str, Any]]) -> str:
+    """Point a page at the fingerprinted assets and responsive screenshots."""
+    for rel_path, url in asset_urls.items():
+        html = re.sub(r'((?:href|src)=")' + re.escape(rel_path) + '"', lambda m: m.group(1) + url + '"', html)
+
+    def replace_img(match: 're.Match') -> str:
+        info = images.get(match.group(1))
+        return picture_markup(match.group(0), info) if info else match.group(0)
+
+    return _IMG_TAG_RE.sub(replace_img, html)
+
+
+# ==================== Build ====================
+
+def compressed_variants(rel_path: str, data: bytes) -> Dict[str, bytes]:
+    """Gzip and brotli variants of a text file, keeping only those that are smaller."""
+    if not rel_path.endswith(COMPRESSIBLE):
+        return {}
+    variants = {rel_path + '.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if BROTLI_AVAILABLE:
+        variants[rel_path + '.br'] = brotli.compress(data, quality=11)
+    return {path: body for path, body in variants.items() if len(body) < len(data)}
+
+
+def write_output(out_dir: str, rel_path: str, data: bytes) -> None:
+    """Atomically write one output file."""
+    path = os.path.join(out_dir, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class AssetBuilder:
+    """
+    Incremental builder for the static site.
+
+    Each source has a manifest entry keyed by a hash of its bytes and the
+    settings that shape its outputs. A source is rebuilt only when that key
+    changes or one of its recorded outputs is missing; pages are keyed on the
+    asset URLs they reference too, so they are rewritten whenever an asset's
+    fingerprint changes.
+    """
+
+    def __init__(self, out_dir: str = DEFAULT_OUT_DIR, widths: Tuple[int, ...] = IMAGE_WIDTHS,
+                 force: bool = False):
+        self.out_dir = out_dir
+        self.widths = list(widths)
+        self.formats = supported_image_formats()
+        self.manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+        self.previous = {} if force else self._load_manifest()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.stats = {'built': 0, 'skipped': 0, 'removed': 0}
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return manifest.get('entries', {}) if manifest.get('version') == BUILD_VERSION else {}
+
+    def _up_to_date(self, rel_path: str, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.previous.get(rel_path)
+        if entry and entry['key'] == key and all(
+                os.path.isfile(os.path.join(self.out_dir, path)) for path in entry['outputs']):
+            return entry
+        return None
+
+    def _build(self, rel_path: str, key: str, build) -> Dict[str, Any]:
+        """Reuse the manifest entry for rel_path or run build() -> (entry fields, outputs)."""
+        # Changes to this script (minifiers, encoders) invalidate every entry
+        key = content_hash((key + _BUILDER_HASH).encode('utf-8'))
+        entry = self._up_to_date(rel_path, key)
+        if entry:
+            self.stats['skipped'] += 1
+        else:
+            fields, outputs = build()
+            for path, data in list(outputs.items()):
+                outputs.update(compressed_variants(path, data))
+            for path, data in outputs.items():
+                write_output(self.out_dir, path, data)
+            entry = dict(fields, key=key, outputs=sorted(outputs))
+            self.stats['built'] += 1
+            print(f"  built {rel_path} -> {len(outputs)} files")
+        self.entries[rel_path] = entry
+        return entry
+
+    def build_text_asset(self, rel_path: str) -> str:
+        """Minify and fingerprint a stylesheet or script; returns its URL."""
+        with open(os.path.join(SITE_ROOT, rel_path), 'rb') as f:
+            data = f.read()
+
+        def build():
+            text = data.decode('utf-8')
+            minified = (minify_css(text) if rel_path.endswith('.css') else minify_js(text)).encode('utf-8')
+            url = fingerprint_name(rel_path, minified)
+            print(f"    {len(data)} -> {len(minified)} bytes")
+            return {'url': url}, {url: minified}
+
+        return self._build(rel_path, content_hash(data), build)['url']
+
+    def build_image(self, rel_path: str) -> Dict[str, Any]:
+        """Transcode one screenshot; returns its image info."""
+        with open(os.path.join(SITE_ROOT, rel_path), 'rb') as f:
+            data = f.read()
+        settings = json.dumps([self.widths, self.formats, IMAGE_FORMATS], sort_keys=True, default=str)
+
+        def build():
+            if not self.formats:
+                path = fingerprint_name(rel_path, data)
+                return {'image': {'fallback': path, 'sources': {}}}, {path: data}
+            info, outputs = transcode_image(rel_path, data, self.widths, self.formats)
+            return {'image': info}, outputs
+
+        return self._build(rel_path, content_hash(data + settings.encode('utf-8')), build)['image']
+
+    def build_page(self, rel_path: str, asset_urls: Dict[str, str], images: Dict[str, Dict[str, Any]]) -> None:
+        """Rewrite one page against the built assets."""
+        with open(os.path.join(SITE_ROOT, rel_path), 'rb') as f:
+            data = f.read()
+        settings = json.dumps([asset_urls, images, IMAGE_SIZES], sort_keys=True)
+
+        def build():
+            html = rewrite_page(data.decode('utf-8'), asset_urls, images)
+            return {}, {rel_path: html.encode('utf-8')}
+
+        self._build(rel_path, content_hash(data + settings.encode('utf-8')), build)
+
+    def copy_file(self, rel_path: str) -> None:
+        """Copy a file to the output unchanged."""
+        with open(os.path.join(SITE_ROOT, rel_path), 'rb') as f:
+            data = f.read()
+        self._build(rel_path, content_hash(data), lambda: ({}, {rel_path: data}))
+
+    def prune(self) -> None:
+        """Delete outputs of the previous build that this build no longer produces."""
+        current = {path for entry in self.entries.values() for path in entry['outputs']}
+        for entry in self.previous.values():
+            for path in entry['outputs']:
+                full_path = os.path.join(self.out_dir, path)
+                if path not in current and os.path.isfile(full_path):
+                    os.remove(full_path)
+                    self.stats['removed'] += 1
+
+    def run(self) -> Dict[str, int]:
+        """Build everything and save the manifest."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        asset_urls = {rel_path: self.build_text_asset(rel_path) for rel_path in TEXT_ASSETS
+                      if os.path.isfile(os.path.join(SITE_ROOT, rel_path))}
+
+        images = {}
+        screenshot_dir = os.path.join(SITE_ROOT, SCREENSHOT_DIR)
+        for name in sorted(os.listdir(screenshot_dir)):
+            if name.lower().endswith('.png'):
+                rel_path = f"{SCREENSHOT_DIR}/{name}"
+                images[rel_path] = self.build_image(rel_path)
+
+        for rel_path in PAGES:
+            self.build_page(rel_path, asset_urls, images)
+        for rel_path in COPY_FILES:
+            if os.path.isfile(os.path.join(SITE_ROOT, rel_path)):
+                self.copy_file(rel_path)
+
+        self.prune()
+        write_output(self.out_dir, MANIFEST_NAME, json.dumps(
+            {'version': BUILD_VERSION, 'entries': self.entries}, indent=2, sort_keys=True).encode('utf-8'))
+        return self.stats
+
+
+def output_size(out_dir: str) -> Tuple[int, int]:
+    """Total bytes of the uncompressed outputs and of the best variant a brotli-capable browser receives."""
+    plain = best = 0
+    for root, _, files in os.walk(out_dir):
+        for name in files:
+            if name.endswith(('.gz', '.br', '.tmp')) or name == MANIFEST_NAME:
+                continue
+            path = os.path.join(root, name)
+            size = os.path.getsize(path)
+            plain += size
+            best += min([size] + [os.path.getsize(path + s) for s in ('.br', '.gz') if os.path.isfile(path + s)])
+    return plain, best
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Build the static site into dist/')
+    parser.add_argument('--out', default=DEFAULT_OUT_DIR, help='Output directory')
+    parser.add_argument('--widths', default=','.join(str(w) for w in IMAGE_WIDTHS),
+                        help='Comma-separated screenshot widths in pixels')
+    parser.add_argument('--force', action='store_true', help='Ignore the manifest and rebuild everything')
+    args = parser.parse_args()
+
+    try:
+        widths = tuple(sorted({int(w) for w in args.widths.split(',') if w.strip()}))
+    except ValueError:
+        parser.error('--widths must be comma-separated integers')
+
+    out_dir = os.path.abspath(args.out)
+    print(f"Building site into {out_dir}")
+    stats = AssetBuilder(out_dir, widths, args.force).run()
+    plain, best = output_size(out_dir)
+    print(f"✓ Built {stats['built']}, skipped {stats['skipped']} unchanged, removed {stats['removed']} stale files")
+    print(f"  Output: {plain / 1024:.0f} KiB ({best / 1024:.0f} KiB with precompression)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Opt-in capture of anonymized waitlist traffic for replay.
+When TRAFFIC_CAPTURE_PATH is set, every request to a wrapped handler is
+appended to that file as one compact JSON line: arrival time, method, body
+shape, anonymized email and IP, status and handler latency. No raw email,
+IP or body is ever written.
+
+Replay a capture with api/replay_traffic.py.
+"""
+
+import os
+import re
+import json
+import hmac
+import time
+import hashlib
+import secrets
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+# Capture file (JSON Lines); capture is disabled when unset
+TRAFFIC_CAPTURE_PATH = os.environ.get('TRAFFIC_CAPTURE_PATH', '')
+
+# Key for the anonymizing hashes. Set the same value on every instance to keep
+# duplicates recognizable across instances; defaults to a per-process key.
+TRAFFIC_CAPTURE_SALT = os.environ.get('TRAFFIC_CAPTURE_SALT', '') or secrets.token_hex(16)
+
+# Domains common enough to keep verbatim (they identify no one and shape the
+# duplicate and validation mix); all others are replaced with a token
+COMMON_DOMAINS = {
+    'gmail.com', 'googlemail.com', 'yahoo.com', 'outlook.com', 'hotmail.com',
+    'icloud.com', 'me.com', 'live.com', 'aol.com', 'proton.me', 'protonmail.com',
+}
+
+_lock = threading.Lock()
+
+
+def is_capture_enabled() -> bool:
+    """Check whether traffic capture is on."""
+    return bool(TRAFFIC_CAPTURE_PATH)
+
+
+def _token(value: str, length: int = 10) -> str:
+    return hmac.new(TRAFFIC_CAPTURE_SALT.encode('utf-8'), value.encode('utf-8'),
+                    hashlib.sha256).hexdigest()[:length]
+
+
+def anonymize_email(email: Any) -> Optional[str]:
+    """
+    Replace an email with a stable pseudonym of the same shape.
+
+    The same address always maps to the same pseudonym (so duplicates survive),
+    valid-looking addresses stay valid, malformed ones stay malformed with
+    their punctuation intact, and letter case is kept as a flag in the form
+    of an uppercase pseudonym.
+    """
+    if not isinstance(email, str):
+        return None
+    stripped = email.strip()
+    if not stripped:
+        return email
+    local, at, domain = stripped.rpartition('@')
+    normalized = stripped.lower()
+    pseudonym_local = 'u' + _token(normalized)
+    if at and local and '.' in domain:
+        domain = domain.lower() if domain.lower() in COMMON_DOMAINS else f"d{_token(domain.lower(), 6)}.example"
+        pseudonym = f"{pseudonym_local}@{domain}"
+    else:
+        # Keep the punctuation skeleton so malformed input stays malformed
+        pseudonym = pseudonym_local + re.sub(r'[A-Za-z0-9]+', '', stripped)
+    if stripped != stripped.lower():
+        pseudonym = pseudonym.upper()
+    if stripped != email:
+        pseudonym = f" {pseudonym} "
+    return pseudonym
+
+
+def describe_body(body: Any) -> Dict[str, Any]:
+    """
+    Reduce a request body to its shape.
+
+    Returns:
+        Dict with 'k' (json, form, empty, malformed, other), the anonymized
+        email under 'e' when present, and the body size under 'n'
+    """
+    if isinstance(body, (bytes, bytearray)):
+        try:
+            body = body.decode('utf-8')
+        except UnicodeDecodeError:
+            return {'k': 'malformed', 'n': len(body)}
+    if body is None or body == '':
+        return {'k': 'empty', 'n': 0}
+    if isinstance(body, dict):
+        data: Any = body
+        size = len(json.dumps(body))
+    else:
+        size = len(body)
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return {'k': 'form' if '=' in body and '{' not in body else 'malformed', 'n': size}
+    if not isinstance(data, dict):
+        return {'k': 'other', 'n': size}
+    shape: Dict[str, Any] = {'k': 'json', 'n': size}
+    if 'email' in data:
+        shape['e'] = anonymize_email(data['email'])
+    extra = sorted(key for key in data if key != 'email')
+    if extra:
+        shape['x'] = extra
+    return shape
+
+
+def _request_parts(request: Any) -> Tuple[str, Dict[str, str], Any, str]:
+    """Get (method, lowercase headers, body, client IP) from a Vercel dict or a Flask request."""
+    if isinstance(request, dict):
+        headers = {str(k).lower(): v for k, v in (request.get('headers') or {}).items()}
+        return request.get('method', 'GET'), headers, request.get('body'), headers.get('x-forwarded-for', '')
+    headers = {str(k).lower(): v for k, v in request.headers.items()}
+    body = request.get_data(cache=True) if hasattr(request, 'get_data') else getattr(request, 'data', None)
+    ip = headers.get('x-forwarded-for') or getattr(request, 'remote_addr', '') or ''
+    return request.method, headers, body, ip
+
+
+def _response_status(response: Any) -> int:
+    if isinstance(response, dict):
+        return int(response.get('statusCode', 200))
+    if isinstance(response, tuple) and len(response) > 1:
+        return int(response[1])
+    return int(getattr(response, 'status_code', 200))
+
+
+def record(request: Any, status: int, elapsed: float, arrived: float) -> None:
+    """Append one anonymized request record to the capture file."""
+    method, headers, body, ip = _request_parts(request)
+    entry: Dict[str, Any] = {
+        't': round(arrived, 3),
+        'm': method,
+        's': status,
+        'l': round(elapsed * 1000, 2),
+    }
+    if method not in ('OPTIONS', 'GET', 'HEAD'):
+        entry['b'] = describe_body(body)
+    if ip:
+        entry['ip'] = _token(ip.split(',', 1)[0].strip(), 8)
+    if headers.get('idempotency-key'):
+        entry['ik'] = _token(headers['idempotency-key'], 8)
+    content_type = headers.get('content-type', '').split(';', 1)[0].strip()
+    if content_type:
+        entry['ct'] = content_type
+    line = json.dumps(entry, separators=(',', ':')) + '\n'
+    with _lock:
+        with open(TRAFFIC_CAPTURE_PATH, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+def capture_traffic(handler: Callable) -> Callable:
+    """
+    Wrap a handler so its requests are captured when TRAFFIC_CAPTURE_PATH is set.
+
+    Returns the handler unchanged when capture is off, so there is no
+    per-request cost unless it is enabled.
+    """
+    if not is_capture_enabled():
+        return handler
+
+    @wraps(handler)
+    def wrapper(request):
+        arrived = time.time()
+        start = time.perf_counter()
+        response = handler(request)
+        elapsed = time.perf_counter() - start
+        try:
+            record(request, _response_status(response), elapsed, arrived)
+        except Exception as e:
+            # Capture must never break a signup
+            print(f"⚠ Error capturing request: {e}")
+        return response
+
+    return wrapper
@@ -0,0 +1,131 @@
+"""
+In-process stale-while-revalidate cache for the public waitlist count.
+Keeps page views from scanning the waitlist collection on every request.
+"""
+
+import os
+import time
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+
+# Seconds a cached value is served as fresh
+COUNT_CACHE_TTL_SECONDS = float(os.environ.get('COUNT_CACHE_TTL_SECONDS', '30'))
+
+# Further seconds a stale value is still served while one refresh runs in the background
+COUNT_CACHE_STALE_SECONDS = float(os.environ.get('COUNT_CACHE_STALE_SECONDS', '300'))
+
+
+class StaleWhileRevalidateCache:
+    """
+    Single-value cache with TTL and stale-while-revalidate refresh.
+
+    Fresh values are returned directly. Stale values are returned immediately
+    while a background thread reloads them. Only when there is no usable value
+    does a caller block on the loader. At most one load is ever in flight;
+    concurrent callers wait for it instead of starting their own.
+    """
+
+    def __init__(self, loader: Callable[[], Any], ttl: float = COUNT_CACHE_TTL_SECONDS,
+                 stale_ttl: float = COUNT_CACHE_STALE_SECONDS):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._value: Any = None
+        self._loaded_at: Optional[float] = None
+        self._loaded_wall = 0.0
+        self._refreshing = False
+        self._cond = threading.Condition()
+
+    def get(self) -> Tuple[Any, float]:
+        """
+        Get the cached value, loading or refreshing it as needed.
+
+        Returns:
+            Tuple of (value, wall-clock time the value was loaded)
+        """
+        with self._cond:
+            now = time.monotonic()
+            if self._loaded_at is not None:
+                age = now - self._loaded_at
+                if age < self.ttl:
+                    return self._value, self._loaded_wall
+                if age < self.ttl + self.stale_ttl:
+                    if not self._refreshing:
+                        self._refreshing = True
+                        threading.Thread(target=self._refresh, daemon=True).start()
+                    return self._value, self._loaded_wall
+
+            # Nothing usable: wait for an in-flight load or do it ourselves
+            if self._refreshing:
+                while self._refreshing:
+                    self._cond.wait()
+                if self._loaded_at is not None:
+                    return self._value, self._loaded_wall
+            self._refreshing = True
+
+        self._refresh()
+        with self._cond:
+            return self._value, self._loaded_wall
+
+    def invalidate(self) -> None:
+        """Mark the cached value stale so the next read triggers a refresh."""
+        with self._cond:
+            if self._loaded_at is not None:
+                self._loaded_at = min(self._loaded_at, time.monotonic() - self.ttl)
+
+    def _refresh(self) -> None:
+        """Run the loader and publish its result. Caller has set _refreshing."""
+        try:
+            value = self.loader()
+        except Exception as e:
+            print(f"⚠ Error refreshing cached value: {e}")
+            with self._cond:
+                self._refreshing = False
+                self._cond.notify_all()
+            return
+
+        with self._cond:
+            self._value = value
+            self._loaded_at = time.monotonic()
+            self._loaded_wall = time.time()
+            self._refreshing = False
+            self._cond.notify_all()
+
+
+def count_cache_headers(count: int, loaded_at: float) -> dict:
+    """
+    HTTP caching headers for a count response.
+
+    The ETag is derived from the count itself, so revalidation returns 304
+    until the number actually changes; Cache-Control lets browsers and CDNs
+    serve it (and keep serving it while revalidating) without reaching us.
+    """
+    return versioned_cache_headers(f"count-{count}", loaded_at)
+
+
+def versioned_cache_headers(version: str, loaded_at: float) -> dict:
+    """
+    HTTP caching headers for a cached public response identified by a version string.
+
+    Args:
+        version: Changes whenever the response body changes (used as the ETag)
+        loaded_at: Wall-clock time the cached value was loaded
+    """
+    max_age = int(COUNT_CACHE_TTL_SECONDS)
+    stale = int(COUNT_CACHE_STALE_SECONDS)
+    return {
+        'ETag': f'"{version}"',
+        'Cache-Control': f'public, max-age={max_age}, s-maxage={max_age}, stale-while-revalidate={stale}',
+        'Last-Modified': time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(loaded_at)),
+    }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return etag in candidates or f'W/{etag}' in candidates
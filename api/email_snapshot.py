@@ -0,0 +1,356 @@
+"""
+Sorted, memory-mapped snapshot of waitlist emails for offline dedup.
+Exports every email (from Firestore or a waitlist.json / JSONL file) into a
+compact sorted binary file, then answers membership from an mmap with
+binary search, or filters a whole candidate list against it in one pass,
+without any datastore reads.
+
+Two layouts:
+- hash (default): 8-byte BLAKE2b prefixes of the normalized emails, 8 bytes
+  per email. A new email is taken for a member with probability about
+  n / 2**64 (under 1e-12 at 10M emails).
+- strings: the normalized emails themselves behind an offset table; exact,
+  and the snapshot can be listed back.
+
+File layout: b'WLSNAP1' + kind byte (b'H' or b'S'), uint64 count, then for
+'H' count big-endian uint64 hashes, for 'S' count + 1 uint64 offsets into
+the UTF-8 string blob that follows. Values are sorted and unique, so
+byte order is numeric order.
+
+Usage:
+    python email_snapshot.py build waitlist.snap                      # from Firestore
+    python email_snapshot.py build waitlist.snap --source waitlist.json --strings
+    python email_snapshot.py check waitlist.snap someone@example.com
+    python email_snapshot.py filter waitlist.snap import.json -o new_emails.txt
+"""
+
+import os
+import sys
+import mmap
+import time
+import struct
+import hashlib
+import argparse
+from typing import Iterable, Iterator, List, Optional
+
+# Add parent directory to path to import sibling modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# NumPy is optional: it makes building and bulk filtering several times faster
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+MAGIC = b'WLSNAP1'
+KIND_HASH = b'H'
+KIND_STRINGS = b'S'
+HEADER = struct.Struct('>7scQ')
+
+# Emails fetched per Firestore page when building from the datastore
+EXPORT_PAGE_SIZE = 1000
+
+# Values read per chunk when scanning a snapshot sequentially
+SCAN_CHUNK = 65536
+
+# Bulk lookups switch from binary search to one sequential merge pass once
+# the sorted keys number more than 1/MERGE_RATIO of the snapshot
+MERGE_RATIO = 32
+
+
+def normalize(email: str) -> str:
+    """Snapshot key for an email (the waitlist document ID form)."""
+    return email.strip().lower()
+
+
+def email_hash(email: str) -> int:
+    """64-bit hash of a normalized email."""
+    return int.from_bytes(hashlib.blake2b(email.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def write_snapshot(path: str, emails: Iterable[str], strings: bool = False) -> int:
+    """
+    Write a snapshot of emails (normalized, deduplicated and sorted here).
+
+    Args:
+        path: Output file (replaced atomically)
+        emails: Emails in any order and case
+        strings: Store the emails themselves instead of hashes
+
+    Returns:
+        Number of distinct emails written
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        if strings:
+            keys = sorted({normalize(email).encode('utf-8') for email in emails if email})
+            f.write(HEADER.pack(MAGIC, KIND_STRINGS, len(keys)))
+            offset = 0
+            offsets = bytearray()
+            for key in keys:
+                offsets += offset.to_bytes(8, 'big')
+                offset += len(key)
+            offsets += offset.to_bytes(8, 'big')
+            f.write(offsets)
+            for key in keys:
+                f.write(key)
+            count = len(keys)
+        elif NUMPY_AVAILABLE:
+            hashes = np.unique(np.fromiter(
+                (email_hash(normalize(email)) for email in emails if email), dtype=np.uint64))
+            f.write(HEADER.pack(MAGIC, KIND_HASH, len(hashes)))
+            f.write(hashes.astype('>u8').tobytes())
+            count = len(hashes)
+        else:
+            hashes = sorted({email_hash(normalize(email)) for email in emails if email})
+            f.write(HEADER.pack(MAGIC, KIND_HASH, len(hashes)))
+            f.write(b''.join(value.to_bytes(8, 'big') for value in hashes))
+            count = len(hashes)
+    os.replace(tmp_path, path)
+    return count
+
+
+class EmailSnapshot:
+    """
+    Read-only view of a snapshot file through mmap.
+
+    Only the pages a lookup touches are read from disk, so opening a
+    snapshot is instant and many processes can share one in the page cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        if size < HEADER.size:
+            self.close()
+            raise ValueError(f"Not an email snapshot: {path}")
+        magic, kind, count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or kind not in (KIND_HASH, KIND_STRINGS):
+            self.close()
+            raise ValueError(f"Not an email snapshot: {path}")
+        self.kind = kind
+        self.count = count
+        self._data = HEADER.size
+        if kind == KIND_STRINGS:
+            self._blob = HEADER.size + 8 * (count + 1)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __enter__(self) -> 'EmailSnapshot':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def _hash_at(self, index: int) -> int:
+        start = self._data + 8 * index
+        return int.from_bytes(self._mm[start:start + 8], 'big')
+
+    def _string_at(self, index: int) -> bytes:
+        start, end = struct.unpack_from('>QQ', self._mm, self._data + 8 * index)
+        return self._mm[self._blob + start:self._blob + end]
+
+    def _lower_bound(self, key, value_at, lo: int = 0) -> int:
+        """First index at or after lo whose value is not below key."""
+        hi = self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if value_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __contains__(self, email: str) -> bool:
+        key = normalize(email)
+        if self.kind == KIND_HASH:
+            key, value_at = email_hash(key), self._hash_at
+        else:
+            key, value_at = key.encode('utf-8'), self._string_at
+        index = self._lower_bound(key, value_at)
+        return index < self.count and value_at(index) == key
+
+    def iter_emails(self) -> Iterator[str]:
+        """Stored emails in sorted order (strings snapshots only)."""
+        if self.kind != KIND_STRINGS:
+            raise ValueError('A hash snapshot cannot list its emails')
+        for index in range(self.count):
+            yield self._string_at(index).decode('utf-8')
+
+    def _iter_values(self) -> Iterator:
+        """Stored values in order, read in chunks (no buffer is held across yields)."""
+        for first in range(0, self.count, SCAN_CHUNK):
+            last = min(first + SCAN_CHUNK, self.count)
+            if self.kind == KIND_HASH:
+                chunk = self._mm[self._data + 8 * first:self._data + 8 * last]
+                for (value,) in struct.iter_unpack('>Q', chunk):
+                    yield value
+            else:
+                offsets = self._mm[self._data + 8 * first:self._data + 8 * (last + 1)]
+                bounds = [value for (value,) in struct.iter_unpack('>Q', offsets)]
+                blob = self._mm[self._blob + bounds[0]:self._blob + bounds[-1]]
+                base = bounds[0]
+                for i in range(len(bounds) - 1):
+                    yield blob[bounds[i] - base:bounds[i + 1] - base]
+
+    def members(self, keys: List) -> set:
+        """
+        Which of the sorted, distinct keys (hashes or UTF-8 emails) are stored.
+
+        A few keys are binary-searched; many keys are merge-joined against one
+        sequential scan of the file, which beats a search per key once the
+        keys are more than a small fraction of the snapshot.
+        """
+        found = set()
+        if len(keys) * MERGE_RATIO < self.count:
+            value_at = self._hash_at if self.kind == KIND_HASH else self._string_at
+            index = 0
+            for key in keys:
+                # Keys are sorted, so each search starts where the previous one landed
+                index = self._lower_bound(key, value_at, index)
+                if index < self.count and value_at(index) == key:
+                    found.add(key)
+            return found
+
+        values = self._iter_values()
+        current = next(values, None)
+        for key in keys:
+            while current is not None and current < key:
+                current = next(values, None)
+            if current is None:
+                break
+            if current == key:
+                found.add(key)
+        return found
+
+    def filter_new(self, emails: Iterable[str]) -> List[str]:
+        """
+        Keep the emails that are not in the snapshot, in input order.
+
+        Repeats within the input are dropped too (the first spelling is
+        kept), so the result is exactly what an import still has to write.
+
+        Args:
+            emails: Candidate emails in any case
+
+        Returns:
+            Normalized new emails
+        """
+        candidates = []
+        seen = set()
+        for email in emails:
+            key = normalize(email) if email else ''
+            if key and key not in seen:
+                seen.add(key)
+                candidates.append(key)
+        if not candidates or not self.count:
+            return candidates
+
+        if self.kind == KIND_HASH:
+            keys = [email_hash(key) for key in candidates]
+            if NUMPY_AVAILABLE:
+                stored = np.frombuffer(self._mm, dtype='>u8', count=self.count, offset=self._data)
+                wanted = np.array(keys, dtype=np.uint64)
+                positions = np.searchsorted(stored, wanted)
+                clipped = np.minimum(positions, self.count - 1)
+                present = (positions < self.count) & (stored[clipped] == wanted)
+                del stored  # Release the view so the mmap can be closed
+                return [key for key, member in zip(candidates, present.tolist()) if not member]
+        else:
+            keys = [key.encode('utf-8') for key in candidates]
+
+        found = self.members(sorted(set(keys)))
+        return [candidate for candidate, key in zip(candidates, keys) if key not in found]
+
+
+def iter_source_emails(source: Optional[str]) -> Iterator[str]:
+    """Emails from a waitlist.json / JSONL file, or from Firestore when source is None."""
+    if source:
+        from waitlist_entry import WaitlistEntryBatch
+        yield from WaitlistEntryBatch.from_json_file(source).emails()
+        return
+
+    from firestore_service import iter_waitlist_pages, FIRESTORE_AVAILABLE
+    if not FIRESTORE_AVAILABLE:
+        raise RuntimeError('Firestore not available; pass --source with a JSON export')
+    for page in iter_waitlist_pages(EXPORT_PAGE_SIZE, fields=['email']):
+        for entry in page:
+            yield entry['email']
+
+
+def read_candidates(path: str) -> List[str]:
+    """Candidate emails from a waitlist.json / JSONL file or a plain list (one per line)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+    if first in ('[', '{'):
+        from waitlist_entry import WaitlistEntryBatch
+        return list(WaitlistEntryBatch.from_json_file(path).emails())
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Build and query sorted email snapshots')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='Export all emails into a snapshot')
+    build.add_argument('snapshot', help='Output snapshot file')
+    build.add_argument('--source', help='waitlist.json / JSONL file (default: Firestore)')
+    build.add_argument('--strings', action='store_true', help='Store exact emails instead of 8-byte hashes')
+
+    check = commands.add_parser('check', help='Test emails for membership')
+    check.add_argument('snapshot')
+    check.add_argument('emails', nargs='+')
+
+    filter_ = commands.add_parser('filter', help='Keep the candidates that are not in the snapshot')
+    filter_.add_argument('snapshot')
+    filter_.add_argument('candidates', help='waitlist.json / JSONL file or one email per line')
+    filter_.add_argument('-o', '--output', help='Write the new emails here, one per line')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        try:
+            count = write_snapshot(args.snapshot, iter_source_emails(args.source), args.strings)
+        except RuntimeError as e:
+            print(f"⚠ {e}")
+            sys.exit(1)
+        print(f"✓ Wrote {count} emails to {args.snapshot} "
+              f"({os.path.getsize(args.snapshot) / 1e6:.1f} MB, {time.perf_counter() - start:.2f}s)")
+        return
+
+    with EmailSnapshot(args.snapshot) as snapshot:
+        if args.command == 'check':
+            for email in args.emails:
+                print(f"{'✓ member' if email in snapshot else '  new   '}  {email}")
+            return
+
+        candidates = read_candidates(args.candidates)
+        start = time.perf_counter()
+        new_emails = snapshot.filter_new(candidates)
+        elapsed = time.perf_counter() - start
+        print(f"✓ {len(new_emails)} of {len(candidates)} candidates are new "
+              f"(checked against {len(snapshot)} emails in {elapsed:.2f}s)")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                for email in new_emails:
+                    f.write(email + '\n')
+            print(f"✓ New emails written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
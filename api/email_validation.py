@@ -0,0 +1,201 @@
+"""
+Email validation for signups and bulk tooling.
+Normalizes addresses, checks them against a precompiled pattern, and
+rejects disposable domains from a bundled rule file (email_domains.txt)
+indexed in a reversed-label trie, so a rule for a domain also covers its
+subdomains and the most specific rule wins. Everything is in memory:
+junk is rejected before any Firestore read or write.
+
+Usage:
+    problem = email_problem(normalize_email(raw))   # None, 'format' or 'disposable'
+    problems = validate_emails(emails)               # bulk, caches domain verdicts
+"""
+
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Bundled rule file; EMAIL_DOMAIN_RULES_PATH points at a replacement
+EMAIL_DOMAIN_RULES_PATH = os.environ.get(
+    'EMAIL_DOMAIN_RULES_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'email_domains.txt')
+)
+
+# Extra comma-separated rules on top of the file (e.g. a competitor's domain)
+EMAIL_BLOCKED_DOMAINS = os.environ.get('EMAIL_BLOCKED_DOMAINS', '')
+EMAIL_ALLOWED_DOMAINS = os.environ.get('EMAIL_ALLOWED_DOMAINS', '')
+
+# RFC 5321 limits
+MAX_EMAIL_LENGTH = 254
+MAX_LOCAL_LENGTH = 64
+
+# Dot-atom local part (no leading, trailing or doubled dots) and a hostname
+# of LDH labels ending in an alphabetic or punycode TLD
+EMAIL_RE = re.compile(
+    r"(?P<local>[a-z0-9_%+-]+(?:\.[a-z0-9_%+-]+)*)"
+    r"@(?P<domain>(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+(?:[a-z]{2,63}|xn--[a-z0-9-]{1,59}))"
+)
+
+# Reasons returned by email_problem
+INVALID_FORMAT = 'format'
+DISPOSABLE_DOMAIN = 'disposable'
+
+# User-facing message per reason
+EMAIL_PROBLEM_MESSAGES = {
+    INVALID_FORMAT: 'Invalid email address format',
+    DISPOSABLE_DOMAIN: 'Please use a permanent email address, not a disposable one',
+}
+
+BLOCK = 'block'
+ALLOW = 'allow'
+
+# Key holding a node's rule; labels never contain '#', so it cannot clash
+_RULE = '#'
+
+
+class DomainTrie:
+    """
+    Domain rules keyed by reversed labels (com -> mailinator -> ...).
+
+    A lookup walks the address's labels from the TLD down and keeps the last
+    rule seen, so it costs one dict lookup per label however many rules are
+    loaded.
+    """
+
+    def __init__(self):
+        self.root: Dict[str, Any] = {}
+        self.size = 0
+
+    def add(self, domain: str, rule: str) -> None:
+        node = self.root
+        for label in reversed(domain.strip('.').lower().split('.')):
+            node = node.setdefault(label, {})
+        if _RULE not in node:
+            self.size += 1
+        node[_RULE] = rule
+
+    def lookup(self, domain: str) -> Optional[str]:
+        """Most specific rule covering a domain, or None."""
+        node = self.root
+        rule = None
+        for label in reversed(domain.split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            rule = node.get(_RULE, rule)
+        return rule
+
+
+def load_domain_rules(path: str = EMAIL_DOMAIN_RULES_PATH, blocked: str = EMAIL_BLOCKED_DOMAINS,
+                      allowed: str = EMAIL_ALLOWED_DOMAINS) -> DomainTrie:
+    """
+    Build the rule trie from a rule file plus comma-separated extras.
+
+    Args:
+        path: Rule file (one domain per line, '+' prefix to allow)
+        blocked: Extra domains to block
+        allowed: Extra domains to allow
+
+    Returns:
+        Populated DomainTrie (empty apart from the extras if the file is missing)
+    """
+    trie = DomainTrie()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if not line:
+                    continue
+                if line.startswith('+'):
+                    trie.add(line[1:], ALLOW)
+                else:
+                    trie.add(line, BLOCK)
+    except OSError as e:
+        print(f"⚠ Email domain rules not loaded ({e}); only format checks apply")
+    for domain in filter(None, (d.strip() for d in blocked.split(','))):
+        trie.add(domain, BLOCK)
+    for domain in filter(None, (d.strip() for d in allowed.split(','))):
+        trie.add(domain, ALLOW)
+    return trie
+
+
+_domain_rules: Optional[DomainTrie] = None
+_domain_rules_lock = threading.Lock()
+
+
+def domain_rules() -> DomainTrie:
+    """The process-wide rule trie, loaded on first use."""
+    global _domain_rules
+    if _domain_rules is None:
+        with _domain_rules_lock:
+            if _domain_rules is None:
+                _domain_rules = load_domain_rules()
+    return _domain_rules
+
+
+def normalize_email(email: Any) -> str:
+    """Trim and lowercase an address ('' for non-strings)."""
+    return email.strip().lower() if isinstance(email, str) else ''
+
+
+def _split(email: str) -> Optional[Tuple[str, str]]:
+    if len(email) > MAX_EMAIL_LENGTH:
+        return None
+    match = EMAIL_RE.fullmatch(email)
+    if match is None or len(match.group('local')) > MAX_LOCAL_LENGTH:
+        return None
+    return match.group('local'), match.group('domain')
+
+
+def is_valid_format(email: str) -> bool:
+    """True if a normalized address is well formed (no domain rules applied)."""
+    return _split(email) is not None
+
+
+def email_problem(email: str) -> Optional[str]:
+    """
+    Check a normalized address.
+
+    Args:
+        email: Address from normalize_email
+
+    Returns:
+        None if acceptable, INVALID_FORMAT or DISPOSABLE_DOMAIN otherwise
+    """
+    parts = _split(email)
+    if parts is None:
+        return INVALID_FORMAT
+    if domain_rules().lookup(parts[1]) == BLOCK:
+        return DISPOSABLE_DOMAIN
+    return None
+
+
+def validate_emails(emails: Iterable[str]) -> List[Optional[str]]:
+    """
+    Check many addresses for bulk paths (imports, migrations, mailings).
+
+    Addresses are normalized first. Domains repeat heavily in real lists, so
+    each distinct domain is looked up in the trie once per call.
+
+    Args:
+        emails: Raw addresses
+
+    Returns:
+        One email_problem result per address, in order
+    """
+    rules = domain_rules()
+    verdicts: Dict[str, Optional[str]] = {}
+    fullmatch = EMAIL_RE.fullmatch
+    problems: List[Optional[str]] = []
+    for email in emails:
+        email = normalize_email(email)
+        match = fullmatch(email) if len(email) <= MAX_EMAIL_LENGTH else None
+        if match is None or len(match.group('local')) > MAX_LOCAL_LENGTH:
+            problems.append(INVALID_FORMAT)
+            continue
+        domain = match.group('domain')
+        if domain not in verdicts:
+            verdicts[domain] = DISPOSABLE_DOMAIN if rules.lookup(domain) == BLOCK else None
+        problems.append(verdicts[domain])
+    return problems
@@ -0,0 +1,695 @@
+"""
+In-memory stand-in for google-cloud-firestore, for offline tooling.
+Implements the subset of the client API that firestore_service uses
+(documents, batches, transactions, get_all, filtered/ordered/paginated
+queries, count aggregations, exists preconditions on deletes and the
+SERVER_TIMESTAMP / Increment / DELETE_FIELD sentinels) with an optional per-RPC latency, a share of
+slow RPCs for tail latency, and injected transient errors. Ordered query
+results stay sorted between writes, so paging with start_after bisects to
+the cursor instead of rescanning the collection.
+
+Index hotspots can be modeled too: with configure_indexes() (or
+load_indexes() on firestore.indexes.json) and hotspot_writes_per_second
+set, a commit whose index entries land at the end of a key range that has
+already taken that many appends in the last second fails with Aborted,
+the way sequential index values cap Firestore's write rate. Likewise, with
+document_writes_per_second set, a commit writing a document that has
+already taken that many writes in the last second fails with Aborted (hot
+counters).
+
+Used by the traffic replay harness and benchmarks; never by deployed code:
+    import fake_firestore
+    fake_firestore.install(latency_ms=5)
+    import firestore_service  # now talks to the in-memory store
+"""
+
+import sys
+import json
+import bisect
+import time
+import random
+import types
+import uuid
+import threading
+from datetime import datetime, timezone
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+
+class AlreadyExists(Exception):
+    """Raised when create() targets an existing document."""
+
+
+class NotFound(Exception):
+    """Raised when update() targets a missing document."""
+
+
+class ServiceUnavailable(Exception):
+    """Injected transient error, like gRPC UNAVAILABLE; the RPC had no effect."""
+
+
+class Aborted(Exception):
+    """Write rejected for contention, like gRPC ABORTED; the commit had no effect."""
+
+
+class _Sentinel:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+SERVER_TIMESTAMP = _Sentinel('SERVER_TIMESTAMP')
+DELETE_FIELD = _Sentinel('DELETE_FIELD')
+
+
+class Increment:
+    """Numeric increment transform."""
+
+    def __init__(self, value: int):
+        self.value = value
+
+
+class _ExistsOption:
+    """Write precondition from Client.write_option(exists=...)."""
+
+    def __init__(self, exists: bool):
+        self.exists = exists
+
+
+class FieldFilter:
+    """Single-field query filter."""
+
+    def __init__(self, field_path: str, op_string: str, value: Any):
+        self.field_path = field_path
+        self.op_string = op_string
+        self.value = value
+
+
+_OPERATORS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    'in': lambda a, b: a in b,
+    'not-in': lambda a, b: a not in b,
+    'array_contains': lambda a, b: isinstance(a, list) and b in a,
+}
+
+
+class FakeStore:
+    """Shared document store with per-RPC latency and operation counters."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.slow_rate = 0.0
+        self.slow_latency = 0.0
+        self.error_rate = 0.0
+        self.rng = random.Random(0)
+        self.docs: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.lock = threading.RLock()
+        self.stats = {'reads': 0, 'writes': 0, 'queries': 0, 'commits': 0, 'faults': 0, 'contention': 0}
+        # Index hotspot model, per collection: fields exempt from single-field
+        # indexing and composite indexes (tuples of fields)
+        self.hotspot_writes_per_second = 0
+        self.document_writes_per_second = 0
+        self._document_writes: Dict[str, Deque[float]] = {}
+        self.index_exemptions: Dict[str, set] = {}
+        self.composite_indexes: Dict[str, List[Tuple[str, ...]]] = {}
+        # Highest key and recent append times per (collection, index, key prefix)
+        self._range_ends: Dict[Tuple, Tuple] = {}
+        self._appends: Dict[Tuple, Deque[float]] = {}
+        # Sorted matches per (collection, filters, orders), so paging through a
+        # query bisects to its cursor instead of rescanning the collection.
+        # Entries carry the collection's write version and size when built.
+        self._versions: Dict[str, int] = {}
+        self._sorted_queries: Dict[Tuple, Tuple[Tuple, List[Tuple], List[Tuple[str, Dict]]]] = {}
+
+    def rpc(self) -> None:
+        slow = self.slow_rate and self.rng.random() < self.slow_rate
+        delay = self.slow_latency if slow else self.latency
+        if delay:
+            time.sleep(delay)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            with self.lock:
+                self.stats['faults'] += 1
+            raise ServiceUnavailable('Injected transient error')
+
+    def collection(self, name: str) -> Dict[str, Dict[str, Any]]:
+        return self.docs.setdefault(name, {})
+
+    def configure_indexes(self, collection: str, exemptions: Tuple[str, ...] = (),
+                          composites: Tuple[Tuple[str, ...], ...] = ()) -> None:
+        """Model index hotspots for a collection (every other field gets a single-field index)."""
+        with self.lock:
+            self.index_exemptions[collection] = set(exemptions)
+            self.composite_indexes[collection] = [tuple(fields) for fields in composites]
+            self._range_ends.clear()
+            self._appends.clear()
+
+    def load_indexes(self, path: str) -> None:
+        """Model index hotspots for every collection group in a firestore.indexes.json file."""
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        groups = {index['collectionGroup'] for index in config.get('indexes', [])}
+        groups.update(override['collectionGroup'] for override in config.get('fieldOverrides', []))
+        for group in groups:
+            self.configure_indexes(
+                group,
+                exemptions=tuple(override['fieldPath'] for override in config.get('fieldOverrides', [])
+                                 if override['collectionGroup'] == group and not override.get('indexes')),
+                composites=tuple(tuple(field['fieldPath'] for field in index['fields'])
+                                 for index in config.get('indexes', []) if index['collectionGroup'] == group))
+
+    def _index_entries(self, collection: str, doc_id: str,
+                       data: Optional[Dict[str, Any]]) -> Dict[Tuple[str, ...], Tuple]:
+        # Index name -> key; keys end with the document ID, as in Firestore
+        entries: Dict[Tuple[str, ...], Tuple] = {}
+        if data is None:
+            return entries
+        for field, value in data.items():
+            if field not in self.index_exemptions[collection]:
+                entries[(field,)] = (_sort_key(value), (4, doc_id))
+        for fields in self.composite_indexes[collection]:
+            if all(field in data for field in fields):
+                entries[fields] = tuple(_sort_key(data[field]) for field in fields) + ((4, doc_id),)
+        return entries
+
+    def check_hotspots(self, changes: List[Tuple[str, str, Optional[Dict], Optional[Dict]]]) -> None:
+        """
+        Admit a commit's index writes, or raise Aborted if one would overload a key range.
+
+        An index entry sorting after everything already in its range (same
+        index, same leading values) is an append to that range's last
+        tablet. Other entries land at random positions and spread out.
+
+        Args:
+            changes: (collection, document ID, old data, new data) per written document
+        """
+        if not self.hotspot_writes_per_second:
+            return
+        now = time.monotonic()
+        appends: List[Tuple[Tuple, Tuple]] = []
+        for collection, doc_id, old, new in changes:
+            if collection not in self.index_exemptions:
+                continue
+            before = self._index_entries(collection, doc_id, old)
+            for index, key in self._index_entries(collection, doc_id, new).items():
+                if before.get(index) == key:
+                    continue  # Unchanged entries are not rewritten
+                prefix = key[:len(index) - 1]
+                range_id = (collection, index, prefix)
+                end = self._range_ends.get(range_id)
+                if end is None or key[len(index) - 1:] > end:
+                    appends.append((range_id, key[len(index) - 1:]))
+        per_range: Dict[Tuple, int] = {}
+        for range_id, _ in appends:
+            per_range[range_id] = per_range.get(range_id, 0) + 1
+        for range_id, count in per_range.items():
+            recent = self._appends.setdefault(range_id, deque())
+            while recent and now - recent[0] >= 1.0:
+                recent.popleft()
+            if len(recent) + count > self.hotspot_writes_per_second:
+                self.stats['contention'] += 1
+                raise Aborted(f"Too much contention on index {'/'.join(range_id[1])} of {range_id[0]}")
+        for range_id, tail in appends:
+            self._appends[range_id].append(now)
+            self._range_ends[range_id] = max(tail, self._range_ends.get(range_id, tail))
+
+    def check_document_rates(self, paths: List[str]) -> None:
+        """Admit a commit's document writes, or raise Aborted if a document is written too often."""
+        if not self.document_writes_per_second:
+            return
+        now = time.monotonic()
+        for path in paths:
+            recent = self._document_writes.setdefault(path, deque())
+            while recent and now - recent[0] >= 1.0:
+                recent.popleft()
+            if len(recent) >= self.document_writes_per_second:
+                self.stats['contention'] += 1
+                raise Aborted(f"Too much contention on document {path}")
+        for path in paths:
+            self._document_writes[path].append(now)
+
+    def sorted_matches(self, query_key: Tuple, collection: str,
+                       build: Any) -> Tuple[List[Tuple], List[Tuple[str, Dict[str, Any]]]]:
+        """
+        Get a query's (order keys, rows) in ascending order, building them at most once per write.
+
+        Callers hold self.lock. Writes through a batch bump the collection's
+        version; documents seeded straight into collection() are caught by
+        the size check as long as they are added before querying.
+        """
+        documents = self.collection(collection)
+        version = (self._versions.get(collection, 0), len(documents))
+        cached = self._sorted_queries.get(query_key)
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+        keys, rows = build(documents)
+        if len(self._sorted_queries) >= MAX_SORTED_QUERIES:
+            # Drop the oldest; one-off filters (e.g. position counts) never repeat
+            del self._sorted_queries[next(iter(self._sorted_queries))]
+        self._sorted_queries[query_key] = (version, keys, rows)
+        return keys, rows
+
+    def reset(self) -> None:
+        with self.lock:
+            self.docs.clear()
+            self._versions.clear()
+            self._sorted_queries.clear()
+            self._document_writes.clear()
+            self._range_ends.clear()
+            self._appends.clear()
+            for key in self.stats:
+                self.stats[key] = 0
+
+
+# Every Client() shares this store, like clients of one real database
+store = FakeStore()
+
+# Sorted query results kept by FakeStore.sorted_matches
+MAX_SORTED_QUERIES = 64
+
+# Sorts after every _sort_key(), so a value cursor + (_KEY_MAX,) bounds all keys it prefixes
+_KEY_MAX = (6,)
+
+
+def _resolve(value: Any, current: Any) -> Any:
+    if value is SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(value, Increment):
+        return (current if isinstance(current, (int, float)) else 0) + value.value
+    return value
+
+
+def _apply(existing: Optional[Dict[str, Any]], data: Dict[str, Any], merge: bool) -> Dict[str, Any]:
+    base = dict(existing) if (merge and existing) else {}
+    for field, value in data.items():
+        if value is DELETE_FIELD:
+            base.pop(field, None)
+        else:
+            base[field] = _resolve(value, (existing or {}).get(field))
+    return base
+
+
+class DocumentSnapshot:
+    """Read result for one document."""
+
+    def __init__(self, reference: 'DocumentReference', data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+
+class DocumentReference:
+    """Reference to one document."""
+
+    def __init__(self, client: 'Client', collection: str, doc_id: str):
+        self._client = client
+        self._collection = collection
+        self.id = doc_id
+        self.path = f"{collection}/{doc_id}"
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        data = self._client._store.collection(self._collection).get(self.id)
+        return dict(data) if data is not None else None
+
+    def get(self, field_paths: Optional[List[str]] = None, transaction: Any = None) -> DocumentSnapshot:
+        store_ = self._client._store
+        store_.rpc()
+        with store_.lock:
+            store_.stats['reads'] += 1
+            data = self._read()
+        if data is not None and field_paths:
+            data = {k: v for k, v in data.items() if k in field_paths}
+        return DocumentSnapshot(self, data)
+
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        batch = self._client.batch()
+        batch.set(self, data, merge=merge)
+        batch.commit()
+
+    def create(self, data: Dict[str, Any]) -> None:
+        batch = self._client.batch()
+        batch.create(self, data)
+        batch.commit()
+
+    def update(self, data: Dict[str, Any]) -> None:
+        batch = self._client.batch()
+        batch.update(self, data)
+        batch.commit()
+
+    def delete(self) -> None:
+        batch = self._client.batch()
+        batch.delete(self)
+        batch.commit()
+
+
+class WriteBatch:
+    """Atomic group of writes, applied together on commit()."""
+
+    def __init__(self, client: 'Client'):
+        self._client = client
+        self._writes: List[Tuple[str, DocumentReference, Any, bool]] = []
+
+    def create(self, reference: DocumentReference, data: Dict[str, Any]) -> None:
+        self._writes.append(('create', reference, data, False))
+
+    def set(self, reference: DocumentReference, data: Dict[str, Any], merge: bool = False) -> None:
+        self._writes.append(('set', reference, data, merge))
+
+    def update(self, reference: DocumentReference, data: Dict[str, Any]) -> None:
+        self._writes.append(('update', reference, data, True))
+
+    def delete(self, reference: DocumentReference, option: Optional[_ExistsOption] = None) -> None:
+        self._writes.append(('delete', reference, option, False))
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def commit(self) -> List[Any]:
+        store_ = self._client._store
+        if len(self._writes) > 500:
+            raise ValueError('A batch can contain at most 500 writes')
+        store_.rpc()
+        with store_.lock:
+            # Validate first so a failing batch applies nothing
+            staged: Dict[str, Optional[Dict[str, Any]]] = {}
+            for op, reference, data, merge in self._writes:
+                current = staged[reference.path] if reference.path in staged else reference._read()
+                if op == 'create' and current is not None:
+                    raise AlreadyExists(f"Document already exists: {reference.path}")
+                if op == 'update' and current is None:
+                    raise NotFound(f"No document to update: {reference.path}")
+                if op == 'delete' and data is not None and data.exists and current is None:
+                    raise NotFound(f"No document to delete: {reference.path}")
+                staged[reference.path] = None if op == 'delete' else _apply(current, data, merge)
+            store_.check_document_rates(list(staged))
+            store_.check_hotspots([
+                (reference._collection, reference.id, reference._read(), staged[reference.path])
+                for reference in {reference.path: reference for _, reference, _, _ in self._writes}.values()
+            ])
+            for op, reference, _, _ in self._writes:
+                documents = store_.collection(reference._collection)
+                result = staged[reference.path]
+                if result is None:
+                    documents.pop(reference.id, None)
+                else:
+                    documents[reference.id] = result
+                store_._versions[reference._collection] = store_._versions.get(reference._collection, 0) + 1
+            store_.stats['writes'] += len(self._writes)
+            store_.stats['commits'] += 1
+        self._writes = []
+        return []
+
+
+class Transaction(WriteBatch):
+    """
+    Read-write transaction.
+
+    Run through transactional(), which holds the store lock from the first
+    read to the commit; that serializes transactions the way the server's
+    pessimistic locks do for conflicting ones.
+    """
+
+
+class _Transactional:
+    def __init__(self, to_wrap):
+        self.to_wrap = to_wrap
+
+    def __call__(self, transaction: Transaction, *args, **kwargs) -> Any:
+        with transaction._client._store.lock:
+            transaction._writes = []
+            result = self.to_wrap(transaction, *args, **kwargs)
+            transaction.commit()
+        return result
+
+
+def transactional(to_wrap) -> _Transactional:
+    """Decorator running a function (taking the transaction first) as one transaction."""
+    return _Transactional(to_wrap)
+
+
+class _AggregationResult:
+    def __init__(self, alias: str, value: int):
+        self.alias = alias
+        self.value = value
+
+
+class _CountQuery:
+    def __init__(self, query: 'Query', alias: str):
+        self._query = query
+        self._alias = alias
+
+    def get(self) -> List[List[_AggregationResult]]:
+        return [[_AggregationResult(self._alias, sum(1 for _ in self._query._run(count_only=True)))]]
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    # Firestore orders values by type first, then by value
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (3, value.timestamp())
+    if isinstance(value, str):
+        return (4, value)
+    return (5, str(value))
+
+
+class Query:
+    """Immutable query over one collection."""
+
+    ASCENDING = 'ASCENDING'
+    DESCENDING = 'DESCENDING'
+
+    def __init__(self, client: 'Client', collection: str, filters: Tuple = (), orders: Tuple = (),
+                 limit_: Optional[int] = None, cursor: Any = None, fields: Optional[List[str]] = None):
+        self._client = client
+        self._collection = collection
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit_
+        self._cursor = cursor
+        self._fields = fields
+
+    def _copy(self, **changes) -> 'Query':
+        values = {
+            'filters': self._filters, 'orders': self._orders, 'limit_': self._limit,
+            'cursor': self._cursor, 'fields': self._fields,
+        }
+        values.update(changes)
+        return Query(self._client, self._collection, **values)
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None,
+              value: Any = None, filter: Optional[FieldFilter] = None) -> 'Query':
+        if filter is None:
+            filter = FieldFilter(field_path, op_string, value)
+        return self._copy(filters=self._filters + (filter,))
+
+    def order_by(self, field_path: str, direction: str = 'ASCENDING') -> 'Query':
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count: int) -> 'Query':
+        return self._copy(limit_=count)
+
+    def start_after(self, document_fields_or_snapshot: Any) -> 'Query':
+        return self._copy(cursor=document_fields_or_snapshot)
+
+    def select(self, field_paths: List[str]) -> 'Query':
+        return self._copy(fields=list(field_paths))
+
+    def count(self, alias: str = 'count') -> _CountQuery:
+        return _CountQuery(self, alias)
+
+    def _order_key(self, doc_id: str, data: Dict[str, Any]) -> Tuple:
+        return tuple(_sort_key(data.get(field)) for field, _ in self._orders) + ((4, doc_id),)
+
+    def _matching_rows(self, documents: Dict[str, Dict[str, Any]]) -> Tuple[List[Tuple], List[Tuple]]:
+        rows = []
+        for doc_id, data in documents.items():
+            if any(f.field_path not in data or not _matches(f, data[f.field_path]) for f in self._filters):
+                continue
+            if any(field not in data for field, _ in self._orders):
+                continue
+            rows.append((self._order_key(doc_id, data), doc_id, data))
+        rows.sort(key=lambda row: row[0])
+        return [row[0] for row in rows], [row[1:] for row in rows]
+
+    def _query_key(self) -> Tuple:
+        filters = tuple((f.field_path, f.op_string, tuple(f.value) if isinstance(f.value, list) else f.value)
+                        for f in self._filters)
+        return (self._collection, filters, self._orders)
+
+    def _run(self, count_only: bool = False) -> Iterator[DocumentSnapshot]:
+        store_ = self._client._store
+        store_.rpc()
+        with store_.lock:
+            store_.stats['queries'] += 1
+            keys, rows = store_.sorted_matches(self._query_key(), self._collection, self._matching_rows)
+
+            # Rows are ascending; a descending query reads the slice before its cursor backwards
+            descending = bool(self._orders) and self._orders[0][1] == self.DESCENDING
+            start, end = 0, len(rows)
+            if self._cursor is not None:
+                if isinstance(self._cursor, DocumentSnapshot):
+                    cursor_key = self._order_key(self._cursor.id, self._cursor.to_dict() or {})
+                    if descending:
+                        end = bisect.bisect_left(keys, cursor_key)
+                    else:
+                        start = bisect.bisect_right(keys, cursor_key)
+                else:
+                    cursor_key = tuple(_sort_key(self._cursor.get(field)) for field, _ in self._orders)
+                    if descending:
+                        end = bisect.bisect_left(keys, cursor_key)
+                    else:
+                        start = bisect.bisect_left(keys, cursor_key + (_KEY_MAX,))
+            if self._limit is not None:
+                if descending:
+                    start = max(start, end - self._limit)
+                else:
+                    end = min(end, start + self._limit)
+            rows = rows[start:end]
+            if descending:
+                rows.reverse()
+            if not count_only:
+                store_.stats['reads'] += len(rows)
+            results = []
+            for doc_id, data in rows:
+                if self._fields is not None:
+                    data = {k: v for k, v in data.items() if k in self._fields}
+                results.append(DocumentSnapshot(DocumentReference(self._client, self._collection, doc_id),
+                                                dict(data)))
+        return iter(results)
+
+    def stream(self, transaction: Any = None) -> Iterator[DocumentSnapshot]:
+        return self._run()
+
+    def get(self, transaction: Any = None) -> List[DocumentSnapshot]:
+        return list(self._run())
+
+
+def _matches(filter_: FieldFilter, value: Any) -> bool:
+    try:
+        return _OPERATORS[filter_.op_string](value, filter_.value)
+    except TypeError:
+        return False
+
+
+class CollectionReference(Query):
+    """Reference to a top-level collection."""
+
+    def __init__(self, client: 'Client', name: str):
+        super().__init__(client, name)
+        self.id = name
+
+    def document(self, document_id: Optional[str] = None) -> DocumentReference:
+        return DocumentReference(self._client, self._collection, document_id or uuid.uuid4().hex[:20])
+
+    def add(self, data: Dict[str, Any]) -> Tuple[None, DocumentReference]:
+        reference = self.document()
+        reference.create(data)
+        return None, reference
+
+
+class Client:
+    """Synchronous client over the shared in-memory store."""
+
+    def __init__(self, *args, **kwargs):
+        self._store = store
+
+    def collection(self, name: str) -> CollectionReference:
+        return CollectionReference(self, name)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def transaction(self) -> Transaction:
+        return Transaction(self)
+
+    @staticmethod
+    def write_option(exists: bool) -> _ExistsOption:
+        return _ExistsOption(exists)
+
+    def get_all(self, references: List[DocumentReference],
+                field_paths: Optional[List[str]] = None) -> Iterator[DocumentSnapshot]:
+        self._store.rpc()
+        with self._store.lock:
+            self._store.stats['reads'] += len(references)
+            snapshots = []
+            for reference in references:
+                data = reference._read()
+                if data is not None and field_paths:
+                    data = {k: v for k, v in data.items() if k in field_paths}
+                snapshots.append(DocumentSnapshot(reference, data))
+        return iter(snapshots)
+
+
+def _module(name: str, **attributes) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+
+def install(latency_ms: float = 0.0, slow_rate: float = 0.0, slow_ms: float = 0.0,
+            error_rate: float = 0.0, hotspot_writes_per_second: int = 0,
+            document_writes_per_second: int = 0) -> FakeStore:
+    """
+    Make `google.cloud.firestore` (and the imports firestore_service uses) resolve to this module.
+
+    Must run before firestore_service is imported.
+
+    Args:
+        latency_ms: Simulated round trip added to every RPC
+        slow_rate: Share of RPCs that take slow_ms instead
+        slow_ms: Round trip of a slow RPC
+        error_rate: Share of RPCs that fail with ServiceUnavailable before taking effect
+        hotspot_writes_per_second: Appends one index key range accepts per second
+            (0 disables the model; see configure_indexes)
+        document_writes_per_second: Writes one document accepts per second (0 disables)
+
+    Returns:
+        The shared store, for inspection and stats
+    """
+    store.latency = latency_ms / 1000.0
+    store.slow_rate = slow_rate
+    store.slow_latency = slow_ms / 1000.0
+    store.error_rate = error_rate
+    store.hotspot_writes_per_second = hotspot_writes_per_second
+    store.document_writes_per_second = document_writes_per_second
+    firestore_module = _module(
+        'google.cloud.firestore', Client=Client, Query=Query, SERVER_TIMESTAMP=SERVER_TIMESTAMP,
+        DELETE_FIELD=DELETE_FIELD, Increment=Increment, FieldFilter=FieldFilter,
+        transactional=transactional, Transaction=Transaction)
+    modules = {
+        'google.cloud.firestore': firestore_module,
+        'google.cloud.firestore_v1': _module('google.cloud.firestore_v1'),
+        'google.cloud.firestore_v1.base_query': _module('google.cloud.firestore_v1.base_query',
+                                                        FieldFilter=FieldFilter),
+        'google.api_core.exceptions': _module('google.api_core.exceptions',
+                                              AlreadyExists=AlreadyExists, NotFound=NotFound,
+                                              ServiceUnavailable=ServiceUnavailable, Aborted=Aborted),
+    }
+    for parent in ('google', 'google.cloud', 'google.api_core'):
+        if parent not in sys.modules:
+            try:
+                __import__(parent)
+            except ImportError:
+                sys.modules[parent] = _module(parent)
+    sys.modules.update(modules)
+    sys.modules['google.cloud'].firestore = firestore_module
+    sys.modules['google.api_core'].exceptions = modules['google.api_core.exceptions']
+    return store
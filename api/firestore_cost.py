@@ -0,0 +1,250 @@
+"""
+Firestore cost accounting.
+Firestore bills per document read, write and delete, so every Firestore call
+in firestore_service records what it cost here, per operation. Handlers
+wrapped with track_firestore_cost also get a per-request total: it is added
+to the per-endpoint metrics, checked against FIRESTORE_READ_BUDGET, and
+outside production returned as X-Firestore-* response headers.
+
+Billing rules mirrored here:
+- a document get is one read, found or not
+- a query is one read per document returned, and at least one
+- a count aggregation is one read per 1000 index entries, and at least one
+- every write in a batch or transaction is a write (transforms included)
+
+Usage:
+    count_reads('get_waitlist_entry')
+    docs = counted_stream('get_all_waitlist_entries', query.stream())
+
+    @track_firestore_cost
+    def handler(request):
+        ...
+"""
+
+import os
+import asyncio
+import threading
+import functools
+import contextvars
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+
+# Log a request that reads more documents than this (0 disables the guard)
+FIRESTORE_READ_BUDGET = int(os.environ.get('FIRESTORE_READ_BUDGET', '100'))
+
+# Deployment environment. Unset counts as production, so debug headers are
+# only sent where an environment says otherwise (e.g. VERCEL_ENV=preview).
+APP_ENV = (os.environ.get('APP_ENV') or os.environ.get('VERCEL_ENV') or 'production').lower()
+
+# X-Firestore-* response headers outside production (FIRESTORE_COST_HEADERS=0 turns them off)
+COST_HEADERS_ENABLED = APP_ENV != 'production' and os.environ.get('FIRESTORE_COST_HEADERS', '1') != '0'
+
+# Index entries covered by one billed read of a count aggregation
+AGGREGATION_ENTRIES_PER_READ = 1000
+
+COUNTERS = ('reads', 'streamed', 'writes', 'deletes')
+
+COST_HEADERS = ('X-Firestore-Reads', 'X-Firestore-Writes', 'X-Firestore-Deletes', 'X-Firestore-Ops')
+
+
+class Cost:
+    """Counters per operation name."""
+
+    def __init__(self):
+        self.operations: Dict[str, Dict[str, int]] = {}
+
+    def add(self, operation: str, reads: int = 0, streamed: int = 0, writes: int = 0, deletes: int = 0) -> None:
+        counts = self.operations.get(operation)
+        if counts is None:
+            counts = self.operations[operation] = {'calls': 0, 'reads': 0, 'streamed': 0, 'writes': 0, 'deletes': 0}
+        counts['calls'] += 1
+        counts['reads'] += reads
+        counts['streamed'] += streamed
+        counts['writes'] += writes
+        counts['deletes'] += deletes
+
+    def total(self, counter: str) -> int:
+        return sum(counts[counter] for counts in self.operations.values())
+
+    def summary(self) -> str:
+        """Compact per-operation breakdown, e.g. 'get_waitlist_entry=2r,add_waitlist_entry=1r4w'."""
+        parts = []
+        for operation, counts in sorted(self.operations.items()):
+            cost = ''.join(f"{counts[counter]}{counter[0]}" for counter in ('reads', 'writes', 'deletes')
+                           if counts[counter])
+            parts.append(f"{operation}={cost or '0r'}")
+        return ','.join(parts)
+
+
+_current: contextvars.ContextVar[Optional[Cost]] = contextvars.ContextVar('firestore_cost', default=None)
+
+# Process-wide totals per operation and per endpoint
+_lock = threading.Lock()
+_operations = Cost()
+_endpoints: Dict[str, Dict[str, int]] = {}
+_since = datetime.now(timezone.utc).isoformat()
+
+
+def _record(operation: str, reads: int = 0, streamed: int = 0, writes: int = 0, deletes: int = 0) -> None:
+    with _lock:
+        _operations.add(operation, reads, streamed, writes, deletes)
+    request_cost = _current.get()
+    if request_cost is not None:
+        request_cost.add(operation, reads, streamed, writes, deletes)
+
+
+def count_reads(operation: str, documents: int = 1) -> None:
+    """Record document gets (one billed read each, found or not)."""
+    _record(operation, reads=documents)
+
+
+def count_query(operation: str, documents: int) -> None:
+    """Record a query that returned this many documents."""
+    _record(operation, reads=max(1, documents), streamed=documents)
+
+
+def count_aggregation(operation: str, matched: int) -> None:
+    """Record a count aggregation over this many index entries."""
+    _record(operation, reads=max(1, -(-matched // AGGREGATION_ENTRIES_PER_READ)))
+
+
+def count_writes(operation: str, writes: int = 1, deletes: int = 0) -> None:
+    """Record committed writes and deletes."""
+    _record(operation, writes=writes, deletes=deletes)
+
+
+def counted_stream(operation: str, documents: Iterable[Any]) -> Iterator[Any]:
+    """
+    Pass a query stream through, recording the documents it yielded.
+
+    The count is recorded when the stream ends or is abandoned, so a caller
+    that stops early is billed only for what was fetched.
+    """
+    streamed = 0
+    try:
+        for document in documents:
+            streamed += 1
+            yield document
+    finally:
+        count_query(operation, streamed)
+
+
+def _finish(endpoint: str, request_cost: Cost) -> None:
+    reads = request_cost.total('reads')
+    over_budget = bool(FIRESTORE_READ_BUDGET) and reads > FIRESTORE_READ_BUDGET
+    with _lock:
+        totals = _endpoints.get(endpoint)
+        if totals is None:
+            totals = _endpoints[endpoint] = {'requests': 0, 'reads': 0, 'streamed': 0, 'writes': 0, 'deletes': 0,
+                                             'max_reads': 0, 'over_budget': 0}
+        totals['requests'] += 1
+        for counter in COUNTERS:
+            totals[counter] += request_cost.total(counter)
+        totals['max_reads'] = max(totals['max_reads'], reads)
+        totals['over_budget'] += over_budget
+    if over_budget:
+        print(f"⚠ {endpoint} read {reads} Firestore documents (budget {FIRESTORE_READ_BUDGET}): "
+              f"{request_cost.summary()}")
+
+
+def cost_headers(request_cost: Cost) -> Dict[str, str]:
+    """Debug headers describing a request's Firestore cost."""
+    return {
+        'X-Firestore-Reads': str(request_cost.total('reads')),
+        'X-Firestore-Writes': str(request_cost.total('writes')),
+        'X-Firestore-Deletes': str(request_cost.total('deletes')),
+        'X-Firestore-Ops': request_cost.summary(),
+        # Lets the site's own scripts read the headers cross-origin
+        'Access-Control-Expose-Headers': ', '.join(COST_HEADERS),
+    }
+
+
+def _attach_headers(response: Any, headers: Dict[str, str]) -> None:
+    """Add headers to a Vercel-style dict, a (body, status, headers) tuple or a Flask response."""
+    if isinstance(response, dict):
+        response.setdefault('headers', {}).update(headers)
+    elif isinstance(response, tuple):
+        if len(response) > 2 and isinstance(response[2], dict):
+            response[2].update(headers)
+    elif hasattr(response, 'headers'):
+        response.headers.update(headers)
+
+
+def track_firestore_cost(handler):
+    """
+    Decorator giving each call of a handler (sync or async) its own Firestore cost.
+
+    A call made while another tracked call is running is part of that
+    request and is not tracked separately.
+    """
+    endpoint = handler.__name__
+
+    if asyncio.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def async_wrapper(*args, **kwargs):
+            if _current.get() is not None:
+                return await handler(*args, **kwargs)
+            request_cost = Cost()
+            token = _current.set(request_cost)
+            try:
+                response = await handler(*args, **kwargs)
+            finally:
+                _current.reset(token)
+                _finish(endpoint, request_cost)
+            if COST_HEADERS_ENABLED:
+                _attach_headers(response, cost_headers(request_cost))
+            return response
+        return async_wrapper
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        if _current.get() is not None:
+            return handler(*args, **kwargs)
+        request_cost = Cost()
+        token = _current.set(request_cost)
+        try:
+            response = handler(*args, **kwargs)
+        finally:
+            _current.reset(token)
+            _finish(endpoint, request_cost)
+        if COST_HEADERS_ENABLED:
+            _attach_headers(response, cost_headers(request_cost))
+        return response
+    return wrapper
+
+
+def current_cost() -> Optional[Cost]:
+    """Cost of the request being handled, or None outside a tracked handler."""
+    return _current.get()
+
+
+def cost_metrics() -> Dict[str, Any]:
+    """
+    Process-wide Firestore cost since start (or the last reset).
+
+    Returns:
+        Dict with per-operation and per-endpoint counters, the per-endpoint
+        average reads per request, and the configured read budget
+    """
+    with _lock:
+        operations = {name: dict(counts) for name, counts in sorted(_operations.operations.items())}
+        endpoints = {name: dict(totals) for name, totals in sorted(_endpoints.items())}
+    for totals in endpoints.values():
+        totals['reads_per_request'] = round(totals['reads'] / totals['requests'], 2) if totals['requests'] else 0
+    return {
+        'since': _since,
+        'read_budget': FIRESTORE_READ_BUDGET,
+        'totals': {counter: sum(counts[counter] for counts in operations.values()) for counter in COUNTERS},
+        'operations': operations,
+        'endpoints': endpoints,
+    }
+
+
+def reset_cost_metrics() -> None:
+    """Clear the process-wide counters (benchmarks and tests)."""
+    global _operations, _since
+    with _lock:
+        _operations = Cost()
+        _endpoints.clear()
+        _since = datetime.now(timezone.utc).isoformat()
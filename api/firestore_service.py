@@ -4,21 +4,81 @@ Provides abstraction layer for Firestore operations with JSON fallback.
 """
 
 import os
-import json
+import zlib
+import heapq
+import random
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple, Iterator
 
 try:
     from google.cloud import firestore
+    from google.cloud.firestore_v1.base_query import FieldFilter
+    from google.api_core.exceptions import AlreadyExists, NotFound
     FIRESTORE_AVAILABLE = True
 except ImportError:
     FIRESTORE_AVAILABLE = False
     print("⚠ Firestore library not available. Install: pip install google-cloud-firestore")
 
 
+from waitlist_entry import WaitlistEntryBatch
+from retry import with_retry
+from firestore_cost import count_reads, count_query, count_aggregation, count_writes, counted_stream
+from email_validation import validate_emails
+from referrals import (
+    REFERRAL_LEADERBOARD_SIZE,
+    referral_code_for,
+    mask_email,
+    merge_leaderboard
+)
+
+
 # Firestore collection name
 COLLECTION_NAME = 'waitlist'
 
+# Pre-aggregated signup counts, one document per time bucket
+ROLLUP_COLLECTIONS = {
+    'hour': 'waitlist_rollups_hourly',
+    'day': 'waitlist_rollups_daily',
+}
+
+# Per-domain signup counts, one counter per email domain
+DOMAIN_COLLECTION = 'waitlist_domains'
+
+# Rollup buckets and domain counts are sharded counters. Every signup in the
+# same hour (and most from the same domain) would otherwise increment one
+# document, which Firestore sustains at about one write per second, and since
+# the increments share the signup's batch, a contended counter fails the
+# signup. Each increment goes to one of COUNTER_SHARDS documents at random;
+# shard 0 keeps the plain ID (bucket ID or domain), so counts written before
+# sharding stay valid, and readers sum the shards.
+COUNTER_SHARDS = max(1, int(os.environ.get('WAITLIST_COUNTER_SHARDS', '16')))
+
+# Precomputed leaderboards, one document each; reading one is a single fetch
+LEADERBOARD_COLLECTION = 'waitlist_leaderboards'
+REFERRAL_LEADERBOARD_DOC = 'referrals'
+
+# Entries carry order_shard, a stable hash of the email. created_at and
+# timestamp only ever grow, so an index on either alone puts every new
+# signup's entry at the end of one key range, which Firestore serves from a
+# single tablet (about 500 writes/s). firestore.indexes.json exempts them and
+# indexes (order_shard, created_at) instead, so writes append to ORDER_SHARDS
+# ranges and created_at-ordered reads merge one query per shard. Changing the
+# shard count needs backfill_order_shards.py; 30 is the limit of an 'in' filter.
+MAX_ORDER_SHARDS = 30
+ORDER_SHARDS = max(1, min(int(os.environ.get('WAITLIST_ORDER_SHARDS', '16')), MAX_ORDER_SHARDS))
+
+# Set once backfill_order_shards.py has run for the current shard count. Until
+# then entries written before order_shard existed would be invisible to
+# shard-filtered queries, so created_at-ordered reads stay unsharded (and need
+# the single-field created_at index, so deploy the fieldOverrides after this).
+ORDER_SHARDS_READY = os.environ.get('WAITLIST_ORDER_SHARDS_READY', '').lower() in ('1', 'true', 'yes')
+
+# Default page size for admin search
+SEARCH_PAGE_SIZE = 50
+
+# Maximum number of writes in a single Firestore batch
+MAX_BATCH_WRITES = 500
+
 
 def get_firestore_client() -> Optional[Any]:
     """
@@ -41,13 +101,255 @@ def get_firestore_client() -> Optional[Any]:
         return None
 
 
-def add_waitlist_entry(email: str, ip: str = 'unknown') -> bool:
+class BatchWriter:
+    """
+    Accumulates writes into Firestore batches, committing every MAX_BATCH_WRITES.
+    
+    Use as a context manager so the final partial batch is committed.
+    Committed writes and deletes are accounted under operation.
+    """
+    
+    def __init__(self, client: Any, max_writes: int = MAX_BATCH_WRITES, operation: str = 'batch_write'):
+        self.client = client
+        self.max_writes = max_writes
+        self.operation = operation
+        self.batch = client.batch()
+        self.pending = 0
+        self.pending_deletes = 0
+        self.committed = 0
+    
+    def create(self, doc_ref: Any, data: Dict[str, Any]) -> None:
+        self.batch.create(doc_ref, data)
+        self._added()
+    
+    def set(self, doc_ref: Any, data: Dict[str, Any], merge: bool = False) -> None:
+        self.batch.set(doc_ref, data, merge=merge)
+        self._added()
+    
+    def update(self, doc_ref: Any, data: Dict[str, Any]) -> None:
+        self.batch.update(doc_ref, data)
+        self._added()
+    
+    def delete(self, doc_ref: Any) -> None:
+        self.batch.delete(doc_ref)
+        self.pending_deletes += 1
+        self._added()
+    
+    def reserve(self, writes: int) -> None:
+        """Commit first if a group of writes would not fit in the current batch."""
+        if self.pending + writes > self.max_writes:
+            self.commit()
+    
+    def commit(self) -> None:
+        """Commit any pending writes."""
+        if self.pending:
+            with_retry(self.batch.commit)
+            count_writes(self.operation, self.pending - self.pending_deletes, self.pending_deletes)
+            self.committed += self.pending
+            self.batch = self.client.batch()
+            self.pending = 0
+            self.pending_deletes = 0
+    
+    def discard(self) -> None:
+        """Drop pending writes without committing them (e.g. after a failed commit)."""
+        self.batch = self.client.batch()
+        self.pending = 0
+        self.pending_deletes = 0
+    
+    def _added(self) -> None:
+        self.pending += 1
+        if self.pending >= self.max_writes:
+            self.commit()
+    
+    def __enter__(self) -> 'BatchWriter':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+
+
+def rollup_buckets(created_at: str) -> List[Tuple[str, str, str]]:
+    """
+    Get the rollup buckets a signup time falls into.
+    
+    Args:
+        created_at: ISO timestamp of the signup
+    
+    Returns:
+        List of (granularity, bucket document ID, bucket start ISO string)
+    """
+    created = datetime.fromisoformat(created_at)
+    hour_start = created.replace(minute=0, second=0, microsecond=0)
+    day_start = hour_start.replace(hour=0)
+    return [
+        ('hour', hour_start.strftime('%Y%m%d%H'), hour_start.isoformat()),
+        ('day', day_start.strftime('%Y%m%d'), day_start.isoformat()),
+    ]
+
+
+def counter_doc_id(key: str, shard: int) -> str:
+    """Get the document ID of one shard of a counter (shard 0 is the key itself)."""
+    return key if shard == 0 else f"{key}~{shard}"
+
+
+def counter_key(doc_id: str) -> str:
+    """Get the counter key (bucket ID or domain) a shard document belongs to."""
+    return doc_id.partition('~')[0]
+
+
+def add_bucket_increment(client: Any, batch: Any, granularity: str, bucket_id: str,
+                         bucket_start: str, amount: int = 1) -> None:
+    """
+    Add an increment of one rollup bucket, on a random shard, to a write batch.
+    
+    Args:
+        client: Firestore client
+        batch: Write batch the increment is added to
+        granularity: 'hour' or 'day'
+        bucket_id: Bucket document ID from rollup_buckets
+        bucket_start: Bucket start ISO string
+        amount: Amount to add (negative to remove)
+    """
+    shard_id = counter_doc_id(bucket_id, random.randrange(COUNTER_SHARDS))
+    batch.set(client.collection(ROLLUP_COLLECTIONS[granularity]).document(shard_id), {
+        'bucket_start': bucket_start,
+        'count': firestore.Increment(amount)
+    }, merge=True)
+
+
+def add_rollup_increments(client: Any, batch: Any, created_at: str, amount: int = 1) -> None:
+    """
+    Add the rollup bucket increments for a signup to a write batch.
+    
+    Args:
+        client: Firestore client
+        batch: Write batch the increments are added to
+        created_at: ISO timestamp of the signup
+        amount: Amount to add to each bucket (negative to remove)
+    """
+    for granularity, bucket_id, bucket_start in rollup_buckets(created_at):
+        add_bucket_increment(client, batch, granularity, bucket_id, bucket_start, amount)
+
+
+def email_domain(email: str) -> str:
+    """Get the lowercased domain part of an email address."""
+    return email.rpartition('@')[2].lower()
+
+
+def order_shard(email: str) -> int:
+    """Get the ordering shard of an email (the same in every process and on retries)."""
+    return zlib.crc32(email.lower().encode('utf-8')) % ORDER_SHARDS
+
+
+def iter_waitlist_by_created(client: Any, start: Optional[str] = None, end: Optional[str] = None,
+                             descending: bool = False, page_size: int = 500,
+                             fields: Optional[List[str]] = None,
+                             operation: str = 'iter_waitlist_by_created') -> Iterator[Any]:
+    """
+    Iterate over entries in created_at order, k-way merging the order shards.
+    
+    Each shard is its own created_at-ordered query, fetched a page at a time
+    and continued from the page's last document; heapq.merge interleaves
+    the shards, so at most one page per shard is held in memory. Until
+    ORDER_SHARDS_READY is set this is a single unsharded query instead.
+    
+    Args:
+        client: Firestore client
+        start: Inclusive created_at lower bound (optional)
+        end: Exclusive created_at upper bound (optional)
+        descending: Newest first
+        page_size: Entries per shard query
+        fields: Fields to fetch (optional, defaults to all; created_at is always fetched)
+        operation: Name the reads are accounted under
+    
+    Returns:
+        Iterator of document snapshots
+    """
+    if fields is not None and 'created_at' not in fields:
+        fields = list(fields) + ['created_at']
+    direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+    
+    def shard_docs(shard: Optional[int]) -> Iterator[Any]:
+        query = client.collection(COLLECTION_NAME)
+        if shard is not None:
+            query = query.where(filter=FieldFilter('order_shard', '==', shard))
+        if start:
+            query = query.where(filter=FieldFilter('created_at', '>=', start))
+        if end:
+            query = query.where(filter=FieldFilter('created_at', '<', end))
+        query = query.order_by('created_at', direction=direction)
+        if fields is not None:
+            query = query.select(fields)
+        
+        last_doc = None
+        while True:
+            page = query.limit(page_size)
+            if last_doc is not None:
+                page = page.start_after(last_doc)
+            docs = with_retry(lambda: list(page.stream()), name=operation)
+            count_query(operation, len(docs))
+            yield from docs
+            if len(docs) < page_size:
+                return
+            last_doc = docs[-1]
+    
+    shards = range(ORDER_SHARDS) if ORDER_SHARDS_READY else [None]
+    return heapq.merge(*(shard_docs(shard) for shard in shards),
+                       key=lambda doc: doc.get('created_at'), reverse=descending)
+
+
+def add_domain_increment(client: Any, batch: Any, domain: str, amount: int = 1) -> None:
+    """
+    Add a per-domain count increment, on a random shard, to a write batch.
+    
+    Args:
+        client: Firestore client
+        batch: Write batch the increment is added to
+        domain: Email domain
+        amount: Amount to add (negative to remove)
+    """
+    if not domain:
+        return
+    domain_ref = client.collection(DOMAIN_COLLECTION).document(
+        counter_doc_id(domain, random.randrange(COUNTER_SHARDS)))
+    batch.set(domain_ref, {
+        'domain': domain,
+        'count': firestore.Increment(amount)
+    }, merge=True)
+
+
+def find_referrer(client: Any, referral_code: str) -> Optional[Any]:
+    """
+    Look up the entry that owns a referral code.
+    
+    Args:
+        client: Firestore client
+        referral_code: Normalized referral code
+    
+    Returns:
+        Document snapshot of the referrer, or None if the code is unknown
+    """
+    query = client.collection(COLLECTION_NAME).where(
+        filter=FieldFilter('referral_code', '==', referral_code)).limit(1)
+    docs = with_retry(lambda: list(query.stream()), name='find_referrer')
+    count_query('find_referrer', len(docs))
+    return docs[0] if docs else None
+
+
+def add_waitlist_entry(email: str, ip: str = 'unknown', referral_code: Optional[str] = None,
+                       check_existing: bool = True) -> bool:
     """
     Add a new email to the waitlist in Firestore.
     
     Args:
         email: Email address to add
         ip: IP address of the signup (optional)
+        referral_code: Normalized referral code the signup came with (optional);
+            its owner's referral_count is incremented atomically with the entry
+        check_existing: Read the entry first and return early if it exists;
+            pass False when the caller already knows the email is new (an
+            existing entry still makes create() fail with AlreadyExists)
     
     Returns:
         True if successful, False otherwise
@@ -58,8 +360,7 @@ def add_waitlist_entry(email: str, ip: str = 'unknown') -> bool:
     
     try:
         # Check if email already exists
-        existing = get_waitlist_entry(email)
-        if existing:
+        if check_existing and get_waitlist_entry(email):
             return True  # Already exists, consider it success
         
         # Add new entry
@@ -67,19 +368,158 @@ def add_waitlist_entry(email: str, ip: str = 'unknown') -> bool:
             'email': email.lower(),
             'timestamp': firestore.SERVER_TIMESTAMP,
             'ip': ip,
-            'created_at': datetime.utcnow().isoformat()
+            'created_at': datetime.utcnow().isoformat(),
+            'email_domain': email_domain(email),
+            'referral_code': referral_code_for(email),
+            'order_shard': order_shard(email)
         }
         
-        # Use email as document ID for easy lookup
+        referrer = find_referrer(client, referral_code) if referral_code else None
+        if referrer is not None and referrer.id == email.lower():
+            referrer = None  # No credit for referring yourself
+        if referrer is not None:
+            entry['referred_by'] = referral_code
+        
+        # Use email as document ID for easy lookup. The entry, its rollup
+        # increments, its domain count and the referrer's credit commit
+        # atomically; create() keeps a concurrent duplicate signup from being
+        # counted twice.
         doc_ref = client.collection(COLLECTION_NAME).document(email.lower())
-        doc_ref.set(entry)
+        batch = client.batch()
+        batch.create(doc_ref, entry)
+        add_rollup_increments(client, batch, entry['created_at'])
+        add_domain_increment(client, batch, entry['email_domain'])
+        if referrer is not None:
+            batch.update(referrer.reference, {'referral_count': firestore.Increment(1)})
+        try:
+            # Safe to repeat: if a timed-out commit did apply, the retry's
+            # create() fails with AlreadyExists instead of counting twice
+            with_retry(batch.commit)
+        except NotFound:
+            # The referrer was deleted since the lookup; sign up without the credit
+            return add_waitlist_entry(email, ip, check_existing=False)
+        count_writes('add_waitlist_entry', 2 + len(ROLLUP_COLLECTIONS) + (referrer is not None))
         
+        if referrer is not None:
+            update_referral_leaderboard(referrer.id)
         return True
+    except AlreadyExists:
+        return True  # Created concurrently, consider it success
     except Exception as e:
         print(f"⚠ Error adding waitlist entry to Firestore: {e}")
         return False
 
 
+def update_referral_leaderboard(referrer_email: str) -> bool:
+    """
+    Apply a referrer's current referral_count to the leaderboard document.
+    
+    Runs as a transaction over the referrer's entry and the leaderboard, so
+    concurrent updates for different referrers cannot overwrite each other,
+    and writes only when the top-K list actually changes. Uses the stored
+    count rather than "+1", so a retried or reordered update is harmless.
+    
+    Args:
+        referrer_email: Email (document ID) of the referrer
+    
+    Returns:
+        True if the leaderboard changed
+    """
+    client = get_firestore_client()
+    if not client:
+        return False
+    
+    referrer_ref = client.collection(COLLECTION_NAME).document(referrer_email.lower())
+    board_ref = client.collection(LEADERBOARD_COLLECTION).document(REFERRAL_LEADERBOARD_DOC)
+    
+    @firestore.transactional
+    def apply(transaction):
+        referrer = referrer_ref.get(transaction=transaction)
+        board = board_ref.get(transaction=transaction)
+        if not referrer.exists:
+            return False
+        data = referrer.to_dict()
+        entries = (board.to_dict() or {}).get('entries', []) if board.exists else []
+        updated = merge_leaderboard(entries, {
+            'code': data.get('referral_code') or referral_code_for(referrer.id),
+            'name': mask_email(referrer.id),
+            'count': data.get('referral_count', 0)
+        })
+        if updated == entries:
+            return False
+        transaction.set(board_ref, {
+            'entries': updated,
+            'updated_at': firestore.SERVER_TIMESTAMP
+        })
+        return True
+    
+    try:
+        changed = with_retry(lambda: apply(client.transaction()))
+        count_reads('update_referral_leaderboard', 2)
+        if changed:
+            count_writes('update_referral_leaderboard')
+        return changed
+    except Exception as e:
+        # The next referral by this referrer (or a rebuild) repairs the board
+        print(f"⚠ Error updating referral leaderboard: {e}")
+        return False
+
+
+def get_referral_leaderboard() -> List[Dict[str, Any]]:
+    """
+    Get the top referrers with a single document read.
+    
+    Returns:
+        List of {'code', 'name', 'count'}, largest first
+    """
+    client = get_firestore_client()
+    if not client:
+        return []
+    
+    try:
+        doc_ref = client.collection(LEADERBOARD_COLLECTION).document(REFERRAL_LEADERBOARD_DOC)
+        doc = with_retry(doc_ref.get, hedge=True, name='get_referral_leaderboard')
+        count_reads('get_referral_leaderboard')
+        return (doc.to_dict() or {}).get('entries', []) if doc.exists else []
+    except Exception as e:
+        print(f"⚠ Error getting referral leaderboard from Firestore: {e}")
+        return []
+
+
+def rebuild_referral_leaderboard() -> int:
+    """
+    Recompute the leaderboard from the entries with the highest referral_count.
+    
+    Only needed after entries are deleted (a deleted referrer stays on the
+    board until then); reads REFERRAL_LEADERBOARD_SIZE entries, not the
+    whole waitlist.
+    
+    Returns:
+        Number of referrers on the rebuilt leaderboard
+    """
+    client = get_firestore_client()
+    if not client:
+        return 0
+    
+    query = client.collection(COLLECTION_NAME).order_by(
+        'referral_count', direction=firestore.Query.DESCENDING).limit(REFERRAL_LEADERBOARD_SIZE)
+    entries: List[Dict[str, Any]] = []
+    for doc in counted_stream('rebuild_referral_leaderboard', query.stream()):
+        data = doc.to_dict()
+        entries = merge_leaderboard(entries, {
+            'code': data.get('referral_code') or referral_code_for(doc.id),
+            'name': mask_email(doc.id),
+            'count': data.get('referral_count', 0)
+        })
+    client.collection(LEADERBOARD_COLLECTION).document(REFERRAL_LEADERBOARD_DOC).set({
+        'entries': entries,
+        'updated_at': firestore.SERVER_TIMESTAMP
+    })
+    count_writes('rebuild_referral_leaderboard')
+    print(f"✓ Rebuilt referral leaderboard with {len(entries)} referrers")
+    return len(entries)
+
+
 def get_waitlist_entry(email: str) -> Optional[Dict[str, Any]]:
     """
     Get a specific waitlist entry by email.
@@ -96,7 +536,8 @@ def get_waitlist_entry(email: str) -> Optional[Dict[str, Any]]:
     
     try:
         doc_ref = client.collection(COLLECTION_NAME).document(email.lower())
-        doc = doc_ref.get()
+        doc = with_retry(doc_ref.get, hedge=True, name='get_waitlist_entry')
+        count_reads('get_waitlist_entry')
         
         if doc.exists:
             data = doc.to_dict()
@@ -110,9 +551,43 @@ def get_waitlist_entry(email: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+def confirm_waitlist_entry(email: str) -> Optional[bool]:
+    """
+    Mark a waitlist entry as confirmed (double opt-in).
+    
+    A single update with no prior read; it fails if the entry does not exist.
+    
+    Args:
+        email: Email address to confirm
+    
+    Returns:
+        True if the entry is now confirmed, None if it does not exist,
+        False on error
+    """
+    client = get_firestore_client()
+    if not client:
+        return False
+    
+    try:
+        doc_ref = client.collection(COLLECTION_NAME).document(email.lower())
+        with_retry(lambda: doc_ref.update({
+            'confirmed': True,
+            'confirmed_at': firestore.SERVER_TIMESTAMP
+        }))
+        count_writes('confirm_waitlist_entry')
+        return True
+    except NotFound:
+        return None
+    except Exception as e:
+        print(f"⚠ Error confirming waitlist entry in Firestore: {e}")
+        return False
+
+
 def get_waitlist_count() -> int:
     """
-    Get total count of waitlist entries.
+    Get total count of waitlist entries using a server-side count aggregation.
+    
+    Billed as one read per 1000 entries, with no documents transferred.
     
     Returns:
         Number of entries, or 0 if error
@@ -122,18 +597,197 @@ def get_waitlist_count() -> int:
         return 0
     
     try:
-        collection_ref = client.collection(COLLECTION_NAME)
-        # Count documents (note: this counts all documents, may be slow for large collections)
-        docs = list(collection_ref.stream())
-        return len(docs)
+        results = with_retry(client.collection(COLLECTION_NAME).count().get)
+        count = int(results[0][0].value)
+        count_aggregation('get_waitlist_count', count)
+        return count
     except Exception as e:
         print(f"⚠ Error getting waitlist count from Firestore: {e}")
         return 0
 
 
+def get_waitlist_position(email: str) -> Optional[int]:
+    """
+    Get an entry's 1-based position in line, ordered by created_at.
+    
+    Uses a server-side count aggregation over entries created earlier, so a
+    lookup costs one document read plus one aggregate query, not a scan. Once
+    ORDER_SHARDS_READY is set the query covers every order shard with an 'in'
+    filter, which the (order_shard, created_at) index serves.
+    
+    Args:
+        email: Email address to lookup
+    
+    Returns:
+        Position in line, or None if not found or on error
+    """
+    client = get_firestore_client()
+    if not client:
+        return None
+    
+    try:
+        collection_ref = client.collection(COLLECTION_NAME)
+        doc = with_retry(collection_ref.document(email.lower()).get, hedge=True, name='get_waitlist_entry')
+        count_reads('get_waitlist_position')
+        if not doc.exists:
+            return None
+        
+        created_at = doc.to_dict().get('created_at')
+        if not created_at:
+            return None
+        
+        query = collection_ref
+        if ORDER_SHARDS_READY:
+            query = query.where(filter=FieldFilter('order_shard', 'in', list(range(ORDER_SHARDS))))
+        query = query.where(filter=FieldFilter('created_at', '<', created_at))
+        results = with_retry(query.count().get)
+        earlier = int(results[0][0].value)
+        count_aggregation('get_waitlist_position', earlier)
+        return earlier + 1
+    except Exception as e:
+        print(f"⚠ Error getting waitlist position from Firestore: {e}")
+        return None
+
+
+def get_signup_rollups(granularity: str = 'day', start: Optional[str] = None,
+                       end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Get pre-aggregated signup counts per time bucket.
+    
+    Args:
+        granularity: 'hour' or 'day'
+        start: Inclusive ISO bucket start to read from (optional)
+        end: Exclusive ISO bucket start to read up to (optional)
+    
+    Returns:
+        List of {'bucket_start': str, 'count': int}, oldest first (counter shards summed)
+    """
+    client = get_firestore_client()
+    if not client or granularity not in ROLLUP_COLLECTIONS:
+        return []
+    
+    try:
+        query = client.collection(ROLLUP_COLLECTIONS[granularity])
+        if start:
+            query = query.where(filter=FieldFilter('bucket_start', '>=', start))
+        if end:
+            query = query.where(filter=FieldFilter('bucket_start', '<', end))
+        query = query.order_by('bucket_start')
+        
+        # Shards of a bucket share its bucket_start, so they arrive together
+        buckets: Dict[str, int] = {}
+        for doc in counted_stream('get_signup_rollups', query.stream()):
+            data = doc.to_dict()
+            bucket_start = data.get('bucket_start')
+            buckets[bucket_start] = buckets.get(bucket_start, 0) + data.get('count', 0)
+        return [{'bucket_start': bucket_start, 'count': count} for bucket_start, count in buckets.items()]
+    except Exception as e:
+        print(f"⚠ Error getting signup rollups from Firestore: {e}")
+        return []
+
+
+def search_waitlist(prefix: Optional[str] = None, domain: Optional[str] = None,
+                    page_size: int = SEARCH_PAGE_SIZE,
+                    cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Search waitlist entries by email prefix and/or domain, one page at a time.
+    
+    Prefixes use an indexed range query on email and domains an equality
+    filter on email_domain, so only matching documents are read.
+    
+    Args:
+        prefix: Email prefix to match (optional)
+        domain: Exact email domain to match (optional)
+        page_size: Maximum entries to return
+        cursor: Email to continue after (next_cursor from the previous page)
+    
+    Returns:
+        Tuple of (entries ordered by email, next_cursor or None if no more pages)
+    """
+    client = get_firestore_client()
+    if not client:
+        return [], None
+    
+    try:
+        query = client.collection(COLLECTION_NAME)
+        if domain:
+            query = query.where(filter=FieldFilter('email_domain', '==', domain.lower()))
+        if prefix:
+            prefix = prefix.lower()
+            query = query.where(filter=FieldFilter('email', '>=', prefix))
+            query = query.where(filter=FieldFilter('email', '<', prefix + '\uf8ff'))
+        query = query.order_by('email')
+        if cursor:
+            query = query.start_after({'email': cursor.lower()})
+        
+        entries = []
+        for doc in counted_stream('search_waitlist', query.limit(page_size).stream()):
+            data = doc.to_dict()
+            # Convert Firestore timestamp to ISO string if needed
+            if 'timestamp' in data and hasattr(data['timestamp'], 'isoformat'):
+                data['timestamp'] = data['timestamp'].isoformat()
+            entries.append(data)
+        
+        next_cursor = entries[-1]['email'] if len(entries) == page_size else None
+        return entries, next_cursor
+    except Exception as e:
+        print(f"⚠ Error searching waitlist in Firestore: {e}")
+        return [], None
+
+
+def get_domain_counts(limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Get the email domains with the most signups from the per-domain count table.
+    
+    Candidates are the domains of the largest counter shards; shards are
+    picked at random, so a domain's largest shard tracks its total. Their
+    exact totals then come from one get_all over every shard.
+    
+    Args:
+        limit: Maximum number of domains to return
+    
+    Returns:
+        List of {'domain': str, 'count': int}, largest first
+    """
+    client = get_firestore_client()
+    if not client:
+        return []
+    
+    try:
+        domain_ref = client.collection(DOMAIN_COLLECTION)
+        query = domain_ref.order_by('count', direction=firestore.Query.DESCENDING).limit(limit * COUNTER_SHARDS)
+        candidates: List[str] = []
+        for doc in counted_stream('get_domain_counts', query.select(['domain']).stream()):
+            domain = (doc.to_dict() or {}).get('domain') or counter_key(doc.id)
+            if domain not in candidates:
+                candidates.append(domain)
+                if len(candidates) == limit:
+                    break
+        if not candidates:
+            return []
+        
+        refs = [domain_ref.document(counter_doc_id(domain, shard))
+                for domain in candidates for shard in range(COUNTER_SHARDS)]
+        counts = {domain: 0 for domain in candidates}
+        snapshots = with_retry(lambda: list(client.get_all(refs)))
+        count_reads('get_domain_counts', len(refs))
+        for doc in snapshots:
+            if doc.exists:
+                counts[counter_key(doc.id)] += (doc.to_dict() or {}).get('count', 0)
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        return [{'domain': domain, 'count': count} for domain, count in ranked]
+    except Exception as e:
+        print(f"⚠ Error getting domain counts from Firestore: {e}")
+        return []
+
+
 def get_all_waitlist_entries() -> List[Dict[str, Any]]:
     """
-    Get all waitlist entries.
+    Get all waitlist entries, newest first.
+    
+    Merges the order shards (see iter_waitlist_by_created) once
+    ORDER_SHARDS_READY is set; until then streams the collection and sorts
+    it in memory, so entries without order_shard are still listed.
     
     Returns:
         List of entry dicts
@@ -143,8 +797,11 @@ def get_all_waitlist_entries() -> List[Dict[str, Any]]:
         return []
     
     try:
-        collection_ref = client.collection(COLLECTION_NAME)
-        docs = collection_ref.stream()
+        if ORDER_SHARDS_READY:
+            docs = iter_waitlist_by_created(client, descending=True, operation='get_all_waitlist_entries')
+        else:
+            collection_ref = client.collection(COLLECTION_NAME)
+            docs = counted_stream('get_all_waitlist_entries', collection_ref.stream())
         
         entries = []
         for doc in docs:
@@ -154,20 +811,92 @@ def get_all_waitlist_entries() -> List[Dict[str, Any]]:
                 data['timestamp'] = data['timestamp'].isoformat()
             entries.append(data)
         
-        # Sort by timestamp (newest first)
-        entries.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+        if not ORDER_SHARDS_READY:
+            # Sort by timestamp (newest first)
+            entries.sort(key=lambda x: x.get('created_at', ''), reverse=True)
         return entries
     except Exception as e:
         print(f"⚠ Error getting waitlist entries from Firestore: {e}")
         return []
 
 
-def migrate_from_json(json_path: str) -> int:
+def iter_waitlist_pages(page_size: int = 500, start_after: Optional[str] = None,
+                        fields: Optional[List[str]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Iterate over the waitlist in email order, one page at a time.
+    
+    Each page is a separate bounded query continuing after the previous
+    page's last email, so long-running jobs never hold a stream open and can
+    resume from any email.
+    
+    Args:
+        page_size: Entries per page
+        start_after: Email to continue after (optional)
+        fields: Fields to fetch (optional, defaults to all)
+    
+    Yields:
+        Lists of entry dicts
+    
+    Raises:
+        Exception: Firestore errors are propagated so callers can checkpoint and retry
+    """
+    client = get_firestore_client()
+    if not client:
+        return
+    
+    cursor = start_after.lower() if start_after else None
+    while True:
+        query = client.collection(COLLECTION_NAME)
+        if fields:
+            query = query.select(sorted(set(fields) | {'email'}))
+        query = query.order_by('email')
+        if cursor:
+            query = query.start_after({'email': cursor})
+        
+        page = [doc.to_dict() for doc in query.limit(page_size).stream()]
+        count_query('iter_waitlist_pages', len(page))
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        cursor = page[-1]['email']
+
+
+def get_waitlist_entry_batch() -> WaitlistEntryBatch:
+    """
+    Load all waitlist entries into a compact WaitlistEntryBatch.
+    
+    Intended for bulk tooling: entries are streamed straight into columnar
+    storage instead of being held as a list of dicts.
+    
+    Returns:
+        Batch of entries in collection order (empty on error)
+    """
+    client = get_firestore_client()
+    if not client:
+        return WaitlistEntryBatch()
+    
+    try:
+        return WaitlistEntryBatch.from_firestore_docs(
+            counted_stream('get_waitlist_entry_batch', client.collection(COLLECTION_NAME).stream()))
+    except Exception as e:
+        print(f"⚠ Error getting waitlist entries from Firestore: {e}")
+        return WaitlistEntryBatch()
+
+
+def migrate_from_json(json_path: str, snapshot_path: Optional[str] = None) -> int:
     """
     Migrate waitlist data from JSON file to Firestore.
     
+    Malformed and disposable addresses are skipped up front with one batch
+    validation pass, so they cost no Firestore reads or writes.
+    
     Args:
         json_path: Path to waitlist.json file
+        snapshot_path: Email snapshot of Firestore (see email_snapshot.py);
+            emails already in it are skipped without a read, and the rest
+            are created without an existence check
     
     Returns:
         Number of entries migrated
@@ -178,31 +907,174 @@ def migrate_from_json(json_path: str) -> int:
     
     try:
         with open(json_path, 'r', encoding='utf-8') as f:
-            entries = json.load(f)
+            is_list = f.read(1024).lstrip().startswith('[')
         
-        if not isinstance(entries, list):
+        if not is_list:
             print("⚠ JSON file does not contain a list")
             return 0
         
+        entries = WaitlistEntryBatch.from_json_file(json_path)
+        problems = validate_emails(entries.emails())
+        
+        new_emails = None
+        if snapshot_path:
+            from email_snapshot import EmailSnapshot
+            with EmailSnapshot(snapshot_path) as snapshot:
+                new_emails = set(snapshot.filter_new(
+                    email for email, problem in zip(entries.emails(), problems) if not problem))
+            print(f"✓ {len(new_emails)} emails are not in the snapshot")
+        
         migrated = 0
-        for entry in entries:
-            email = entry.get('email', '').lower()
-            if not email:
+        for entry, problem in zip(entries, problems):
+            email = entry.email
+            if problem:
                 continue
             
-            # Check if already exists
-            existing = get_waitlist_entry(email)
-            if existing:
+            if new_emails is not None:
+                # Emails repeated in the file are migrated once
+                if email.lower() not in new_emails:
+                    continue
+                new_emails.discard(email.lower())
+            elif get_waitlist_entry(email):
+                # Already exists
                 continue
             
-            # Add to Firestore
-            ip = entry.get('ip', 'unknown')
-            if add_waitlist_entry(email, ip):
+            # Add to Firestore; the email is known to be new, so skip the re-read
+            if add_waitlist_entry(email, entry.ip, check_existing=False):
                 migrated += 1
         
+        rejected = sum(1 for problem in problems if problem)
+        if rejected:
+            print(f"⚠ Skipped {rejected} malformed or disposable addresses")
         print(f"✓ Migrated {migrated} entries from JSON to Firestore")
         return migrated
     except Exception as e:
         print(f"⚠ Error migrating from JSON: {e}")
         return 0
 
+
+def rebuild_signup_rollups() -> int:
+    """
+    Rebuild the hourly and daily rollup buckets from existing entries.
+    
+    Streams only the created_at field of each entry, recounts every bucket,
+    overwrites the bucket documents in batches and deletes buckets that no
+    longer have entries. Run it while signups are quiet: increments made by
+    signups during the rebuild may be overwritten.
+    
+    Returns:
+        Number of bucket documents written
+    """
+    client = get_firestore_client()
+    if not client:
+        return 0
+    
+    try:
+        counts = {granularity: {} for granularity in ROLLUP_COLLECTIONS}
+        for doc in counted_stream('rebuild_signup_rollups',
+                                  client.collection(COLLECTION_NAME).select(['created_at']).stream()):
+            created_at = (doc.to_dict() or {}).get('created_at')
+            if not created_at:
+                continue
+            for granularity, bucket_id, bucket_start in rollup_buckets(created_at):
+                bucket = counts[granularity].setdefault(bucket_id, [bucket_start, 0])
+                bucket[1] += 1
+        
+        written = 0
+        with BatchWriter(client, operation='rebuild_signup_rollups') as writer:
+            for granularity, collection_name in ROLLUP_COLLECTIONS.items():
+                collection_ref = client.collection(collection_name)
+                for doc in counted_stream('rebuild_signup_rollups', collection_ref.select(['bucket_start']).stream()):
+                    if doc.id not in counts[granularity]:
+                        writer.delete(doc.reference)
+                for bucket_id, (bucket_start, count) in counts[granularity].items():
+                    writer.set(collection_ref.document(bucket_id), {
+                        'bucket_start': bucket_start,
+                        'count': count
+                    })
+                    written += 1
+        
+        print(f"✓ Rebuilt {written} rollup buckets")
+        return written
+    except Exception as e:
+        print(f"⚠ Error rebuilding signup rollups: {e}")
+        return 0
+
+
+def backfill_email_domains() -> int:
+    """
+    Add email_domain to existing entries and rebuild the per-domain count table.
+    
+    Streams only the email fields, updates entries missing email_domain in
+    batches, then overwrites every domain count document. Run it while
+    signups are quiet: increments made during the rebuild may be overwritten.
+    
+    Returns:
+        Number of entries updated
+    """
+    client = get_firestore_client()
+    if not client:
+        return 0
+    
+    try:
+        counts: Dict[str, int] = {}
+        updated = 0
+        with BatchWriter(client, operation='backfill_email_domains') as writer:
+            entries = client.collection(COLLECTION_NAME).select(['email', 'email_domain']).stream()
+            for doc in counted_stream('backfill_email_domains', entries):
+                data = doc.to_dict() or {}
+                domain = data.get('email_domain') or email_domain(data.get('email') or doc.id)
+                if not domain:
+                    continue
+                counts[domain] = counts.get(domain, 0) + 1
+                if data.get('email_domain') != domain:
+                    writer.update(doc.reference, {'email_domain': domain})
+                    updated += 1
+            
+            domain_ref = client.collection(DOMAIN_COLLECTION)
+            for doc in counted_stream('backfill_email_domains', domain_ref.select(['domain']).stream()):
+                if doc.id not in counts:
+                    writer.delete(doc.reference)
+            for domain, count in counts.items():
+                writer.set(domain_ref.document(domain), {'domain': domain, 'count': count})
+        
+        print(f"✓ Backfilled email_domain on {updated} entries ({len(counts)} domains)")
+        return updated
+    except Exception as e:
+        print(f"⚠ Error backfilling email domains: {e}")
+        return 0
+
+
+def backfill_order_shards() -> int:
+    """
+    Set order_shard on entries that lack it or carry one for another shard count.
+    
+    Streams only the email fields and updates mismatched entries in batches.
+    Entries without the right order_shard are invisible to created_at-ordered
+    reads once WAITLIST_ORDER_SHARDS_READY is set, so run it before setting
+    the flag and again (with the flag unset) after changing
+    WAITLIST_ORDER_SHARDS. Safe to rerun.
+    
+    Returns:
+        Number of entries updated
+    """
+    client = get_firestore_client()
+    if not client:
+        return 0
+    
+    try:
+        updated = 0
+        with BatchWriter(client, operation='backfill_order_shards') as writer:
+            entries = client.collection(COLLECTION_NAME).select(['email', 'order_shard']).stream()
+            for doc in counted_stream('backfill_order_shards', entries):
+                data = doc.to_dict() or {}
+                shard = order_shard(data.get('email') or doc.id)
+                if data.get('order_shard') != shard:
+                    writer.update(doc.reference, {'order_shard': shard})
+                    updated += 1
+        
+        print(f"✓ Backfilled order_shard on {updated} entries ({ORDER_SHARDS} shards)")
+        return updated
+    except Exception as e:
+        print(f"⚠ Error backfilling order shards: {e}")
+        return 0
@@ -0,0 +1,277 @@
+"""
+Synthetic waitlist dataset generator.
+Writes realistic waitlist.json lists or JSON Lines exports of any size for
+exercising the offline tooling and the JSON fallback at scale. Datasets are
+deterministic for a given seed and are written as a stream, so even 10M
+entries need only a few MB of memory.
+
+The mix mirrors production traffic:
+- Domains follow a Zipf-like skew: a handful of webmail providers take most
+  signups, followed by a long tail of company domains
+- A small set of hot IPs (offices, NATs, scripted signups) accounts for a
+  large share of entries; some entries are IPv6 or 'unknown'
+- A fraction of entries repeat an earlier email, often in a different case,
+  and some emails are stored with mixed case
+
+Usage:
+    python generate_waitlist_dataset.py 100000 -o waitlist_100k.json
+    python generate_waitlist_dataset.py 10000000 -o export_10m.jsonl --format jsonl --seed 7
+"""
+
+import os
+import json
+import random
+import argparse
+import itertools
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+
+# Webmail providers and their share of signups
+COMMON_DOMAINS = (
+    ('gmail.com', 0.38), ('yahoo.com', 0.07), ('outlook.com', 0.06), ('hotmail.com', 0.05),
+    ('icloud.com', 0.04), ('proton.me', 0.015), ('aol.com', 0.01), ('googlemail.com', 0.005),
+)
+
+# Distinct company domains in the long tail and their Zipf exponent
+TAIL_DOMAINS = 50000
+TAIL_EXPONENT = 1.1
+
+# Hot IPs and the share of entries coming from them
+HOT_IPS = 25
+HOT_IP_SHARE = 0.15
+
+IPV6_SHARE = 0.05
+UNKNOWN_IP_SHARE = 0.01
+
+# Earlier emails remembered for duplicates (a bounded reservoir keeps memory flat)
+DUPLICATE_RESERVOIR = 10000
+
+DEFAULT_DUPLICATE_RATE = 0.05
+DEFAULT_MIXED_CASE_RATE = 0.08
+
+# Signups are spread over this many days ending at DATASET_END
+DEFAULT_DAYS = 180
+DATASET_END = datetime(2026, 6, 30)
+
+FIRST_NAMES = (
+    'james', 'mary', 'john', 'patricia', 'robert', 'jennifer', 'michael', 'linda', 'david', 'elizabeth',
+    'william', 'barbara', 'richard', 'susan', 'joseph', 'jessica', 'thomas', 'sarah', 'chris', 'karen',
+    'wei', 'li', 'ana', 'maria', 'mohammed', 'fatima', 'yuki', 'hiroshi', 'olga', 'ivan', 'priya', 'arjun',
+    'lucas', 'emma', 'noah', 'olivia', 'liam', 'sofia', 'mateo', 'isabella',
+)
+LAST_NAMES = (
+    'smith', 'johnson', 'williams', 'brown', 'jones', 'garcia', 'miller', 'davis', 'rodriguez', 'martinez',
+    'hernandez', 'lopez', 'wilson', 'anderson', 'thomas', 'taylor', 'moore', 'jackson', 'martin', 'lee',
+    'wang', 'zhang', 'chen', 'kim', 'park', 'nguyen', 'singh', 'patel', 'kumar', 'ivanov', 'muller', 'rossi',
+)
+TAIL_WORDS = (
+    'acme', 'data', 'labs', 'cloud', 'systems', 'ai', 'tech', 'works', 'analytics', 'digital',
+    'quantum', 'neural', 'vector', 'stack', 'ops', 'grid', 'logic', 'forge', 'signal', 'atlas',
+)
+TAIL_SUFFIXES = ('.com', '.io', '.ai', '.co', '.dev', '.org', '.net', '.co.uk', '.de')
+
+
+class DatasetGenerator:
+    """
+    Deterministic stream of synthetic waitlist entries.
+
+    Args:
+        count: Number of entries to generate
+        seed: Random seed; the same seed always yields the same dataset
+        duplicate_rate: Share of entries that repeat an earlier email
+        mixed_case_rate: Share of emails written with some capital letters
+        days: Span of created_at timestamps
+    """
+
+    def __init__(self, count: int, seed: int = 42, duplicate_rate: float = DEFAULT_DUPLICATE_RATE,
+                 mixed_case_rate: float = DEFAULT_MIXED_CASE_RATE, days: int = DEFAULT_DAYS):
+        self.count = count
+        self.rng = random.Random(seed)
+        self.duplicate_rate = duplicate_rate
+        self.mixed_case_rate = mixed_case_rate
+        self.start = DATASET_END - timedelta(days=days)
+        self.mean_gap = days * 86400.0 / max(count, 1)
+
+        common_share = sum(share for _, share in COMMON_DOMAINS)
+        tail_weights = [1.0 / rank ** TAIL_EXPONENT for rank in range(1, TAIL_DOMAINS + 1)]
+        tail_scale = (1.0 - common_share) / sum(tail_weights)
+        self.domains = [domain for domain, _ in COMMON_DOMAINS] + [self._tail_domain(i) for i in range(TAIL_DOMAINS)]
+        self.domain_cum_weights = list(itertools.accumulate(
+            [share for _, share in COMMON_DOMAINS] + [w * tail_scale for w in tail_weights]))
+        self.hot_ips = [self._random_ipv4() for _ in range(HOT_IPS)]
+        self.reservoir: List[str] = []
+        self.stats = {'entries': 0, 'duplicates': 0, 'mixed_case': 0}
+
+    def _tail_domain(self, index: int) -> str:
+        words = TAIL_WORDS
+        name = words[index % len(words)] + words[(index // len(words)) % len(words)]
+        return f"{name}{index // (len(words) ** 2) or ''}{TAIL_SUFFIXES[index % len(TAIL_SUFFIXES)]}"
+
+    def _random_ipv4(self) -> str:
+        rng = self.rng
+        return f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+    def _ip(self) -> str:
+        roll = self.rng.random()
+        if roll < HOT_IP_SHARE:
+            # Hot IPs are skewed among themselves too
+            return self.hot_ips[min(int(self.rng.expovariate(0.3)), HOT_IPS - 1)]
+        if roll < HOT_IP_SHARE + UNKNOWN_IP_SHARE:
+            return 'unknown'
+        if roll < HOT_IP_SHARE + UNKNOWN_IP_SHARE + IPV6_SHARE:
+            return '2001:db8:' + ':'.join(f"{self.rng.getrandbits(16):x}" for _ in range(6))
+        return self._random_ipv4()
+
+    def _local_part(self, index: int) -> str:
+        rng = self.rng
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        style = rng.random()
+        if style < 0.35:
+            local = f"{first}.{last}"
+        elif style < 0.6:
+            local = f"{first}{last}"
+        elif style < 0.75:
+            local = f"{first[0]}{last}"
+        elif style < 0.85:
+            local = f"{first}_{last}"
+        else:
+            local = f"{first}+waitlist"
+        # The index keeps addresses unique apart from the deliberate duplicates
+        return f"{local}{index}"
+
+    def _mixed_case(self, email: str) -> str:
+        local, _, domain = email.partition('@')
+        style = self.rng.random()
+        if style < 0.5:
+            local = '.'.join(part.capitalize() for part in local.split('.'))
+        elif style < 0.8:
+            domain = domain.capitalize()
+            local = local.capitalize()
+        else:
+            return email.upper()
+        return f"{local}@{domain}"
+
+    def _email(self, index: int) -> str:
+        if self.reservoir and self.rng.random() < self.duplicate_rate:
+            self.stats['duplicates'] += 1
+            email = self.rng.choice(self.reservoir)
+            # Repeat signups often differ only in case
+            return self._mixed_case(email.lower()) if self.rng.random() < 0.5 else email
+
+        domain = self.rng.choices(self.domains, cum_weights=self.domain_cum_weights)[0]
+        email = f"{self._local_part(index)}@{domain}"
+        if self.rng.random() < self.mixed_case_rate:
+            self.stats['mixed_case'] += 1
+            email = self._mixed_case(email)
+
+        if len(self.reservoir) < DUPLICATE_RESERVOIR:
+            self.reservoir.append(email)
+        else:
+            self.reservoir[self.rng.randrange(DUPLICATE_RESERVOIR)] = email
+        return email
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        moment = self.start
+        for index in range(self.count):
+            moment += timedelta(seconds=self.rng.expovariate(1.0 / self.mean_gap))
+            created_at = moment.isoformat(timespec='microseconds')
+            self.stats['entries'] += 1
+            yield {
+                'email': self._email(index),
+                'timestamp': created_at + '+00:00',
+                'ip': self._ip(),
+                'created_at': created_at,
+            }
+
+
+def write_dataset(path: str, records: Iterator[Dict[str, Any]], fmt: str = 'json') -> int:
+    """
+    Stream records to a waitlist.json-style list or a JSON Lines file.
+
+    Args:
+        path: Output file path
+        records: Entries to write
+        fmt: 'json' (a list, like waitlist.json) or 'jsonl'
+
+    Returns:
+        Number of records written
+    """
+    written = 0
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        if fmt == 'json':
+            f.write('[')
+        for record in records:
+            line = json.dumps(record, ensure_ascii=False)
+            if fmt == 'json':
+                f.write(',\n  ' if written else '\n  ')
+                f.write(line)
+            else:
+                f.write(line + '\n')
+            written += 1
+        if fmt == 'json':
+            f.write('\n]' if written else ']')
+    os.replace(tmp_path, path)
+    return written
+
+
+def iter_dataset(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the entries of a file written by write_dataset.
+
+    Relies on write_dataset putting one entry per line in both formats, so a
+    large list can be read without loading it whole.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip().rstrip(',')
+            if line and line not in ('[', ']', '[]'):
+                yield json.loads(line)
+
+
+def dataset_path(directory: str, count: int, seed: int, fmt: str = 'json') -> str:
+    """Conventional file name for a generated dataset."""
+    return os.path.join(directory, f"waitlist_{count}_s{seed}.{fmt}")
+
+
+def ensure_dataset(directory: str, count: int, seed: int = 42, fmt: str = 'json') -> str:
+    """
+    Generate a dataset unless it already exists.
+
+    Returns:
+        Path to the dataset
+    """
+    path = dataset_path(directory, count, seed, fmt)
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        write_dataset(path, DatasetGenerator(count, seed), fmt)
+    return path
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Generate a synthetic waitlist dataset')
+    parser.add_argument('count', type=int, help='Number of entries (e.g. 10000 to 10000000)')
+    parser.add_argument('-o', '--output', help='Output path (default: waitlist_<count>_s<seed>.<format>)')
+    parser.add_argument('--format', choices=['json', 'jsonl'], default='json',
+                        help='json: waitlist.json-style list; jsonl: one entry per line')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--duplicate-rate', type=float, default=DEFAULT_DUPLICATE_RATE)
+    parser.add_argument('--mixed-case-rate', type=float, default=DEFAULT_MIXED_CASE_RATE)
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help='Span of signup timestamps')
+    args = parser.parse_args()
+
+    if args.count < 1:
+        parser.error('count must be positive')
+
+    path = args.output or dataset_path('.', args.count, args.seed, args.format)
+    generator = DatasetGenerator(args.count, args.seed, args.duplicate_rate, args.mixed_case_rate, args.days)
+    write_dataset(path, iter(generator), args.format)
+    stats = generator.stats
+    print(f"✓ Wrote {stats['entries']} entries to {path} "
+          f"({stats['duplicates']} duplicates, {stats['mixed_case']} mixed-case, {os.path.getsize(path) / 1e6:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,396 @@
+"""
+Launch-announcement mailer for the whole waitlist.
+Reads the waitlist page by page, renders each message from a precompiled
+template, sends through batched Gmail API requests under a quota-aware rate
+limiter with retries, and checkpoints progress so a crash resumes without
+double-sending.
+
+Usage:
+    python launch_mailer.py --template launch.html --subject "Trinity Engine is live!"
+    python launch_mailer.py --template launch.html --subject "..." --stub outbox/ --source ../waitlist.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import date
+from string import Template
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Add parent directory to path to import sibling modules
+sys.path.insert(0, os.path.dirname(__file__))
+
+from gmail_service import create_message, get_gmail_service
+
+
+# Gmail recommends at most 50 requests per batch
+MAX_BATCH_SIZE = 50
+
+# messages.send costs 100 of the 250 quota units per user per second
+DEFAULT_RATE_PER_SECOND = 2.0
+
+# Daily sending limit for a Workspace account (500 for consumer Gmail)
+DEFAULT_DAILY_LIMIT = 2000
+
+# HTTP statuses worth retrying
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+MAX_ATTEMPTS = 5
+
+DEFAULT_TEMPLATE = """
+<html>
+<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+    <h2 style="color: #33e7ff;">Trinity Engine is here</h2>
+    <p>Hi $email,</p>
+    <p>Thanks for waiting. Trinity Engine is now available.</p>
+</body>
+</html>
+"""
+
+
+class SendError(Exception):
+    """Failure sending one message; retryable errors may succeed on a later attempt."""
+
+    def __init__(self, message: str, retryable: bool):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for sends per second, with a daily cap.
+
+    The daily count is persisted in the checkpoint, so a resumed run
+    continues counting toward the same day's limit.
+    """
+
+    def __init__(self, rate: float, daily_limit: int, sent_today: int = 0,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self.daily_limit = daily_limit
+        self.sent_today = sent_today
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    def remaining_today(self) -> int:
+        return max(self.daily_limit - self.sent_today, 0)
+
+    def acquire(self, count: int) -> None:
+        """Block until count sends are allowed by the per-second rate."""
+        while True:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= count or (self.tokens >= self.capacity and count > self.capacity):
+                self.tokens -= count
+                return
+            self.sleep((min(count, self.capacity) - self.tokens) / self.rate)
+
+    def record(self, count: int) -> None:
+        self.sent_today += count
+
+
+class GmailBatchSender:
+    """Sends messages through batched Gmail API HTTP requests."""
+
+    def __init__(self, service: Any):
+        self.service = service
+
+    def send_batch(self, messages: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Optional[SendError]]:
+        """
+        Send messages in one batch request.
+
+        Args:
+            messages: List of (recipient, Gmail message dict)
+
+        Returns:
+            Dict of recipient to None on success or the SendError
+        """
+        results: Dict[str, Optional[SendError]] = {}
+
+        def callback(request_id, response, exception):
+            if exception is None:
+                results[request_id] = None
+                return
+            status = getattr(getattr(exception, 'resp', None), 'status', None)
+            results[request_id] = SendError(str(exception), retryable=status in RETRYABLE_STATUSES)
+
+        batch = self.service.new_batch_http_request(callback=callback)
+        for recipient, message in messages:
+            batch.add(self.service.users().messages().send(userId='me', body=message), request_id=recipient)
+        try:
+            batch.execute()
+        except Exception as e:
+            # The batch request itself failed; nothing is known to be sent
+            for recipient, _ in messages:
+                results.setdefault(recipient, SendError(str(e), retryable=True))
+        return results
+
+
+class StubSender:
+    """
+    Local stand-in for GmailBatchSender used for testing and dry runs.
+
+    Records every message in memory (and as .json files when outbox_dir is
+    set) and can inject failures. Outbox files are numbered on from the files
+    already there, so a resumed run adds to the previous run's messages and a
+    recipient sent twice shows up as two files.
+    """
+
+    def __init__(self, outbox_dir: Optional[str] = None, fail: Optional[Callable[[str, int], Optional[SendError]]] = None):
+        self.outbox_dir = outbox_dir
+        self.fail = fail
+        self.sent: List[str] = []
+        self.attempts: Dict[str, int] = {}
+        self.outbox_count = 0
+        if outbox_dir:
+            os.makedirs(outbox_dir, exist_ok=True)
+            self.outbox_count = max((int(name[:-5]) for name in os.listdir(outbox_dir)
+                                     if name.endswith('.json') and name[:-5].isdigit()), default=0)
+
+    def send_batch(self, messages: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Optional[SendError]]:
+        results: Dict[str, Optional[SendError]] = {}
+        for recipient, message in messages:
+            attempt = self.attempts.get(recipient, 0) + 1
+            self.attempts[recipient] = attempt
+            error = self.fail(recipient, attempt) if self.fail else None
+            if error is None:
+                self.sent.append(recipient)
+                if self.outbox_dir:
+                    self.outbox_count += 1
+                    with open(os.path.join(self.outbox_dir, f"{self.outbox_count:07d}.json"), 'w',
+                              encoding='utf-8') as f:
+                        json.dump({'to': recipient, 'message': message}, f)
+            results[recipient] = error
+        return results
+
+
+class Checkpoint:
+    """
+    Progress file for a mailing run, rewritten atomically after every batch.
+
+    cursor is the last email of the last fully processed page; sent holds
+    recipients already handled on the current page. Recipients are recorded
+    as in_flight before their batch is sent, so after a crash they are
+    reported as uncertain and skipped rather than possibly sent twice.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.state: Dict[str, Any] = {
+            'cursor': None,
+            'sent': [],
+            'in_flight': [],
+            'uncertain': [],
+            'failed': {},
+            'total_sent': 0,
+            'day': date.today().isoformat(),
+            'sent_today': 0,
+        }
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.state.update(json.load(f))
+            if self.state['in_flight']:
+                self.state['uncertain'].extend(self.state['in_flight'])
+                self.state['in_flight'] = []
+        if self.state['day'] != date.today().isoformat():
+            self.state['day'] = date.today().isoformat()
+            self.state['sent_today'] = 0
+
+    def save(self) -> None:
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def done_on_page(self) -> set:
+        return set(self.state['sent']) | set(self.state['uncertain']) | set(self.state['failed'])
+
+
+class LaunchMailer:
+    """Sends a templated message to every waitlist entry."""
+
+    def __init__(self, sender: Any, checkpoint: Checkpoint, subject: str, template: str,
+                 limiter: RateLimiter, batch_size: int = MAX_BATCH_SIZE,
+                 include: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.sender = sender
+        self.include = include
+        self.checkpoint = checkpoint
+        self.subject = Template(subject)
+        self.template = Template(template)
+        self.limiter = limiter
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.sleep = sleep
+
+    def render(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Render the message for one entry."""
+        fields = {'email': entry['email']}
+        return create_message(entry['email'], self.subject.safe_substitute(fields),
+                              self.template.safe_substitute(fields))
+
+    def run(self, pages: Iterator[List[Dict[str, Any]]]) -> Dict[str, int]:
+        """
+        Send to every entry in pages, resuming from the checkpoint.
+
+        Args:
+            pages: Pages of entries in email order, starting after the checkpoint cursor
+
+        Returns:
+            Summary counts for this run
+        """
+        state = self.checkpoint.state
+        summary = {'sent': 0, 'failed': 0, 'skipped': 0}
+
+        for page in pages:
+            done = self.checkpoint.done_on_page()
+            pending = [
+                entry for entry in page
+                if entry.get('email') and entry['email'] not in done
+                and (self.include is None or self.include(entry))
+            ]
+            summary['skipped'] += len(page) - len(pending)
+
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                remaining = self.limiter.remaining_today()
+                if remaining < len(batch):
+                    # Send what today's quota allows; the page stays open in the checkpoint
+                    if remaining:
+                        sent, failed = self._send_with_retries(batch[:remaining])
+                        summary['sent'] += sent
+                        summary['failed'] += failed
+                    print("⚠ Daily sending limit reached; rerun tomorrow to resume")
+                    self.checkpoint.save()
+                    return summary
+                sent, failed = self._send_with_retries(batch)
+                summary['sent'] += sent
+                summary['failed'] += failed
+
+            state['cursor'] = page[-1]['email']
+            state['sent'] = []
+            state['uncertain'] = []
+            state['failed'] = {}
+            self.checkpoint.save()
+
+        return summary
+
+    def _send_with_retries(self, batch: List[Dict[str, Any]]) -> Tuple[int, int]:
+        state = self.checkpoint.state
+        messages = {entry['email']: self.render(entry) for entry in batch}
+        sent = failed = 0
+        attempt = 0
+
+        while messages:
+            attempt += 1
+            self.limiter.acquire(len(messages))
+            state['in_flight'] = list(messages)
+            self.checkpoint.save()
+
+            results = self.sender.send_batch(list(messages.items()))
+
+            retry = {}
+            delivered = 0
+            for recipient in list(messages):
+                error = results.get(recipient, SendError('No response', retryable=True))
+                if error is None:
+                    state['sent'].append(recipient)
+                    delivered += 1
+                elif error.retryable and attempt < MAX_ATTEMPTS:
+                    retry[recipient] = messages[recipient]
+                else:
+                    state['failed'][recipient] = str(error)
+                    failed += 1
+            sent += delivered
+            self.limiter.record(delivered)
+            state['total_sent'] += delivered
+            state['sent_today'] = self.limiter.sent_today
+            state['in_flight'] = []
+            self.checkpoint.save()
+
+            messages = retry
+            if messages:
+                # Exponential backoff with full jitter
+                self.sleep(random.uniform(0, min(60.0, 2 ** attempt)))
+
+        return sent, failed
+
+
+def iter_json_pages(path: str, page_size: int, start_after: Optional[str]) -> Iterator[List[Dict[str, Any]]]:
+    """Page through a waitlist.json / JSONL file in email order (local testing source)."""
+    from waitlist_entry import WaitlistEntryBatch
+
+    batch = WaitlistEntryBatch.from_json_file(path)
+    emails = sorted({email for email in batch.emails() if email})
+    if start_after:
+        emails = [email for email in emails if email > start_after]
+    for start in range(0, len(emails), page_size):
+        yield [{'email': email} for email in emails[start:start + page_size]]
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Send the launch announcement to the waitlist')
+    parser.add_argument('--subject', required=True, help='Subject template ($email available)')
+    parser.add_argument('--template', help='HTML body template file ($email available)')
+    parser.add_argument('--checkpoint', default='launch_checkpoint.json')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE_PER_SECOND, help='Messages per second')
+    parser.add_argument('--daily-limit', type=int, default=DEFAULT_DAILY_LIMIT)
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument('--confirmed-only', action='store_true', help='Skip entries that never confirmed (double opt-in)')
+    parser.add_argument('--stub', metavar='OUTBOX_DIR', help='Write messages to a local outbox instead of sending')
+    parser.add_argument('--source', help='Read recipients from a waitlist.json/JSONL file instead of Firestore')
+    parser.add_argument('--retry-uncertain', action='store_true',
+                        help='Resend to recipients that were mid-send when the last run crashed')
+    args = parser.parse_args()
+
+    template = DEFAULT_TEMPLATE
+    if args.template:
+        with open(args.template, 'r', encoding='utf-8') as f:
+            template = f.read()
+
+    if args.stub:
+        sender: Any = StubSender(args.stub)
+    else:
+        service = get_gmail_service()
+        if not service:
+            print("⚠ Could not get Gmail service")
+            sys.exit(1)
+        sender = GmailBatchSender(service)
+
+    checkpoint = Checkpoint(args.checkpoint)
+    cursor = checkpoint.state['cursor']
+    if checkpoint.state['uncertain'] and args.retry_uncertain:
+        checkpoint.state['uncertain'] = []
+    elif checkpoint.state['uncertain']:
+        print(f"⚠ {len(checkpoint.state['uncertain'])} recipients were mid-send during the last crash "
+              f"and will be skipped (see 'uncertain' in {args.checkpoint})")
+
+    if args.source:
+        pages = iter_json_pages(args.source, args.page_size, cursor)
+    else:
+        from firestore_service import iter_waitlist_pages
+        fields = ['email', 'confirmed'] if args.confirmed_only else ['email']
+        pages = iter_waitlist_pages(args.page_size, start_after=cursor, fields=fields)
+
+    include = (lambda entry: bool(entry.get('confirmed'))) if args.confirmed_only else None
+    limiter = RateLimiter(args.rate, args.daily_limit, sent_today=checkpoint.state['sent_today'])
+    mailer = LaunchMailer(sender, checkpoint, args.subject, template, limiter,
+                          batch_size=args.batch_size, include=include)
+    summary = mailer.run(pages)
+
+    print(f"✓ Sent {summary['sent']} messages ({summary['failed']} failed, {summary['skipped']} already handled)")
+    print(f"  Total sent so far: {checkpoint.state['total_sent']}")
+
+
+if __name__ == '__main__':
+    main()
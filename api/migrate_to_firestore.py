@@ -1,10 +1,15 @@
 """
 Migration script to move waitlist data from JSON to Firestore.
 Run this once after setting up Firestore.
+
+Usage:
+    python migrate_to_firestore.py
+    python migrate_to_firestore.py --snapshot waitlist.snap   # dedup offline (see email_snapshot.py)
 """
 
 import os
 import sys
+import argparse
 
 # Add parent directory to path to import firestore_service
 sys.path.insert(0, os.path.dirname(__file__))
@@ -14,9 +19,14 @@ from firestore_service import migrate_from_json, get_all_waitlist_entries, get_w
 
 def main():
     """Run migration from JSON to Firestore."""
+    parser = argparse.ArgumentParser(description='Migrate waitlist.json to Firestore')
+    parser.add_argument('--json', dest='json_path', help='JSON file to migrate (default: ../waitlist.json)')
+    parser.add_argument('--snapshot', help='Email snapshot used to skip existing emails without reads')
+    args = parser.parse_args()
+    
     # Get path to waitlist.json
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    json_path = os.path.join(script_dir, '..', 'waitlist.json')
+    json_path = args.json_path or os.path.join(script_dir, '..', 'waitlist.json')
     
     print("Starting migration from JSON to Firestore...")
     print(f"JSON file: {json_path}")
@@ -27,7 +37,7 @@ def main():
         return
     
     # Run migration
-    migrated = migrate_from_json(json_path)
+    migrated = migrate_from_json(json_path, args.snapshot)
     
     if migrated > 0:
         print(f"\n✓ Migration complete!")
@@ -0,0 +1,588 @@
+"""
+Reconcile the waitlist.json fallback store with Firestore.
+Signups land only in waitlist.json when a Firestore write fails, so the two
+drift apart. This tool streams both sides in email order and merge-joins
+them, reporting entries missing from either side and entries whose fields
+disagree; with --apply the fallback-only signups are created in Firestore
+and fields Firestore lacks are filled in, in batched writes.
+
+Memory stays bounded at any size: the JSON side is parsed incrementally and
+sorted externally (sorted runs spilled to temporary files, then a k-way
+merge), and Firestore is read in pages already ordered by email.
+
+Usage:
+    python reconcile.py                                   # report only
+    python reconcile.py --json waitlist.json --output diff.jsonl
+    python reconcile.py --apply
+    python reconcile.py --against firestore_export.jsonl  # offline, e.g. an export from waitlist_analytics.py
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import heapq
+import itertools
+import argparse
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+# Add parent directory to path to import sibling modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from firestore_service import (
+    get_firestore_client,
+    iter_waitlist_pages,
+    email_domain,
+    order_shard,
+    add_rollup_increments,
+    add_domain_increment,
+    find_referrer,
+    rebuild_referral_leaderboard,
+    BatchWriter,
+    COLLECTION_NAME,
+    FIRESTORE_AVAILABLE
+)
+from referrals import referral_code_for
+from email_validation import email_problem
+from retry import with_retry, is_retryable, backoff_delay, RETRY_MAX_ATTEMPTS
+from firestore_cost import count_writes
+
+if FIRESTORE_AVAILABLE:
+    from google.cloud import firestore
+    from google.api_core.exceptions import AlreadyExists, NotFound
+
+
+# Characters read from a JSON file at a time
+READ_CHUNK_CHARS = 1 << 20
+
+# Default memory budget for the in-memory sorted runs of the JSON side
+DEFAULT_MEMORY_MB = int(os.environ.get('RECONCILE_MEMORY_MB', '256'))
+
+# Rough size of one trimmed entry dict held in a run (measured with
+# tracemalloc on generated datasets; long IPv6 addresses push it up)
+RECORD_BYTES = 700
+
+# Firestore entries fetched per page
+FIRESTORE_PAGE_SIZE = 1000
+
+# Fields carried through the diff; the rest of an entry is not compared
+CARRIED_FIELDS = ('email', 'timestamp', 'ip', 'referral_code', 'referred_by')
+
+# Fields compared on entries present on both sides. A value only the JSON
+# side has is filled into Firestore by --apply; values that differ are only
+# reported, as Firestore is the primary store.
+COMPARED_FIELDS = ('ip', 'referral_code', 'referred_by')
+FILLABLE_FIELDS = ('ip', 'referral_code')
+
+MISSING_IN_FIRESTORE = 'missing_in_firestore'
+MISSING_IN_JSON = 'missing_in_json'
+CONFLICT = 'conflict'
+
+# Records encoded or decoded per call when spilling and reading back runs;
+# whole chunks keep the per-record work inside the C JSON codec. While
+# merging, the read-back buffers of all runs together hold at most a quarter
+# of a run, so the merge stays within the memory budget.
+RUN_IO_RECORDS = 4096
+
+_SEPARATORS = re.compile(r'[\s,]*')
+_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+
+def iter_json_records(path: str, chunk_chars: int = READ_CHUNK_CHARS) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the records of a waitlist.json list or a JSON Lines file.
+
+    waitlist.json is written with indentation, so records span lines; each
+    record is decoded from a sliding buffer instead, and only the record
+    being decoded (plus one chunk) is held in memory.
+
+    Args:
+        path: JSON list or JSON Lines file
+        chunk_chars: Characters read per refill
+
+    Yields:
+        Record dicts, in file order
+
+    Raises:
+        ValueError: If the file is not valid JSON
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_chars)
+        eof = not buffer
+        pos = _SEPARATORS.match(buffer).end()
+        in_list = buffer[pos:pos + 1] == '['
+        if in_list:
+            pos += 1
+
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos >= len(buffer):
+                if eof:
+                    return
+                buffer, pos = f.read(chunk_chars), 0
+                eof = not buffer
+                continue
+            if in_list and buffer[pos] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                more = '' if eof else f.read(chunk_chars)
+                if not more:
+                    raise ValueError(f"Invalid JSON in {path}: {e}")
+                # The record continues past the buffer; keep its start and refill
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            if isinstance(record, dict):
+                yield record
+            pos = end
+
+
+def _trim(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Normalized copy of the carried fields, or None without an email."""
+    email = record.get('email')
+    if not isinstance(email, str) or not email.strip():
+        return None
+    trimmed = {field: record[field] for field in CARRIED_FIELDS if record.get(field) is not None}
+    trimmed['email'] = email.strip().lower()
+    return trimmed
+
+
+def _by_email(record: Dict[str, Any]) -> str:
+    return record['email']
+
+
+def _spill(run: List[Dict[str, Any]], tmp_dir: Optional[str]) -> TextIO:
+    """Write a sorted run to an anonymous temporary file, one record per line, and rewind it."""
+    f = tempfile.TemporaryFile('w+', encoding='utf-8', dir=tmp_dir)
+    encode = _ENCODER.encode
+    for start in range(0, len(run), RUN_IO_RECORDS):
+        f.write('\n'.join(map(encode, run[start:start + RUN_IO_RECORDS])))
+        f.write('\n')
+    f.seek(0)
+    return f
+
+
+def _read_run(f: TextIO, chunk_records: int) -> Iterator[Dict[str, Any]]:
+    """Read a spilled run back, decoding chunk_records lines at a time as one JSON array."""
+    while True:
+        lines = list(itertools.islice(f, chunk_records))
+        if not lines:
+            return
+        yield from json.loads('[' + ','.join(lines) + ']')
+
+
+class ExternalSort:
+    """
+    Sort records by email with bounded memory.
+
+    Records are collected into runs of at most run_records, each run is
+    sorted and spilled to a temporary file, and iteration k-way merges the
+    runs with heapq.merge. Input that fits in one run never touches disk.
+    Both sorts are stable, so among repeats of an email the one earliest in
+    the input comes first.
+
+    Use as a context manager so the run files are closed.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]], run_records: int, tmp_dir: Optional[str] = None):
+        self.run_records = run_records
+        self.runs: List[TextIO] = []
+        self.tail: List[Dict[str, Any]] = []
+        self.count = 0
+        run: List[Dict[str, Any]] = []
+        for record in records:
+            run.append(record)
+            if len(run) >= run_records:
+                run.sort(key=_by_email)
+                self.runs.append(_spill(run, tmp_dir))
+                self.count += len(run)
+                run = []
+        run.sort(key=_by_email)
+        self.tail = run
+        self.count += len(run)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if not self.runs:
+            return iter(self.tail)
+        chunk_records = max(16, min(RUN_IO_RECORDS, self.run_records // (4 * len(self.runs))))
+        return heapq.merge(*(_read_run(f, chunk_records) for f in self.runs), self.tail, key=_by_email)
+
+    def close(self) -> None:
+        for f in self.runs:
+            f.close()
+        self.runs = []
+
+    def __enter__(self) -> 'ExternalSort':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def unique_by_email(records: Iterable[Dict[str, Any]], stats: Dict[str, int], side: str) -> Iterator[Dict[str, Any]]:
+    """
+    Drop repeats of an email from a sorted stream, keeping the first.
+
+    Also checks the order the merge-join relies on.
+
+    Raises:
+        ValueError: If the stream is not sorted by email
+    """
+    previous = None
+    for record in records:
+        email = record['email']
+        if previous is not None and email <= previous:
+            if email == previous:
+                stats[f"{side}_duplicates"] += 1
+                continue
+            raise ValueError(f"{side} entries are not in email order ({previous!r} before {email!r})")
+        previous = email
+        stats[f"{side}_entries"] += 1
+        yield record
+
+
+def iter_firestore_entries(page_size: int = FIRESTORE_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Stream Firestore entries in email order, resuming after transient errors.
+
+    Each page is its own query, so a failed page is retried from the last
+    email seen rather than restarting the scan.
+    """
+    cursor = None
+    failures = 0
+    while True:
+        try:
+            for page in iter_waitlist_pages(page_size, start_after=cursor, fields=list(CARRIED_FIELDS)):
+                for entry in page:
+                    trimmed = _trim(entry)
+                    if trimmed is not None:
+                        yield trimmed
+                cursor = page[-1]['email']
+                failures = 0
+            return
+        except Exception as e:
+            failures += 1
+            if not is_retryable(e) or failures >= RETRY_MAX_ATTEMPTS:
+                raise
+            delay = backoff_delay(failures - 1)
+            print(f"⚠ Transient Firestore error ({type(e).__name__}) after {cursor!r}, "
+                  f"resuming in {delay * 1000:.0f} ms")
+            time.sleep(delay)
+
+
+def _present(value: Any) -> bool:
+    return value not in (None, '', 'unknown')
+
+
+def diff_sorted(json_entries: Iterable[Dict[str, Any]],
+                firestore_entries: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Merge-join two email-sorted, duplicate-free streams.
+
+    Args:
+        json_entries: Entries from the JSON fallback store
+        firestore_entries: Entries from Firestore
+
+    Yields:
+        Diff dicts with 'kind' and 'email': MISSING_IN_FIRESTORE (with the
+        'json' entry), MISSING_IN_JSON, or CONFLICT (with 'fields' mapping
+        each differing field to its 'json' and 'firestore' values)
+    """
+    json_iter, firestore_iter = iter(json_entries), iter(firestore_entries)
+    left, right = next(json_iter, None), next(firestore_iter, None)
+    while left is not None or right is not None:
+        if right is None or (left is not None and left['email'] < right['email']):
+            yield {'kind': MISSING_IN_FIRESTORE, 'email': left['email'], 'json': left}
+            left = next(json_iter, None)
+        elif left is None or right['email'] < left['email']:
+            yield {'kind': MISSING_IN_JSON, 'email': right['email']}
+            right = next(firestore_iter, None)
+        else:
+            fields = {}
+            for field in COMPARED_FIELDS:
+                json_value, firestore_value = left.get(field), right.get(field)
+                if _present(json_value) and json_value != firestore_value:
+                    fields[field] = {'json': json_value, 'firestore': firestore_value}
+            if fields:
+                yield {'kind': CONFLICT, 'email': left['email'], 'fields': fields}
+            left, right = next(json_iter, None), next(firestore_iter, None)
+
+
+def _signup_time(value: Any) -> Optional[datetime]:
+    """Aware UTC datetime of a JSON timestamp (naive values are UTC)."""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed.astimezone(timezone.utc)
+
+
+class FirestoreFixer:
+    """
+    Applies diffs to Firestore through one BatchWriter.
+
+    Fallback-only signups are created the way add_waitlist_entry writes them,
+    keeping their original signup time, and each create lands in the same
+    batch as its rollup, domain and referrer increments. create() keeps a
+    rerun from counting an entry twice: if an entry appeared meanwhile (or a
+    referrer or filled entry was deleted), the batch fails as a whole, and
+    its fixes are re-applied one by one so only the conflicting ones are
+    dropped and counted.
+    """
+
+    def __init__(self, client: Any, stats: Dict[str, int]):
+        self.client = client
+        self.stats = stats
+        self.writer = BatchWriter(client)
+        # (writes, stats keys) of each fix in the writer's current batch
+        self.queued: List[Tuple[List[Tuple[str, tuple]], List[str]]] = []
+
+    def apply(self, diff: Dict[str, Any]) -> None:
+        if diff['kind'] == MISSING_IN_FIRESTORE:
+            self._create(diff['json'])
+        elif diff['kind'] == CONFLICT:
+            updates = {field: values['json'] for field, values in diff['fields'].items()
+                       if field in FILLABLE_FIELDS and not _present(values['firestore'])}
+            if updates:
+                doc_ref = self.client.collection(COLLECTION_NAME).document(diff['email'])
+                self._queue([('update', (doc_ref, updates))], ['filled'])
+
+    def _create(self, record: Dict[str, Any]) -> None:
+        email = record['email']
+        if email_problem(email):
+            self.stats['skipped_invalid'] += 1
+            return
+
+        signed_up = _signup_time(record.get('timestamp'))
+        entry = {
+            'email': email,
+            'timestamp': signed_up or firestore.SERVER_TIMESTAMP,
+            'ip': record.get('ip') or 'unknown',
+            'created_at': (signed_up or datetime.now(timezone.utc)).replace(tzinfo=None).isoformat(),
+            'email_domain': email_domain(email),
+            'referral_code': referral_code_for(email),
+            'order_shard': order_shard(email)
+        }
+        # One query per referred entry; referrals are a small share of fallback signups
+        referrer = find_referrer(self.client, record['referred_by']) if record.get('referred_by') else None
+        if referrer is not None and referrer.id == email:
+            referrer = None
+        if referrer is not None:
+            entry['referred_by'] = record['referred_by']
+
+        writes = _WriteRecorder()
+        writes.create(self.client.collection(COLLECTION_NAME).document(email), entry)
+        add_rollup_increments(self.client, writes, entry['created_at'])
+        add_domain_increment(self.client, writes, entry['email_domain'])
+        counted = ['created']
+        if referrer is not None:
+            writes.update(referrer.reference, {'referral_count': firestore.Increment(1)})
+            counted.append('credited')
+        self._queue(writes.writes, counted)
+
+    def _queue(self, writes: List[Tuple[str, tuple]], counted: List[str]) -> None:
+        """Add one fix's writes to the current batch; a fix never spans two batches."""
+        self._committing(self.writer.reserve, len(writes))
+        self.queued.append((writes, counted))
+        for key in counted:
+            self.stats[key] += 1
+        # Only the last write can fill the batch (reserve made room), so an
+        # automatic commit here always carries the whole fix
+        for method, args in writes:
+            self._committing(getattr(self.writer, method), *args)
+
+    def _committing(self, write: Any, *args: Any) -> None:
+        """Run a writer call that may commit, falling back to one fix at a time if the batch conflicts."""
+        committed = self.writer.committed
+        try:
+            write(*args)
+        except (AlreadyExists, NotFound) as e:
+            print(f"⚠ Batch of {len(self.queued)} fixes conflicted ({type(e).__name__}); applying them one by one")
+            self.writer.discard()
+            queued, self.queued = self.queued, []
+            for writes, counted in queued:
+                self._apply_one(writes, counted)
+            return
+        if self.writer.committed != committed:
+            self.queued = []
+
+    def _apply_one(self, writes: List[Tuple[str, tuple]], counted: List[str]) -> None:
+        """
+        Commit a single fix on its own.
+
+        A fix whose entry now exists (AlreadyExists) or whose filled entry was
+        deleted (NotFound) is dropped and counted as conflicted. A create whose
+        referrer was deleted is retried without the referrer credit, as
+        add_waitlist_entry does.
+        """
+        while True:
+            batch = self.client.batch()
+            for method, args in writes:
+                getattr(batch, method)(*args)
+            try:
+                with_retry(batch.commit)
+                count_writes(self.writer.operation, len(writes))
+                return
+            except NotFound:
+                if writes[0][0] == 'create' and 'credited' in counted:
+                    writes = [write for write in writes if write[0] != 'update']
+                    counted.remove('credited')
+                    self.stats['credited'] -= 1
+                    continue
+            except AlreadyExists:
+                pass
+            for key in counted:
+                self.stats[key] -= 1
+            self.stats['conflicted'] += 1
+            return
+
+    def close(self) -> None:
+        """Commit the final batch and refresh the leaderboard if referrers were credited."""
+        self._committing(self.writer.commit)
+        if self.stats['credited']:
+            rebuild_referral_leaderboard()
+
+
+class _WriteRecorder:
+    """Collects batch writes (create / set / update) so they can be replayed into a batch later."""
+
+    def __init__(self):
+        self.writes: List[Tuple[str, tuple]] = []
+
+    def create(self, doc_ref: Any, data: Dict[str, Any]) -> None:
+        self.writes.append(('create', (doc_ref, data)))
+
+    def set(self, doc_ref: Any, data: Dict[str, Any], merge: bool = False) -> None:
+        self.writes.append(('set', (doc_ref, data, merge)))
+
+    def update(self, doc_ref: Any, data: Dict[str, Any]) -> None:
+        self.writes.append(('update', (doc_ref, data)))
+
+
+def reconcile(json_path: str, against: Optional[str] = None, apply: bool = False,
+              output: Optional[TextIO] = None, memory_mb: int = DEFAULT_MEMORY_MB,
+              tmp_dir: Optional[str] = None) -> Dict[str, int]:
+    """
+    Diff the JSON fallback store against Firestore (or an export of it).
+
+    Args:
+        json_path: waitlist.json or a JSON Lines file
+        against: JSON / JSON Lines export to compare with instead of Firestore
+        apply: Write fixes to Firestore (not with against)
+        output: Stream receiving one JSON diff per line (optional)
+        memory_mb: Budget for the in-memory sort runs
+        tmp_dir: Directory for spilled runs (defaults to the system temp dir)
+
+    Returns:
+        Counts of entries seen, differences found and fixes applied
+
+    Raises:
+        RuntimeError: If Firestore is needed but not available
+    """
+    stats = {key: 0 for key in (
+        'json_entries', 'json_duplicates', 'firestore_entries', 'firestore_duplicates',
+        MISSING_IN_FIRESTORE, MISSING_IN_JSON, CONFLICT,
+        'created', 'filled', 'credited', 'conflicted', 'skipped_invalid', 'runs'
+    )}
+    run_records = max(1000, memory_mb * 1024 * 1024 // RECORD_BYTES)
+
+    fixer = None
+    if against:
+        if apply:
+            raise RuntimeError('--apply writes to Firestore and cannot be combined with --against')
+        # Both sides are sorted here, so they share the budget
+        run_records //= 2
+        firestore_sorted = ExternalSort(filter(None, map(_trim, iter_json_records(against))), run_records, tmp_dir)
+        firestore_source: Iterable[Dict[str, Any]] = firestore_sorted
+    else:
+        client = get_firestore_client()
+        if not client:
+            raise RuntimeError('Firestore not available; pass --against with an export to compare offline')
+        firestore_sorted = None
+        firestore_source = iter_firestore_entries()
+        if apply:
+            fixer = FirestoreFixer(client, stats)
+
+    try:
+        with ExternalSort(filter(None, map(_trim, iter_json_records(json_path))), run_records, tmp_dir) as json_sorted:
+            stats['runs'] = len(json_sorted.runs) + (1 if json_sorted.tail else 0)
+            diffs = diff_sorted(unique_by_email(json_sorted, stats, 'json'),
+                                unique_by_email(firestore_source, stats, 'firestore'))
+            for diff in diffs:
+                stats[diff['kind']] += 1
+                if output is not None:
+                    output.write(json.dumps(diff, ensure_ascii=False, default=str))
+                    output.write('\n')
+                if fixer is not None:
+                    fixer.apply(diff)
+            if fixer is not None:
+                fixer.close()
+    finally:
+        if firestore_sorted is not None:
+            firestore_sorted.close()
+    return stats
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Diff the waitlist.json fallback store against Firestore')
+    parser.add_argument('--json', dest='json_path', help='Fallback store to check (default: WAITLIST_JSON_PATH)')
+    parser.add_argument('--against', help='Compare with a JSON / JSON Lines export instead of Firestore')
+    parser.add_argument('--output', '-o', help='Write every difference here as JSON Lines')
+    parser.add_argument('--apply', action='store_true',
+                        help='Create fallback-only signups in Firestore and fill in missing fields')
+    parser.add_argument('--memory-mb', type=int, default=DEFAULT_MEMORY_MB, help='Budget for in-memory sort runs')
+    parser.add_argument('--tmp-dir', help='Directory for spilled sort runs')
+    args = parser.parse_args()
+
+    json_path = args.json_path
+    if not json_path:
+        from waitlist import WAITLIST_JSON_PATH
+        json_path = WAITLIST_JSON_PATH
+    if not os.path.exists(json_path):
+        print(f"⚠ JSON file not found: {json_path}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    output = open(args.output, 'w', encoding='utf-8') if args.output else None
+    try:
+        stats = reconcile(json_path, args.against, args.apply, output, args.memory_mb, args.tmp_dir)
+    except (RuntimeError, ValueError) as e:
+        print(f"⚠ {e}")
+        sys.exit(1)
+    finally:
+        if output is not None:
+            output.close()
+
+    print(f"✓ Compared {stats['json_entries']} JSON entries with {stats['firestore_entries']} "
+          f"{'export' if args.against else 'Firestore'} entries in {time.perf_counter() - start:.1f}s "
+          f"({stats['runs']} sort runs)")
+    print(f"  Missing from Firestore: {stats[MISSING_IN_FIRESTORE]}")
+    print(f"  Missing from JSON:      {stats[MISSING_IN_JSON]} (expected: the JSON store only holds fallback signups)")
+    print(f"  Conflicting fields:     {stats[CONFLICT]}")
+    if stats['json_duplicates'] or stats['firestore_duplicates']:
+        print(f"  Repeated emails skipped: {stats['json_duplicates']} in JSON, "
+              f"{stats['firestore_duplicates']} on the other side")
+    if args.apply:
+        print(f"✓ Created {stats['created']} entries in Firestore ({stats['credited']} referrer credits), "
+              f"filled fields on {stats['filled']}")
+        if stats['skipped_invalid']:
+            print(f"⚠ Skipped {stats['skipped_invalid']} malformed or disposable addresses")
+        if stats['conflicted']:
+            print(f"⚠ Skipped {stats['conflicted']} fixes that conflicted with concurrent changes "
+                  f"(entry created or deleted meanwhile)")
+    elif stats[MISSING_IN_FIRESTORE] or stats[CONFLICT]:
+        print("  Run with --apply to write the fixes to Firestore")
+    if args.output:
+        print(f"✓ Differences written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
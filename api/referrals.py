@@ -0,0 +1,99 @@
+"""
+Referral codes and the top referrers leaderboard.
+Codes are derived from the email with an HMAC, so a signup's code is known
+without a datastore read. The leaderboard is a short list kept sorted by
+referral count and updated one referrer at a time, so reading it never
+involves the waitlist itself.
+"""
+
+import os
+import hmac
+import hashlib
+from typing import Any, Dict, List, Optional
+
+
+# Key for deriving codes. Without it codes are still unique but can be
+# computed from an email (which only lets someone credit that person).
+REFERRAL_CODE_SECRET = os.environ.get('REFERRAL_CODE_SECRET', '')
+
+# 10 characters from a 32-letter alphabet = 50 bits, so collisions stay
+# unlikely even at millions of entries
+REFERRAL_CODE_LENGTH = 10
+REFERRAL_CODE_ALPHABET = '23456789ABCDEFGHJKLMNPQRSTUVWXYZ'
+
+# Referrers kept on the leaderboard
+REFERRAL_LEADERBOARD_SIZE = int(os.environ.get('REFERRAL_LEADERBOARD_SIZE', '10'))
+
+
+def referral_code_for(email: str, secret: Optional[str] = None) -> str:
+    """
+    Get the referral code of an email.
+
+    Args:
+        email: Email address (case-insensitive)
+        secret: Derivation key (defaults to REFERRAL_CODE_SECRET)
+
+    Returns:
+        REFERRAL_CODE_LENGTH-character code using REFERRAL_CODE_ALPHABET
+    """
+    key = (REFERRAL_CODE_SECRET if secret is None else secret).encode('utf-8')
+    digest = hmac.new(key, email.strip().lower().encode('utf-8'), hashlib.sha256).digest()
+    value = int.from_bytes(digest[:8], 'big')
+    chars = []
+    for _ in range(REFERRAL_CODE_LENGTH):
+        chars.append(REFERRAL_CODE_ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(chars)
+
+
+def normalize_referral_code(code: Any) -> Optional[str]:
+    """
+    Normalize a referral code from a request.
+
+    Returns:
+        The uppercased code, or None if it is missing or not a well-formed code
+    """
+    if not isinstance(code, str):
+        return None
+    code = code.strip().upper()
+    if len(code) != REFERRAL_CODE_LENGTH or any(c not in REFERRAL_CODE_ALPHABET for c in code):
+        return None
+    return code
+
+
+def mask_email(email: str) -> str:
+    """Public display name for a referrer, e.g. 'j•••@g•••.com'."""
+    local, _, domain = email.partition('@')
+    name, dot, tld = domain.rpartition('.')
+    if not dot:
+        name, tld = domain, ''
+    return f"{local[:1]}•••@{name[:1]}•••{dot}{tld}"
+
+
+def merge_leaderboard(entries: List[Dict[str, Any]], candidate: Dict[str, Any],
+                      size: int = REFERRAL_LEADERBOARD_SIZE) -> List[Dict[str, Any]]:
+    """
+    Apply one referrer's new count to a top-K list.
+
+    Counts only grow, so a referrer outside the list can only enter when its
+    count passes the current minimum; updating the list with each referrer's
+    latest count therefore keeps it exact without a scan.
+
+    Args:
+        entries: Current leaderboard, sorted by count descending
+        candidate: Dict with 'code', 'name' and 'count'
+        size: Entries to keep
+
+    Returns:
+        New sorted leaderboard (ties broken by code for a stable order)
+    """
+    updated = [entry for entry in entries if entry.get('code') != candidate['code']]
+    if candidate['count'] > 0:
+        updated.append(candidate)
+    updated.sort(key=lambda entry: (-entry['count'], entry['code']))
+    return updated[:size]
+
+
+def public_leaderboard(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Strip a leaderboard down to what the site shows (no codes)."""
+    return [{'name': entry['name'], 'count': entry['count']} for entry in entries]
@@ -0,0 +1,281 @@
+"""
+Replay captured waitlist traffic against the handlers with fake backends.
+Reads a capture written with TRAFFIC_CAPTURE_PATH (see capture.py), rebuilds
+each request from its recorded shape, and feeds the requests to
+api/waitlist.handler or the Cloud Function's waitlist_handler on their
+original schedule, sped up 1x-100x. Firestore is the in-memory stand-in from
+fake_firestore.py and emails are not sent. Reports service time and
+response time (including queueing) percentiles next to the captured ones.
+
+Usage:
+    python replay_traffic.py capture.jsonl --speed 10
+    python replay_traffic.py capture.jsonl --target cloud --speed 50 --firestore-latency-ms 8 --json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Add parent directory to path to import sibling modules
+sys.path.insert(0, os.path.dirname(__file__))
+
+import fake_firestore
+
+
+CLOUD_FUNCTION_DIR = os.path.join(os.path.dirname(__file__), '..', 'cloud_functions', 'waitlist')
+
+MAX_SPEED = 100.0
+
+
+def load_capture(path: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Load capture records in arrival order."""
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # Torn line at the end of a live capture
+    records.sort(key=lambda record: record['t'])
+    return records[:limit] if limit else records
+
+
+def rebuild_body(shape: Optional[Dict[str, Any]]) -> str:
+    """Build a request body with the recorded shape."""
+    if not shape:
+        return ''
+    kind = shape.get('k')
+    if kind == 'json':
+        data: Dict[str, Any] = {key: '' for key in shape.get('x', [])}
+        if 'e' in shape:
+            data['email'] = shape['e']
+        return json.dumps(data)
+    if kind == 'form':
+        return 'email=' + 'x' * max(shape.get('n', 6) - 6, 0)
+    if kind == 'malformed':
+        return ('{"email": "' + 'x' * shape.get('n', 12))[:max(shape.get('n', 12), 1)]
+    if kind == 'other':
+        return '[]'
+    return ''
+
+
+def synthetic_ip(token: Optional[str]) -> str:
+    """Map an anonymized IP token to a stable private address."""
+    if not token:
+        return 'unknown'
+    value = int(token, 16)
+    return f"10.{(value >> 16) & 255}.{(value >> 8) & 255}.{value & 255}"
+
+
+class ReplayRequest:
+    """The parts of a Flask request that waitlist_handler reads."""
+
+    def __init__(self, method: str, headers: Dict[str, str], body: str, remote_addr: str):
+        self.method = method
+        self.headers = headers
+        self.data = body.encode('utf-8')
+        self.remote_addr = remote_addr
+        self.args: Dict[str, str] = {}
+        self.is_json = headers.get('Content-Type', '').startswith('application/json')
+
+    def get_json(self, silent: bool = False) -> Any:
+        try:
+            return json.loads(self.data)
+        except ValueError:
+            if silent:
+                return None
+            raise
+
+    def get_data(self, cache: bool = True) -> bytes:
+        return self.data
+
+
+def load_target(target: str, email_latency_ms: float) -> Callable[[Dict[str, Any]], int]:
+    """
+    Import the target handler against fake backends.
+
+    Returns:
+        Function that replays one capture record and returns the status code
+    """
+    def fake_send(*args, **kwargs):
+        if email_latency_ms:
+            time.sleep(email_latency_ms / 1000.0)
+        return True
+
+    if target == 'api':
+        import waitlist
+
+        # Keep the JSON fallback in memory so a replay never touches waitlist.json
+        memory_store: List[Dict[str, Any]] = []
+
+        def save_waitlist(entries: List[Dict[str, Any]]) -> None:
+            memory_store[:] = entries
+
+        waitlist.load_waitlist = lambda: list(memory_store)
+        waitlist.save_waitlist = save_waitlist
+        waitlist.send_waitlist_notification = fake_send
+
+        def replay_api(record: Dict[str, Any]) -> int:
+            headers = {'content-type': record.get('ct', 'application/json'),
+                       'x-forwarded-for': synthetic_ip(record.get('ip'))}
+            if record.get('ik'):
+                headers['idempotency-key'] = 'replay-' + record['ik']
+            request = {'method': record['m'], 'headers': headers, 'body': rebuild_body(record.get('b'))}
+            return int(waitlist.handler(request)['statusCode'])
+
+        return replay_api
+
+    sys.path.insert(0, os.path.abspath(CLOUD_FUNCTION_DIR))
+    try:
+        import main
+    except ImportError as e:
+        print(f"⚠ Cannot import the Cloud Function ({e}). Install: pip install -r {CLOUD_FUNCTION_DIR}/requirements.txt")
+        sys.exit(1)
+    main.send_waitlist_notification = fake_send
+    main.send_confirmation_email = fake_send
+
+    def replay_cloud(record: Dict[str, Any]) -> int:
+        headers = {'Content-Type': record.get('ct', 'application/json')}
+        if record.get('ip'):
+            headers['X-Forwarded-For'] = synthetic_ip(record['ip'])
+        if record.get('ik'):
+            headers['Idempotency-Key'] = 'replay-' + record['ik']
+        request = ReplayRequest(record['m'], headers, rebuild_body(record.get('b')), '127.0.0.1')
+        return int(main.waitlist_handler(request)[1])
+
+    return replay_cloud
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p90/p99/max of a list of milliseconds (nearest rank)."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, max(0, int(round(p * len(ordered))) - 1))], 2)
+
+    return {'p50': rank(0.50), 'p90': rank(0.90), 'p99': rank(0.99), 'max': round(ordered[-1], 2)}
+
+
+def replay(records: List[Dict[str, Any]], send: Callable[[Dict[str, Any]], int], speed: float,
+           concurrency: int) -> Dict[str, Any]:
+    """
+    Replay records on their captured schedule divided by speed.
+
+    Returns:
+        Report dict with status counts and latency percentiles
+    """
+    results: List[Dict[str, Any]] = []
+    results_lock = threading.Lock()
+    origin = records[0]['t'] if records else 0.0
+    start = time.perf_counter()
+
+    def run(record: Dict[str, Any], due: float) -> None:
+        begin = time.perf_counter()
+        try:
+            status = send(record)
+        except Exception as e:
+            print(f"⚠ Handler raised: {e}")
+            status = 599
+        end = time.perf_counter()
+        with results_lock:
+            results.append({
+                'm': record['m'], 's': status,
+                'service': (end - begin) * 1000, 'response': (end - due) * 1000,
+            })
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for record in records:
+            due = start + (record['t'] - origin) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(run, record, due)
+    elapsed = time.perf_counter() - start
+
+    statuses: Dict[str, int] = {}
+    for result in results:
+        statuses[str(result['s'])] = statuses.get(str(result['s']), 0) + 1
+    by_method: Dict[str, Any] = {}
+    for method in sorted({result['m'] for result in results}):
+        subset = [result for result in results if result['m'] == method]
+        by_method[method] = {
+            'requests': len(subset),
+            'service_ms': percentiles([result['service'] for result in subset]),
+        }
+    span = (records[-1]['t'] - origin) if records else 0.0
+    return {
+        'requests': len(results),
+        'speed': speed,
+        'captured_seconds': round(span, 3),
+        'replay_seconds': round(elapsed, 3),
+        'offered_rps': round(len(records) / (span / speed), 1) if span else None,
+        'statuses': statuses,
+        'service_ms': percentiles([result['service'] for result in results]),
+        'response_ms': percentiles([result['response'] for result in results]),
+        'captured_ms': percentiles([record['l'] for record in records if 'l' in record]),
+        'by_method': by_method,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Print a replay report."""
+    print(f"Replayed {report['requests']} requests at {report['speed']:g}x "
+          f"({report['captured_seconds']}s captured -> {report['replay_seconds']}s, "
+          f"offered {report['offered_rps']} req/s)")
+    print(f"  Statuses: {', '.join(f'{k}: {v}' for k, v in sorted(report['statuses'].items()))}")
+    for label, key in (('Captured', 'captured_ms'), ('Service', 'service_ms'), ('Response', 'response_ms')):
+        values = report[key]
+        if values:
+            print(f"  {label + ' ms':12s} p50 {values['p50']:8.2f}  p90 {values['p90']:8.2f}  "
+                  f"p99 {values['p99']:8.2f}  max {values['max']:8.2f}")
+    for method, row in report['by_method'].items():
+        values = row['service_ms']
+        print(f"  {method:7s} {row['requests']:6d} req  service p50 {values['p50']:.2f} p99 {values['p99']:.2f} ms")
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Replay captured waitlist traffic against fake backends')
+    parser.add_argument('capture', help='Capture file written with TRAFFIC_CAPTURE_PATH')
+    parser.add_argument('--target', choices=['api', 'cloud'], default='api',
+                        help='api/waitlist.handler or the Cloud Function waitlist_handler')
+    parser.add_argument('--speed', type=float, default=1.0, help='Replay speed, 1-100x')
+    parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight at once')
+    parser.add_argument('--firestore-latency-ms', type=float, default=5.0, help='Simulated Firestore round trip')
+    parser.add_argument('--email-latency-ms', type=float, default=0.0, help='Simulated notification send time')
+    parser.add_argument('--limit', type=int, help='Replay only the first N requests')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    if not 1.0 <= args.speed <= MAX_SPEED:
+        parser.error(f"--speed must be between 1 and {MAX_SPEED:g}")
+
+    records = load_capture(args.capture, args.limit)
+    if not records:
+        print("⚠ Capture is empty")
+        sys.exit(1)
+
+    # Never capture the replay itself
+    os.environ.pop('TRAFFIC_CAPTURE_PATH', None)
+    fake_firestore.install(latency_ms=args.firestore_latency_ms)
+    send = load_target(args.target, args.email_latency_ms)
+    report = replay(records, send, args.speed, args.concurrency)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,392 @@
+"""
+GDPR deletion and data-retention compaction job for the waitlist.
+Deletes the requested emails and coarsens old ip / created_at values, in
+Firestore and in the waitlist.json fallback store. Rollup buckets and
+per-domain counts are decremented in the same batch as each deletion, and
+the referral leaderboard is rebuilt afterwards.
+
+Usage:
+    python retention_job.py --delete-file deletion_requests.txt --dry-run
+    python retention_job.py --delete a@example.com --ip-days 90 --created-at-days 365
+"""
+
+import os
+import sys
+import argparse
+import itertools
+import ipaddress
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+# Add parent directory to path to import sibling modules
+sys.path.insert(0, os.path.dirname(__file__))
+
+from firestore_service import (
+    get_firestore_client,
+    rollup_buckets,
+    iter_waitlist_by_created,
+    email_domain,
+    add_bucket_increment,
+    add_domain_increment,
+    rebuild_referral_leaderboard,
+    BatchWriter,
+    COLLECTION_NAME,
+    FIRESTORE_AVAILABLE
+)
+from retry import with_retry
+from firestore_cost import count_reads, count_writes
+
+if FIRESTORE_AVAILABLE:
+    from google.cloud import firestore
+    from google.api_core.exceptions import NotFound
+
+
+# Emails per deletion batch: each costs a delete, a domain decrement and up to
+# two rollup decrements, so a chunk always fits in one atomic 500-write batch
+DELETE_CHUNK_SIZE = 100
+
+# Entries per compaction page (one batch of updates each)
+COMPACTION_PAGE_SIZE = 400
+
+DEFAULT_WORKERS = 4
+
+# Prefix lengths kept when truncating IPs
+IPV4_PREFIX = 24
+IPV6_PREFIX = 48
+
+
+class RetentionPolicy:
+    """
+    What to keep for entries older than a cutoff.
+
+    Args:
+        ip_days: Entries older than this lose their raw IP (None keeps IPs)
+        ip_action: 'truncate' keeps the network prefix, 'drop' removes the field
+        created_at_days: Entries older than this have created_at and
+            timestamp truncated to the hour (None keeps them exact)
+    """
+
+    def __init__(self, ip_days: Optional[int] = None, ip_action: str = 'truncate',
+                 created_at_days: Optional[int] = None, now: Optional[datetime] = None):
+        now = now or datetime.utcnow()
+        self.ip_action = ip_action
+        self.ip_cutoff = now - timedelta(days=ip_days) if ip_days is not None else None
+        self.created_at_cutoff = now - timedelta(days=created_at_days) if created_at_days is not None else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ip_cutoff is not None or self.created_at_cutoff is not None
+
+    @property
+    def scan_cutoff(self) -> Optional[datetime]:
+        """Entries created before this may need compaction."""
+        cutoffs = [c for c in (self.ip_cutoff, self.created_at_cutoff) if c is not None]
+        return max(cutoffs) if cutoffs else None
+
+    def updates_for(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Field changes the policy requires for one record.
+
+        Returns:
+            Dict of field to new value (None means remove the field); empty if compliant
+        """
+        created = _parse_time(record.get('created_at') or record.get('timestamp'))
+        if created is None:
+            return {}
+
+        updates: Dict[str, Any] = {}
+        if self.ip_cutoff is not None and created < self.ip_cutoff and 'ip' in record:
+            ip = record['ip']
+            if self.ip_action == 'drop':
+                updates['ip'] = None
+            elif ip and ip != 'unknown':
+                truncated = truncate_ip(ip)
+                if truncated != ip:
+                    updates['ip'] = truncated
+        if self.created_at_cutoff is not None and created < self.created_at_cutoff:
+            for field in ('created_at', 'timestamp'):
+                value = record.get(field)
+                truncated = truncate_to_hour(value)
+                if value is not None and truncated != value:
+                    updates[field] = truncated
+        return updates
+
+
+def truncate_ip(ip: str) -> Optional[str]:
+    """
+    Keep only the network part of an IP (/24 for IPv4, /48 for IPv6).
+
+    X-Forwarded-For chains are reduced to the client (first) address.
+    Unparseable values return None so they are removed.
+    """
+    ip = ip.split(',', 1)[0].strip()
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    prefix = IPV4_PREFIX if address.version == 4 else IPV6_PREFIX
+    return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False).network_address)
+
+
+def truncate_to_hour(value: Any) -> Any:
+    """Truncate a datetime or ISO string to the start of its hour, keeping its type."""
+    if isinstance(value, datetime):
+        return value.replace(minute=0, second=0, microsecond=0)
+    parsed = _parse_time(value, keep_tz=True)
+    if parsed is None:
+        return value
+    return parsed.replace(minute=0, second=0, microsecond=0).isoformat()
+
+
+def _parse_time(value: Any, keep_tz: bool = False) -> Optional[datetime]:
+    """Parse a datetime or ISO string; unless keep_tz, return naive UTC for comparisons."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if not keep_tz and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def read_email_list(paths: Iterable[str], emails: Iterable[str]) -> Set[str]:
+    """Collect normalized emails from files (one per line, # comments) and arguments."""
+    result = {email.strip().lower() for email in emails if email.strip()}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip().lower()
+                if line:
+                    result.add(line)
+    return result
+
+
+def _chunks(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class BoundedExecutor:
+    """Thread pool that blocks submitters once max_pending batches are queued."""
+
+    def __init__(self, workers: int):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='retention')
+        self.slots = threading.BoundedSemaphore(workers * 2)
+        self.futures = []
+
+    def submit(self, func, *args) -> None:
+        self.slots.acquire()
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(lambda _: self.slots.release())
+        self.futures.append(future)
+
+    def wait(self) -> int:
+        """Wait for every batch; returns the number that failed."""
+        failed = 0
+        for future in self.futures:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"⚠ Batch failed: {e}")
+                failed += 1
+        self.executor.shutdown()
+        return failed
+
+
+def delete_emails_firestore(client: Any, emails: Set[str], dry_run: bool, workers: int) -> int:
+    """
+    Delete entries by email with batched reads and atomic delete-and-decrement batches.
+
+    Reads and commits are retried on transient errors. Each delete requires
+    the entry to exist, so a retried commit that had already been applied
+    fails with NotFound instead of decrementing the counters twice; the
+    chunk is then re-read and whatever is left is deleted.
+
+    Args:
+        client: Firestore client
+        emails: Normalized emails to delete
+        dry_run: Only count what would be deleted
+        workers: Batches committed in parallel
+
+    Returns:
+        Number of entries deleted (or that would be)
+    """
+    collection = client.collection(COLLECTION_NAME)
+    executor = BoundedExecutor(workers)
+    deleted = 0
+
+    def read_existing(references: List[Any]) -> List[Any]:
+        docs = with_retry(lambda: list(client.get_all(references)), name='delete_emails_firestore')
+        count_reads('delete_emails_firestore', len(references))
+        return [doc for doc in docs if doc.exists]
+
+    def commit_chunk(snapshots: List[Any]) -> None:
+        while snapshots:
+            batch = client.batch()
+            bucket_counts: Dict[tuple, int] = {}
+            domain_counts: Dict[str, int] = {}
+            for snapshot in snapshots:
+                data = snapshot.to_dict() or {}
+                batch.delete(snapshot.reference, option=client.write_option(exists=True))
+                if data.get('created_at'):
+                    for bucket in rollup_buckets(data['created_at']):
+                        bucket_counts[bucket] = bucket_counts.get(bucket, 0) + 1
+                domain = data.get('email_domain') or email_domain(data.get('email') or snapshot.id)
+                domain_counts[domain] = domain_counts.get(domain, 0) + 1
+            for (granularity, bucket_id, bucket_start), count in bucket_counts.items():
+                add_bucket_increment(client, batch, granularity, bucket_id, bucket_start, -count)
+            for domain, count in domain_counts.items():
+                add_domain_increment(client, batch, domain, -count)
+            try:
+                with_retry(batch.commit)
+            except NotFound:
+                # Applied by an earlier attempt, or an entry was deleted meanwhile
+                snapshots = read_existing([snapshot.reference for snapshot in snapshots])
+                continue
+            count_writes('delete_emails_firestore', len(bucket_counts) + len(domain_counts), len(snapshots))
+            return
+
+    for chunk in _chunks(sorted(emails), DELETE_CHUNK_SIZE):
+        try:
+            snapshots = read_existing([collection.document(email) for email in chunk])
+        except Exception as e:
+            print(f"⚠ Error reading entries to delete: {e}")
+            executor.wait()
+            print("⚠ Deletion stopped early; rerun the job to delete the rest")
+            return deleted
+        deleted += len(snapshots)
+        if snapshots and not dry_run:
+            executor.submit(commit_chunk, snapshots)
+
+    if executor.wait():
+        print("⚠ Some deletions failed; rerun the job to retry them")
+    return deleted
+
+
+def compact_firestore(client: Any, policy: RetentionPolicy, dry_run: bool, workers: int,
+                      page_size: int = COMPACTION_PAGE_SIZE) -> int:
+    """
+    Apply the retention policy to every entry older than its cutoff.
+
+    Pages through entries with created_at before the cutoff (in created_at
+    order, see iter_waitlist_by_created) and commits one batch of updates
+    per page. Already compliant entries are not rewritten,
+    so reruns only touch newly expired entries.
+
+    Returns:
+        Number of entries updated (or that would be)
+    """
+    cutoff = policy.scan_cutoff.isoformat()
+    executor = BoundedExecutor(workers)
+    updated = 0
+
+    def commit_page(changes: List[tuple]) -> None:
+        with BatchWriter(client) as writer:
+            for reference, updates in changes:
+                writer.update(reference, {
+                    field: firestore.DELETE_FIELD if value is None else value
+                    for field, value in updates.items()
+                })
+
+    entries = iter_waitlist_by_created(client, end=cutoff, page_size=page_size, operation='compact_firestore')
+    while True:
+        docs = list(itertools.islice(entries, page_size))
+        if not docs:
+            break
+
+        changes = []
+        for doc in docs:
+            updates = policy.updates_for(doc.to_dict() or {})
+            if updates:
+                changes.append((doc.reference, updates))
+        updated += len(changes)
+        if changes and not dry_run:
+            executor.submit(commit_page, changes)
+        if len(docs) < page_size:
+            break
+
+    if executor.wait():
+        print("⚠ Some compaction batches failed; rerun the job to retry them")
+    return updated
+
+
+def apply_to_json_store(emails: Set[str], policy: RetentionPolicy, dry_run: bool) -> Dict[str, int]:
+    """
+    Apply deletions and the retention policy to the waitlist.json fallback store.
+
+    Returns:
+        Counts of deleted and updated entries
+    """
+    from waitlist import load_waitlist, save_waitlist
+
+    waitlist = load_waitlist()
+    kept = []
+    counts = {'deleted': 0, 'updated': 0}
+    for entry in waitlist:
+        if (entry.get('email') or '').lower() in emails:
+            counts['deleted'] += 1
+            continue
+        updates = policy.updates_for(entry) if policy.enabled else {}
+        if updates:
+            counts['updated'] += 1
+            entry = dict(entry)
+            for field, value in updates.items():
+                if value is None:
+                    entry.pop(field, None)
+                else:
+                    entry[field] = value
+        kept.append(entry)
+
+    if not dry_run and (counts['deleted'] or counts['updated']):
+        save_waitlist(kept)
+    return counts
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='GDPR deletion and data-retention compaction')
+    parser.add_argument('--delete', nargs='*', default=[], metavar='EMAIL', help='Emails to delete')
+    parser.add_argument('--delete-file', action='append', default=[],
+                        help='File of emails to delete, one per line')
+    parser.add_argument('--ip-days', type=int, help='Coarsen IPs of entries older than this many days')
+    parser.add_argument('--ip-action', choices=['truncate', 'drop'], default='truncate',
+                        help='truncate to /24 (IPv4) or /48 (IPv6), or drop the field')
+    parser.add_argument('--created-at-days', type=int,
+                        help='Truncate created_at/timestamp of entries older than this many days to the hour')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Batches committed in parallel')
+    parser.add_argument('--skip-json', action='store_true', help='Leave the waitlist.json fallback untouched')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+    args = parser.parse_args()
+
+    emails = read_email_list(args.delete_file, args.delete)
+    policy = RetentionPolicy(args.ip_days, args.ip_action, args.created_at_days)
+    if not emails and not policy.enabled:
+        parser.error('nothing to do: pass --delete/--delete-file and/or a retention policy')
+
+    verb = 'Would' if args.dry_run else 'Did'
+    client = get_firestore_client()
+    if client:
+        if emails:
+            deleted = delete_emails_firestore(client, emails, args.dry_run, args.workers)
+            print(f"✓ {verb} delete {deleted} of {len(emails)} requested emails from Firestore")
+            if deleted and not args.dry_run:
+                # Deleted referrers must not stay on the public leaderboard
+                rebuild_referral_leaderboard()
+        if policy.enabled:
+            updated = compact_firestore(client, policy, args.dry_run, args.workers)
+            print(f"✓ {verb} compact {updated} Firestore entries")
+    else:
+        print("⚠ Firestore not available; only the JSON fallback store will be processed")
+
+    if not args.skip_json:
+        counts = apply_to_json_store(emails, policy, args.dry_run)
+        print(f"✓ {verb} delete {counts['deleted']} and compact {counts['updated']} waitlist.json entries")
+
+
+if __name__ == '__main__':
+    main()
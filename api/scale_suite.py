@@ -0,0 +1,270 @@
+"""
+Scale suite for the offline tooling and the JSON fallback.
+Runs migration (migrate_from_json), listing (get_all_waitlist_entries),
+counting (get_waitlist_count) and JSON-fallback signups (waitlist.handler)
+against generated datasets of increasing size, using the in-memory
+Firestore stand-in from fake_firestore.py. Each scenario runs in its own
+process so peak memory is measured cleanly. Reports time and peak memory
+per size and flags growth that is worse than linear between sizes.
+
+Usage:
+    python scale_suite.py
+    python scale_suite.py --sizes 10000,100000,1000000,10000000 --data-dir /tmp/waitlist_scale --json results.json
+    WAITLIST_ORDER_SHARDS_READY=1 python scale_suite.py --scenarios list   # shard-merged listing
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+from typing import Any, Dict, List, Optional
+
+# Add parent directory to path to import sibling modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_waitlist_dataset import ensure_dataset, iter_dataset
+
+
+SCENARIOS = ('migrate', 'list', 'count', 'fallback_signup')
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), 'waitlist_scale')
+
+# Signups made through the JSON fallback per size; half repeat an existing email
+FALLBACK_SIGNUPS = 10
+
+# Growth exponent (log time ratio / log size ratio) above which a step is flagged
+SUPERLINEAR_THRESHOLD = 1.25
+
+# Peaks below this are dominated by interpreter noise and not compared
+MIN_COMPARABLE_BYTES = 4 * 1024 * 1024
+
+
+def _current_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return _peak_rss()
+
+
+def _peak_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _seed_store(path: str) -> int:
+    """Load a dataset straight into the fake store the way add_waitlist_entry would lay it out."""
+    import fake_firestore
+    from firestore_service import COLLECTION_NAME, email_domain, order_shard
+
+    collection = fake_firestore.store.collection(COLLECTION_NAME)
+    for record in iter_dataset(path):
+        email = record['email'].lower()
+        collection.setdefault(email, {
+            'email': email,
+            'timestamp': record['timestamp'],
+            'ip': record['ip'],
+            'created_at': record['created_at'],
+            'email_domain': email_domain(email),
+            'order_shard': order_shard(email),
+        })
+    return len(collection)
+
+
+def _run_scenario(scenario: str, path: str) -> Dict[str, Any]:
+    """
+    Run one scenario against one dataset in this process.
+
+    Setup (seeding the store, copying the fallback file) is excluded from the
+    measurement; the peak is the high-water RSS above the RSS after setup.
+
+    Returns:
+        Result dict with seconds, peak_bytes and scenario-specific details
+    """
+    details: Dict[str, Any] = {}
+
+    if scenario == 'fallback_signup':
+        work_dir = tempfile.mkdtemp(prefix='waitlist_scale_')
+        os.environ['WAITLIST_JSON_PATH'] = os.path.join(work_dir, 'waitlist.json')
+        shutil.copyfile(path, os.environ['WAITLIST_JSON_PATH'])
+        os.environ.pop('TRAFFIC_CAPTURE_PATH', None)
+        import waitlist
+        waitlist.FIRESTORE_AVAILABLE = False
+        waitlist.send_waitlist_notification = lambda email, total_count: None
+        existing = next(iter_dataset(path))['email']
+        requests = []
+        for i in range(FALLBACK_SIGNUPS):
+            email = f"scale-suite-{i}@example.com" if i % 2 == 0 else existing.upper()
+            requests.append({'method': 'POST', 'headers': {'x-forwarded-for': '10.0.0.1'},
+                             'body': json.dumps({'email': email})})
+
+        def run():
+            statuses = [waitlist.handler(request)['statusCode'] for request in requests]
+            details['statuses'] = sorted(set(statuses))
+    else:
+        import fake_firestore
+        fake_firestore.install()
+        import firestore_service
+        if scenario != 'migrate':
+            details['seeded'] = _seed_store(path)
+
+        def run():
+            if scenario == 'migrate':
+                details['migrated'] = firestore_service.migrate_from_json(path)
+            elif scenario == 'list':
+                details['listed'] = len(firestore_service.get_all_waitlist_entries())
+            else:
+                details['counted'] = firestore_service.get_waitlist_count()
+            details['rpc'] = dict(fake_firestore.store.stats)
+
+    baseline = _current_rss()
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    peak = max(_peak_rss() - baseline, 0)
+
+    if scenario == 'fallback_signup':
+        details['per_signup_ms'] = round(seconds * 1000 / FALLBACK_SIGNUPS, 2)
+        shutil.rmtree(os.path.dirname(os.environ['WAITLIST_JSON_PATH']), ignore_errors=True)
+    return dict(details, seconds=round(seconds, 4), peak_bytes=peak)
+
+
+def run_isolated(scenario: str, path: str, timeout: Optional[float]) -> Dict[str, Any]:
+    """Run a scenario in a fresh interpreter and return its result."""
+    try:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-one', scenario, path],
+            capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {'error': f'timed out after {timeout:g}s'}
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        return {'error': (completed.stderr.strip().splitlines() or ['no output'])[-1]}
+    return json.loads(lines[-1])
+
+
+def growth_exponent(n1: int, v1: float, n2: int, v2: float) -> Optional[float]:
+    """Exponent k such that v grows like n**k between two sizes."""
+    if v1 <= 0 or v2 <= 0 or n1 == n2:
+        return None
+    return math.log(v2 / v1) / math.log(n2 / n1)
+
+
+def analyze(sizes: List[int], results: Dict[str, Dict[int, Dict[str, Any]]],
+            threshold: float = SUPERLINEAR_THRESHOLD) -> List[str]:
+    """
+    Attach growth exponents to each result and collect super-linear steps.
+
+    Returns:
+        Human-readable warnings, one per flagged step
+    """
+    warnings = []
+    for scenario, by_size in results.items():
+        previous = None
+        for size in sizes:
+            result = by_size.get(size)
+            if not result or 'error' in result:
+                previous = None
+                continue
+            if previous:
+                prev_size, prev = previous
+                time_k = growth_exponent(prev_size, prev['seconds'], size, result['seconds'])
+                result['time_exponent'] = round(time_k, 2) if time_k is not None else None
+                if time_k is not None and time_k > threshold:
+                    warnings.append(f"{scenario}: time grows ~n^{time_k:.2f} from {prev_size} to {size}")
+                if min(prev['peak_bytes'], result['peak_bytes']) >= MIN_COMPARABLE_BYTES:
+                    memory_k = growth_exponent(prev_size, prev['peak_bytes'], size, result['peak_bytes'])
+                    result['memory_exponent'] = round(memory_k, 2) if memory_k is not None else None
+                    if memory_k is not None and memory_k > threshold:
+                        warnings.append(f"{scenario}: peak memory grows ~n^{memory_k:.2f} from {prev_size} to {size}")
+            previous = (size, result)
+    return warnings
+
+
+def print_report(sizes: List[int], results: Dict[str, Dict[int, Dict[str, Any]]], warnings: List[str],
+                 threshold: float = SUPERLINEAR_THRESHOLD) -> None:
+    """Print one table per scenario."""
+    for scenario, by_size in results.items():
+        print(f"\n{scenario}")
+        print(f"  {'entries':>10s} {'seconds':>10s} {'us/entry':>9s} {'peak MB':>9s} {'time k':>7s} {'mem k':>6s}")
+        for size in sizes:
+            result = by_size.get(size, {})
+            if 'error' in result:
+                print(f"  {size:>10d}  ⚠ {result['error']}")
+                continue
+            time_k = result.get('time_exponent')
+            memory_k = result.get('memory_exponent')
+            print(f"  {size:>10d} {result['seconds']:>10.3f} {result['seconds'] * 1e6 / size:>9.2f} "
+                  f"{result['peak_bytes'] / 1e6:>9.1f} {'' if time_k is None else f'{time_k:.2f}':>7s} "
+                  f"{'' if memory_k is None else f'{memory_k:.2f}':>6s}")
+    print()
+    if warnings:
+        for warning in warnings:
+            print(f"⚠ Super-linear growth: {warning}")
+    else:
+        print(f"✓ No super-linear growth (threshold n^{threshold:g})")
+
+
+def main():
+    """Command-line entry point."""
+    if len(sys.argv) == 4 and sys.argv[1] == '--run-one':
+        print(json.dumps(_run_scenario(sys.argv[2], sys.argv[3])))
+        return
+
+    parser = argparse.ArgumentParser(description='Run the waitlist tooling against growing synthetic datasets')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='Comma-separated dataset sizes')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"Subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help='Where generated datasets are cached')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=float, default=3600, help='Seconds allowed per scenario run')
+    parser.add_argument('--threshold', type=float, default=SUPERLINEAR_THRESHOLD,
+                        help='Growth exponent that counts as super-linear')
+    parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    try:
+        sizes = sorted({int(size) for size in args.sizes.split(',') if size.strip()})
+    except ValueError:
+        parser.error('--sizes must be comma-separated integers')
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(',') if scenario.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results: Dict[str, Dict[int, Dict[str, Any]]] = {scenario: {} for scenario in scenarios}
+    for size in sizes:
+        print(f"Dataset of {size} entries...")
+        path = ensure_dataset(args.data_dir, size, args.seed)
+        for scenario in scenarios:
+            result = run_isolated(scenario, path, args.timeout)
+            results[scenario][size] = result
+            if 'error' in result:
+                print(f"  ⚠ {scenario}: {result['error']}")
+            else:
+                per_signup = f", {result['per_signup_ms']} ms/signup" if 'per_signup_ms' in result else ''
+                print(f"  {scenario}: {result['seconds']:.3f}s, peak {result['peak_bytes'] / 1e6:.1f} MB{per_signup}")
+
+    warnings = analyze(sizes, results, args.threshold)
+    print_report(sizes, results, warnings, args.threshold)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'sizes': sizes, 'results': results, 'warnings': warnings}, f, indent=2)
+        print(f"✓ Results written to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,375 @@
+"""
+Self-hosted server entry point for the Trinity Engine website.
+Adapts the waitlist handler to WSGI and ASGI and serves the static site.
+
+Run under a multi-worker server, e.g.:
+    gunicorn --chdir api -w 4 --keep-alive 5 server:application
+    uvicorn --app-dir api server:asgi_application --workers 4
+or locally with the standard library:
+    python api/server.py --port 8000
+"""
+
+import os
+import sys
+import asyncio
+import mimetypes
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from typing import Dict, Optional, Tuple, List
+
+# Add this directory to path so the handler's sibling imports resolve
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from waitlist import (
+    handler as waitlist_handler,
+    count_handler as waitlist_count_handler,
+    leaderboard_handler as waitlist_leaderboard_handler,
+    metrics_handler as waitlist_metrics_handler
+)
+
+
+# Root of the static site (repository root, or the build output of build_assets.py)
+SITE_ROOT = os.path.abspath(os.environ.get('SITE_ROOT') or os.path.join(os.path.dirname(__file__), '..'))
+
+# Top-level files that may be served; everything else must live under a static directory
+STATIC_FILES = {'index.html', 'privacy.html', 'roadmap.html', 'terms.html', 'styles.css', 'script.js'}
+STATIC_DIRS = ('assets/',)
+
+# API routes mapped to Vercel-style handlers
+API_ROUTES = {
+    '/api/waitlist': waitlist_handler,
+    '/api/waitlist/count': waitlist_count_handler,
+    '/api/waitlist/leaderboard': waitlist_leaderboard_handler,
+    '/api/waitlist/metrics': waitlist_metrics_handler,
+}
+
+# Largest API request body that will be read
+MAX_BODY_BYTES = 64 * 1024
+
+# Chunk size for streaming static files
+CHUNK_SIZE = 64 * 1024
+
+# Filenames carrying a content hash (e.g. styles.3f2a9c1b.css) never change
+FINGERPRINT_RE = re.compile(r'\.[0-9a-f]{8,}\.[A-Za-z0-9]+$')
+
+# Precompressed variants looked up next to each file, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Cache of (mtime, size) -> response metadata per resolved file path
+_static_meta_cache: Dict[str, Tuple[float, int, Dict[str, str]]] = {}
+
+
+def resolve_static_path(url_path: str) -> Optional[str]:
+    """
+    Map a URL path to a file under SITE_ROOT, refusing anything outside the static whitelist.
+
+    Args:
+        url_path: Request path (e.g. '/assets/ui-showcase.css')
+
+    Returns:
+        Absolute file path, or None if the path is not servable
+    """
+    rel = url_path.lstrip('/') or 'index.html'
+    if rel.endswith('/'):
+        rel += 'index.html'
+    rel = os.path.normpath(rel).replace(os.sep, '/')
+    if rel.startswith('..') or rel.startswith('/'):
+        return None
+    if rel not in STATIC_FILES and not rel.startswith(STATIC_DIRS):
+        return None
+
+    path = os.path.join(SITE_ROOT, rel)
+    if not os.path.isfile(path):
+        return None
+    return path
+
+
+def _static_metadata(path: str, stat: os.stat_result) -> Dict[str, str]:
+    """Build (and cache) the validator and caching headers for a static file."""
+    cached = _static_meta_cache.get(path)
+    if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        return cached[2]
+
+    content_type, _ = mimetypes.guess_type(path)
+    if content_type is None:
+        content_type = 'application/octet-stream'
+    elif content_type.startswith('text/') or content_type == 'application/javascript':
+        content_type += '; charset=utf-8'
+
+    if FINGERPRINT_RE.search(os.path.basename(path)):
+        cache_control = 'public, max-age=31536000, immutable'
+    elif path.endswith('.html'):
+        cache_control = 'no-cache'
+    else:
+        cache_control = 'public, max-age=3600'
+
+    meta = {
+        'Content-Type': content_type,
+        'Cache-Control': cache_control,
+        'ETag': f'"{int(stat.st_mtime_ns):x}-{stat.st_size:x}"',
+        'Last-Modified': formatdate(stat.st_mtime, usegmt=True),
+    }
+    _static_meta_cache[path] = (stat.st_mtime, stat.st_size, meta)
+    return meta
+
+
+def prepare_static_response(url_path: str, request_headers: Dict[str, str]) -> Tuple[int, List[Tuple[str, str]], Optional[str]]:
+    """
+    Decide how to answer a static file request.
+
+    Honors conditional requests (ETag / Last-Modified) and serves a
+    precompressed .br/.gz sibling when the client accepts it.
+
+    Args:
+        url_path: Request path
+        request_headers: Request headers with lowercase names
+
+    Returns:
+        Tuple of (status, response headers, file path to send or None)
+    """
+    path = resolve_static_path(url_path)
+    if path is None:
+        return 404, [('Content-Type', 'text/plain; charset=utf-8')], None
+
+    stat = os.stat(path)
+    meta = _static_metadata(path, stat)
+    headers = [(k, v) for k, v in meta.items() if k != 'ETag']
+    headers.append(('Vary', 'Accept-Encoding'))
+
+    send_path = path
+    size = stat.st_size
+    etag = meta['ETag']
+    accept_encoding = request_headers.get('accept-encoding', '')
+    for encoding, suffix in ENCODINGS:
+        if encoding in accept_encoding and os.path.isfile(path + suffix):
+            send_path = path + suffix
+            size = os.path.getsize(send_path)
+            etag = f'{etag[:-1]}-{encoding}"'
+            headers.append(('Content-Encoding', encoding))
+            break
+    headers.append(('ETag', etag))
+
+    if_none_match = request_headers.get('if-none-match')
+    if if_none_match:
+        if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+            return 304, [h for h in headers if h[0] != 'Content-Encoding'], None
+    elif request_headers.get('if-modified-since'):
+        try:
+            since = parsedate_to_datetime(request_headers['if-modified-since']).timestamp()
+            if int(stat.st_mtime) <= since:
+                return 304, [h for h in headers if h[0] != 'Content-Encoding'], None
+        except (TypeError, ValueError):
+            pass
+
+    headers.append(('Content-Length', str(size)))
+    return 200, headers, send_path
+
+
+def call_api_handler(route_handler, method: str, body: bytes, headers: Dict[str, str], remote_addr: str) -> Tuple[int, List[Tuple[str, str]], bytes]:
+    """
+    Invoke a Vercel-style handler with a dict-shaped request.
+
+    Args:
+        route_handler: Handler taking {'method', 'body', 'headers'}
+        method: HTTP method
+        body: Raw request body
+        headers: Request headers with lowercase names
+        remote_addr: Peer address, used when no X-Forwarded-For is present
+
+    Returns:
+        Tuple of (status, response headers, response body)
+    """
+    request_headers = dict(headers)
+    request_headers.setdefault('x-forwarded-for', remote_addr or 'unknown')
+    request = {
+        'method': method,
+        'body': body.decode('utf-8', errors='replace') if body else '{}',
+        'headers': request_headers,
+    }
+    response = route_handler(request)
+    payload = response.get('body', '')
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    response_headers = list(response.get('headers', {}).items())
+    response_headers.append(('Content-Length', str(len(payload))))
+    return response.get('statusCode', 200), response_headers, payload
+
+
+def _status_line(status: int) -> str:
+    """Format a WSGI status line."""
+    try:
+        return f"{status} {HTTPStatus(status).phrase}"
+    except ValueError:
+        return str(status)
+
+
+def application(environ, start_response):
+    """
+    WSGI application serving the waitlist API and the static site.
+    """
+    method = environ.get('REQUEST_METHOD', 'GET').upper()
+    path = environ.get('PATH_INFO', '/') or '/'
+    headers = {
+        key[5:].replace('_', '-').lower(): value
+        for key, value in environ.items() if key.startswith('HTTP_')
+    }
+    if environ.get('CONTENT_TYPE'):
+        headers['content-type'] = environ['CONTENT_TYPE']
+
+    route_handler = API_ROUTES.get(path.rstrip('/') or '/')
+    if route_handler is not None:
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length > MAX_BODY_BYTES:
+            start_response(_status_line(413), [('Content-Type', 'text/plain; charset=utf-8')])
+            return [b'Request body too large']
+        body = environ['wsgi.input'].read(length) if length else b''
+        status, response_headers, payload = call_api_handler(
+            route_handler, method, body, headers, environ.get('REMOTE_ADDR', 'unknown'))
+        start_response(_status_line(status), response_headers)
+        return [payload]
+
+    if method not in ('GET', 'HEAD'):
+        start_response(_status_line(405), [('Allow', 'GET, HEAD'), ('Content-Type', 'text/plain; charset=utf-8')])
+        return [b'Method not allowed']
+
+    status, response_headers, send_path = prepare_static_response(path, headers)
+    start_response(_status_line(status), response_headers)
+    if status == 404:
+        return [b'Not found']
+    if send_path is None or method == 'HEAD':
+        return [b'']
+
+    f = open(send_path, 'rb')
+    file_wrapper = environ.get('wsgi.file_wrapper')
+    if file_wrapper is not None:
+        # Lets servers such as gunicorn use sendfile()
+        return file_wrapper(f, CHUNK_SIZE)
+    return _iter_file(f)
+
+
+def _iter_file(f):
+    """Stream a file in chunks, closing it afterwards."""
+    try:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
+
+
+async def asgi_application(scope, receive, send):
+    """
+    ASGI application serving the waitlist API and the static site.
+
+    The waitlist handler is synchronous, so it runs on the default thread
+    pool; the event loop keeps serving keep-alive connections meanwhile.
+    """
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] != 'http':
+        return
+
+    method = scope['method'].upper()
+    path = scope.get('path', '/') or '/'
+    headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope.get('headers', [])}
+
+    route_handler = API_ROUTES.get(path.rstrip('/') or '/')
+    if route_handler is not None:
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                await _asgi_send(send, 413, [('Content-Type', 'text/plain; charset=utf-8')], b'Request body too large')
+                return
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        client = scope.get('client') or ('unknown', 0)
+        status, response_headers, payload = await asyncio.to_thread(
+            call_api_handler, route_handler, method, b''.join(chunks), headers, client[0])
+        await _asgi_send(send, status, response_headers, payload)
+        return
+
+    if method not in ('GET', 'HEAD'):
+        await _asgi_send(send, 405, [('Allow', 'GET, HEAD'), ('Content-Type', 'text/plain; charset=utf-8')], b'Method not allowed')
+        return
+
+    status, response_headers, send_path = await asyncio.to_thread(prepare_static_response, path, headers)
+    if status == 404:
+        await _asgi_send(send, status, response_headers, b'Not found')
+        return
+
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response_headers],
+    })
+    if send_path is None or method == 'HEAD':
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    if 'http.response.pathsend' in scope.get('extensions', {}):
+        # Server sends the file itself (zero-copy where supported)
+        await send({'type': 'http.response.pathsend', 'path': send_path})
+        return
+
+    f = await asyncio.to_thread(open, send_path, 'rb')
+    try:
+        while True:
+            chunk = await asyncio.to_thread(f.read, CHUNK_SIZE)
+            more = len(chunk) == CHUNK_SIZE
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': more})
+            if not more:
+                break
+    finally:
+        f.close()
+
+
+async def _asgi_send(send, status: int, headers: List[Tuple[str, str]], body: bytes) -> None:
+    """Send a complete, non-streamed ASGI response."""
+    header_names = {k.lower() for k, _ in headers}
+    if 'content-length' not in header_names:
+        headers = headers + [('Content-Length', str(len(body)))]
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def main():
+    """Run the WSGI app on the standard library server (development only)."""
+    import argparse
+    from wsgiref.simple_server import make_server
+
+    parser = argparse.ArgumentParser(description='Serve the Trinity Engine site and waitlist API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    with make_server(args.host, args.port, application) as httpd:
+        print(f"✓ Serving on http://{args.host}:{args.port}")
+        httpd.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
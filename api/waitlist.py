@@ -6,9 +6,12 @@ Uses Firestore for storage with JSON fallback.
 
 import json
 import os
-import re
+import hmac
+import heapq
+import hashlib
+import time
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 try:
     from gmail_service import send_waitlist_notification
@@ -22,46 +25,128 @@ try:
         add_waitlist_entry,
         get_waitlist_entry,
         get_waitlist_count,
+        get_referral_leaderboard,
         FIRESTORE_AVAILABLE
     )
 except ImportError:
     FIRESTORE_AVAILABLE = False
-    def add_waitlist_entry(email: str, ip: str = 'unknown') -> bool:
+    def add_waitlist_entry(email: str, ip: str = 'unknown', referral_code=None) -> bool:
         return False
     def get_waitlist_entry(email: str):
         return None
     def get_waitlist_count() -> int:
         return 0
+    def get_referral_leaderboard():
+        return []
 
 
-def validate_email(email: str) -> bool:
-    """Validate email format."""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+from count_cache import StaleWhileRevalidateCache, count_cache_headers, versioned_cache_headers, etag_matches
+from capture import capture_traffic
+from retry import within_deadline, retry_stats
+from firestore_cost import track_firestore_cost, cost_metrics
+from email_validation import normalize_email, email_problem, EMAIL_PROBLEM_MESSAGES
+from referrals import (
+    REFERRAL_LEADERBOARD_SIZE,
+    referral_code_for,
+    normalize_referral_code,
+    mask_email,
+    public_leaderboard
+)
+
+
+# Bearer token required by the metrics endpoint (disabled when unset)
+ADMIN_API_TOKEN = os.environ.get('ADMIN_API_TOKEN', '')
+
+# JSON fallback store, used when Firestore is unavailable
+WAITLIST_JSON_PATH = os.environ.get(
+    'WAITLIST_JSON_PATH', os.path.join(os.path.dirname(__file__), '..', 'waitlist.json')
+)
+
+# Public waitlist count, refreshed at most once per TTL per instance
+waitlist_count_cache = StaleWhileRevalidateCache(
+    lambda: get_waitlist_count() if FIRESTORE_AVAILABLE else len(load_waitlist())
+)
+
+
+def signup_total_count(signed_up_at: float) -> int:
+    """
+    Waitlist size to report for a signup committed after signed_up_at (time.time()).
+    
+    Uses the cached count, adding the new signup unless the count was loaded
+    after it was written.
+    """
+    count, loaded_at = waitlist_count_cache.get()
+    return count if loaded_at >= signed_up_at else count + 1
+
+
+def load_referral_leaderboard() -> List[Dict[str, Any]]:
+    """Top referrers from Firestore's leaderboard document, or from the JSON fallback."""
+    if FIRESTORE_AVAILABLE:
+        return public_leaderboard(get_referral_leaderboard())
+    top = heapq.nlargest(
+        REFERRAL_LEADERBOARD_SIZE,
+        (entry for entry in load_waitlist() if entry.get('referral_count')),
+        key=lambda entry: entry['referral_count']
+    )
+    return [{'name': mask_email(entry.get('email', '')), 'count': entry['referral_count']} for entry in top]
+
+
+# Public top referrers, refreshed at most once per TTL per instance
+referral_leaderboard_cache = StaleWhileRevalidateCache(load_referral_leaderboard)
 
 
 def load_waitlist() -> list:
     """Load waitlist from JSON file (fallback only)."""
-    waitlist_path = os.path.join(os.path.dirname(__file__), '..', 'waitlist.json')
-    if os.path.exists(waitlist_path):
+    if os.path.exists(WAITLIST_JSON_PATH):
         try:
-            with open(waitlist_path, 'r', encoding='utf-8') as f:
+            with open(WAITLIST_JSON_PATH, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except (json.JSONDecodeError, IOError):
             return []
     return []
 
 
+def add_to_json_waitlist(email: str, ip_address: str, referral_code: Optional[str] = None) -> Optional[int]:
+    """
+    Add a signup to the JSON fallback store, crediting its referrer.
+    
+    Returns:
+        The new total, or None if the email is already on the waitlist
+    """
+    waitlist = load_waitlist()
+    existing_emails = [entry.get('email', '').lower() for entry in waitlist]
+    if email in existing_emails:
+        return None
+    
+    signup_entry = {
+        'email': email,
+        'timestamp': datetime.utcnow().isoformat(),
+        'ip': ip_address,
+        'referral_code': referral_code_for(email)
+    }
+    if referral_code and referral_code != signup_entry['referral_code']:
+        for entry in waitlist:
+            if entry.get('referral_code') == referral_code:
+                entry['referral_count'] = entry.get('referral_count', 0) + 1
+                signup_entry['referred_by'] = referral_code
+                break
+    waitlist.append(signup_entry)
+    save_waitlist(waitlist)
+    return len(waitlist)
+
+
 def save_waitlist(waitlist: list) -> None:
     """Save waitlist to JSON file (fallback only)."""
-    waitlist_path = os.path.join(os.path.dirname(__file__), '..', 'waitlist.json')
     try:
-        with open(waitlist_path, 'w', encoding='utf-8') as f:
+        with open(WAITLIST_JSON_PATH, 'w', encoding='utf-8') as f:
             json.dump(waitlist, f, indent=2, ensure_ascii=False)
     except IOError as e:
         print(f"Error saving waitlist: {e}")
 
 
+@capture_traffic
+@within_deadline()
+@track_firestore_cost
 def handler(request):
     """
     Serverless function handler for waitlist signups (Vercel Python runtime).
@@ -77,11 +162,12 @@ def handler(request):
         "message": str
     }
     """
-    # Handle CORS
+    # Handle CORS; script.js sends Idempotency-Key, which is safe to ignore
+    # here because a repeated signup for the same email is already a no-op
     headers = {
         'Access-Control-Allow-Origin': '*',
         'Access-Control-Allow-Methods': 'POST, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type',
+        'Access-Control-Allow-Headers': 'Content-Type, Idempotency-Key',
         'Content-Type': 'application/json'
     }
     
@@ -115,7 +201,10 @@ def handler(request):
         else:
             data = body
         
-        email = data.get('email', '').strip().lower()
+        email = normalize_email(data.get('email'))
+        
+        # An unknown or malformed referral code never blocks the signup
+        referral_code = normalize_referral_code(data.get('referral_code'))
         
         # Validate email
         if not email:
@@ -128,13 +217,15 @@ def handler(request):
                 })
             }
         
-        if not validate_email(email):
+        # Malformed and disposable addresses are rejected before any I/O
+        problem = email_problem(email)
+        if problem:
             return {
                 'statusCode': 400,
                 'headers': headers,
                 'body': json.dumps({
                     'success': False,
-                    'message': 'Invalid email address format'
+                    'message': EMAIL_PROBLEM_MESSAGES[problem]
                 })
             }
         
@@ -146,7 +237,6 @@ def handler(request):
             # Check if email already exists
             existing = get_waitlist_entry(email)
             if existing:
-                total_count = get_waitlist_count()
                 return {
                     'statusCode': 200,
                     'headers': headers,
@@ -157,14 +247,14 @@ def handler(request):
                 }
             
             # Add to Firestore
-            if add_waitlist_entry(email, ip_address):
-                total_count = get_waitlist_count()
+            signed_up_at = time.time()
+            if add_waitlist_entry(email, ip_address, referral_code):
+                total_count = signup_total_count(signed_up_at)
             else:
                 # Firestore failed, fallback to JSON
                 print("⚠ Firestore operation failed, falling back to JSON")
-                waitlist = load_waitlist()
-                existing_emails = [entry.get('email', '').lower() for entry in waitlist]
-                if email in existing_emails:
+                total_count = add_to_json_waitlist(email, ip_address, referral_code)
+                if total_count is None:
                     return {
                         'statusCode': 200,
                         'headers': headers,
@@ -173,20 +263,10 @@ def handler(request):
                             'message': 'You are already on the waitlist!'
                         })
                     }
-                
-                signup_entry = {
-                    'email': email,
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'ip': ip_address
-                }
-                waitlist.append(signup_entry)
-                save_waitlist(waitlist)
-                total_count = len(waitlist)
         else:
             # Use JSON fallback
-            waitlist = load_waitlist()
-            existing_emails = [entry.get('email', '').lower() for entry in waitlist]
-            if email in existing_emails:
+            total_count = add_to_json_waitlist(email, ip_address, referral_code)
+            if total_count is None:
                 return {
                     'statusCode': 200,
                     'headers': headers,
@@ -195,15 +275,6 @@ def handler(request):
                         'message': 'You are already on the waitlist!'
                     })
                 }
-            
-            signup_entry = {
-                'email': email,
-                'timestamp': datetime.utcnow().isoformat(),
-                'ip': ip_address
-            }
-            waitlist.append(signup_entry)
-            save_waitlist(waitlist)
-            total_count = len(waitlist)
         
         # Send notification email
         try:
@@ -217,7 +288,8 @@ def handler(request):
             'headers': headers,
             'body': json.dumps({
                 'success': True,
-                'message': 'Thank you for joining the waitlist! We\'ll notify you when Trinity Engine is ready.'
+                'message': 'Thank you for joining the waitlist! We\'ll notify you when Trinity Engine is ready.',
+                'referral_code': referral_code_for(email)
             })
         }
     
@@ -241,3 +313,198 @@ def handler(request):
             })
         }
 
+
+
+
+@track_firestore_cost
+def count_handler(request):
+    """
+    Serverless function handler returning the public waitlist count.
+    
+    Served from an in-process stale-while-revalidate cache with ETag and
+    Cache-Control headers, so browsers and CDNs absorb most page views.
+    
+    Returns:
+    {
+        "success": bool,
+        "count": int
+    }
+    """
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type',
+        'Content-Type': 'application/json'
+    }
+    
+    method = request.get('method', 'GET')
+    
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': ''
+        }
+    
+    if method not in ('GET', 'HEAD'):
+        return {
+            'statusCode': 405,
+            'headers': headers,
+            'body': json.dumps({
+                'success': False,
+                'message': 'Method not allowed'
+            })
+        }
+    
+    count, loaded_at = waitlist_count_cache.get()
+    headers.update(count_cache_headers(count, loaded_at))
+    
+    if etag_matches(request.get('headers', {}).get('if-none-match'), headers['ETag']):
+        return {
+            'statusCode': 304,
+            'headers': headers,
+            'body': ''
+        }
+    
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': json.dumps({
+            'success': True,
+            'count': count
+        })
+    }
+
+
+@track_firestore_cost
+def leaderboard_handler(request):
+    """
+    Serverless function handler returning the top referrers.
+    
+    Firestore keeps the leaderboard in a single document that signups update
+    incrementally, so a cache refresh is one document read regardless of
+    waitlist size; the response is cached in-process and by browsers/CDNs.
+    
+    Returns:
+    {
+        "success": bool,
+        "leaderboard": [{"name": str, "count": int}, ...]
+    }
+    """
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type',
+        'Content-Type': 'application/json'
+    }
+    
+    method = request.get('method', 'GET')
+    
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': ''
+        }
+    
+    if method not in ('GET', 'HEAD'):
+        return {
+            'statusCode': 405,
+            'headers': headers,
+            'body': json.dumps({
+                'success': False,
+                'message': 'Method not allowed'
+            })
+        }
+    
+    leaderboard, loaded_at = referral_leaderboard_cache.get()
+    body = json.dumps({
+        'success': True,
+        'leaderboard': leaderboard or []
+    })
+    version = hashlib.sha256(body.encode('utf-8')).hexdigest()[:16]
+    headers.update(versioned_cache_headers(f"leaderboard-{version}", loaded_at))
+    
+    if etag_matches(request.get('headers', {}).get('if-none-match'), headers['ETag']):
+        return {
+            'statusCode': 304,
+            'headers': headers,
+            'body': ''
+        }
+    
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': body
+    }
+
+
+def is_admin_request(request) -> bool:
+    """Check the request carries the admin bearer token."""
+    if not ADMIN_API_TOKEN:
+        return False
+    auth = request.get('headers', {}).get('authorization', '')
+    scheme, _, token = auth.partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip(), ADMIN_API_TOKEN)
+
+
+def metrics_handler(request):
+    """
+    Serverless function handler exposing this instance's Firestore cost metrics.
+    
+    Expected request format (Authorization: Bearer <ADMIN_API_TOKEN>):
+        GET
+    
+    Returns:
+    {
+        "success": bool,
+        "firestore": {"totals", "operations", "endpoints", "read_budget", "since"},
+        "retries": {...}
+    }
+    """
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+        'Content-Type': 'application/json',
+        'Cache-Control': 'no-store'
+    }
+    
+    method = request.get('method', 'GET')
+    
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': ''
+        }
+    
+    if method != 'GET':
+        return {
+            'statusCode': 405,
+            'headers': headers,
+            'body': json.dumps({
+                'success': False,
+                'message': 'Method not allowed'
+            })
+        }
+    
+    if not is_admin_request(request):
+        return {
+            'statusCode': 401,
+            'headers': headers,
+            'body': json.dumps({
+                'success': False,
+                'message': 'Unauthorized'
+            })
+        }
+    
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': json.dumps({
+            'success': True,
+            'firestore': cost_metrics(),
+            'retries': dict(retry_stats)
+        })
+    }
@@ -0,0 +1,337 @@
+"""
+Offline analytics over waitlist exports.
+Loads an export into columnar NumPy arrays and computes growth, domain,
+per-IP concentration and duplicate-attempt statistics with vectorized operations.
+
+Usage:
+    python waitlist_analytics.py export waitlist_export.jsonl
+    python waitlist_analytics.py report waitlist_export.jsonl [--cache export.npz] [--json]
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+from typing import Dict, Any, Iterator, List
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    print("⚠ NumPy not available. Install: pip install numpy")
+
+# Add parent directory to path to import firestore_service
+sys.path.insert(0, os.path.dirname(__file__))
+
+
+# Providers that ignore dots in the local part
+DOTLESS_DOMAINS = {'gmail.com', 'googlemail.com'}
+
+SECONDS_PER_DAY = 86400
+
+
+def iter_export_records(path: str, chunk_lines: int = 100000) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over entries in an export file.
+
+    Accepts either a JSON list (the waitlist.json format) or JSON Lines.
+    JSON Lines are decoded a chunk at a time as one JSON array, which keeps
+    the per-line work inside the C decoder.
+
+    Args:
+        path: Path to the export file
+        chunk_lines: Lines decoded per chunk
+
+    Yields:
+        Entry dicts
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == '[':
+            yield from json.load(f)
+            return
+        chunk: List[str] = []
+        for line in f:
+            line = line.strip()
+            if line:
+                chunk.append(line)
+            if len(chunk) >= chunk_lines:
+                yield from json.loads('[' + ','.join(chunk) + ']')
+                chunk = []
+        if chunk:
+            yield from json.loads('[' + ','.join(chunk) + ']')
+
+
+def export_from_firestore(path: str) -> int:
+    """
+    Export all Firestore waitlist entries to a JSON Lines file.
+
+    Args:
+        path: Output file path
+
+    Returns:
+        Number of entries written
+    """
+    from firestore_service import get_firestore_client, COLLECTION_NAME
+
+    client = get_firestore_client()
+    if not client:
+        print("⚠ Firestore not available")
+        return 0
+
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for doc in client.collection(COLLECTION_NAME).stream():
+            data = doc.to_dict()
+            if 'timestamp' in data and hasattr(data['timestamp'], 'isoformat'):
+                data['timestamp'] = data['timestamp'].isoformat()
+            f.write(json.dumps(data, ensure_ascii=False))
+            f.write('\n')
+            written += 1
+    print(f"✓ Exported {written} entries to {path}")
+    return written
+
+
+def normalize_identity(email: str) -> str:
+    """
+    Reduce an email to the mailbox it delivers to.
+
+    Lowercases, drops +tags, and drops dots for providers that ignore them,
+    so 'J.Doe+news@Gmail.com' and 'jdoe@gmail.com' count as one person.
+    """
+    local, _, domain = email.strip().lower().partition('@')
+    local = local.split('+', 1)[0]
+    if domain in DOTLESS_DOMAINS:
+        local = local.replace('.', '')
+    return f"{local}@{domain}"
+
+
+def _second_or_nat(value: Any) -> str:
+    """Canonical ISO time to the second for NumPy, or 'NaT' for missing or malformed values."""
+    if not isinstance(value, str) or not value:
+        return 'NaT'
+    try:
+        return datetime.fromisoformat(value[:19]).isoformat(timespec='seconds')
+    except ValueError:
+        return 'NaT'
+
+
+def load_columns(path: str) -> Dict[str, Any]:
+    """
+    Load an export into columnar arrays.
+
+    Timestamps become int64 epoch seconds (-1 when missing or malformed); emails, email
+    domains, IPs and normalized identities become int32 categorical codes,
+    with the domain and IP category names alongside.
+
+    Args:
+        path: Export file (JSON / JSONL) or a .npz cache written by save_columns
+
+    Returns:
+        Dict of column name to array
+    """
+    if path.endswith('.npz'):
+        with np.load(path, allow_pickle=False) as data:
+            return {key: data[key] for key in data.files}
+
+    # Encode emails and IPs to categorical codes in a single pass; everything
+    # derived from the email is then computed once per distinct address
+    email_index: Dict[str, int] = {}
+    ip_index: Dict[str, int] = {}
+    email_codes: List[int] = []
+    ip_codes: List[int] = []
+    times: List[str] = []
+    for record in iter_export_records(path):
+        email = (record.get('email') or '').strip().lower()
+        email_codes.append(email_index.setdefault(email, len(email_index)))
+        ip_codes.append(ip_index.setdefault(record.get('ip') or 'unknown', len(ip_index)))
+        times.append(_second_or_nat(record.get('created_at') or record.get('timestamp')))
+
+    stamps = np.array(times, dtype='datetime64[s]')
+    del times
+    ts = stamps.astype(np.int64)
+    ts[np.isnat(stamps)] = -1
+
+    email_codes_arr = np.array(email_codes, dtype=np.int32)
+    distinct_emails = list(email_index)
+
+    domain_index: Dict[str, int] = {}
+    domain_of_email = np.array(
+        [domain_index.setdefault(e.partition('@')[2], len(domain_index)) for e in distinct_emails],
+        dtype=np.int32)
+    identity_index: Dict[str, int] = {}
+    identity_of_email = np.array(
+        [identity_index.setdefault(normalize_identity(e), len(identity_index)) for e in distinct_emails],
+        dtype=np.int32)
+
+    return {
+        'ts': ts,
+        'domain_codes': domain_of_email[email_codes_arr],
+        'domain_names': np.array(list(domain_index), dtype=str),
+        'ip_codes': np.array(ip_codes, dtype=np.int32),
+        'ip_names': np.array(list(ip_index), dtype=str),
+        'identity_codes': identity_of_email[email_codes_arr],
+        'email_codes': email_codes_arr,
+    }
+
+
+def save_columns(columns: Dict[str, Any], path: str) -> None:
+    """Save loaded columns as an .npz cache for fast reloads."""
+    np.savez(path, **columns)
+    print(f"✓ Saved columnar cache to {path}")
+
+
+def growth_curve(columns: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Daily signups and cumulative total.
+
+    Returns:
+        Dict with 'days' (ISO dates), 'daily' and 'cumulative' counts
+    """
+    ts = columns['ts']
+    ts = ts[ts >= 0]
+    if ts.size == 0:
+        return {'days': [], 'daily': [], 'cumulative': []}
+
+    day_index = ts // SECONDS_PER_DAY
+    first = int(day_index.min())
+    daily = np.bincount(day_index - first)
+    days = (np.arange(daily.size) + first).astype('datetime64[D]')
+    return {
+        'days': [str(d) for d in days],
+        'daily': daily.tolist(),
+        'cumulative': np.cumsum(daily).tolist(),
+    }
+
+
+def domain_histogram(columns: Dict[str, Any], top: int = 20) -> List[Dict[str, Any]]:
+    """Most common email domains with their share of signups."""
+    counts = np.bincount(columns['domain_codes'], minlength=len(columns['domain_names']))
+    total = int(counts.sum()) or 1
+    order = np.argsort(counts)[::-1][:top]
+    return [
+        {'domain': str(columns['domain_names'][i]), 'count': int(counts[i]),
+         'share': round(float(counts[i]) / total, 4)}
+        for i in order if counts[i]
+    ]
+
+
+def ip_concentration(columns: Dict[str, Any], top: int = 10, threshold: int = 5) -> Dict[str, Any]:
+    """
+    How concentrated signups are per source IP.
+
+    Reports the busiest IPs, the Herfindahl-Hirschman index over IP shares,
+    and how many IPs (and signups) exceed the per-IP threshold.
+    """
+    known = columns['ip_names'] != 'unknown'
+    counts = np.bincount(columns['ip_codes'], minlength=len(columns['ip_names']))
+    counts = np.where(known, counts, 0)
+    total = int(counts.sum())
+    if total == 0:
+        return {'top': [], 'hhi': 0.0, 'ips_over_threshold': 0, 'signups_over_threshold': 0}
+
+    shares = counts / total
+    order = np.argsort(counts)[::-1][:top]
+    heavy = counts > threshold
+    return {
+        'top': [{'ip': str(columns['ip_names'][i]), 'count': int(counts[i])} for i in order if counts[i]],
+        'hhi': round(float(np.sum(shares * shares)), 6),
+        'ips_over_threshold': int(heavy.sum()),
+        'signups_over_threshold': int(counts[heavy].sum()),
+    }
+
+
+def duplicate_stats(columns: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Duplicate signup attempts.
+
+    Exact duplicates repeat the same (case-insensitive) address; alias
+    duplicates are distinct addresses that reach the same mailbox.
+    """
+    rows = columns['email_codes'].size
+    distinct_emails = int(np.count_nonzero(np.bincount(columns['email_codes'])))
+    per_identity = np.bincount(columns['identity_codes'])
+    distinct_identities = int(np.count_nonzero(per_identity))
+    return {
+        'rows': int(rows),
+        'distinct_emails': distinct_emails,
+        'distinct_people': distinct_identities,
+        'exact_duplicates': int(rows - distinct_emails),
+        'alias_duplicates': int(distinct_emails - distinct_identities),
+        'people_with_multiple_attempts': int(np.count_nonzero(per_identity > 1)),
+    }
+
+
+def build_report(columns: Dict[str, Any]) -> Dict[str, Any]:
+    """Run every analysis over the loaded columns."""
+    return {
+        'growth': growth_curve(columns),
+        'domains': domain_histogram(columns),
+        'ip_concentration': ip_concentration(columns),
+        'duplicates': duplicate_stats(columns),
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Print a human-readable summary of a report."""
+    dup = report['duplicates']
+    print(f"Entries: {dup['rows']} ({dup['distinct_people']} distinct people)")
+    print(f"  Exact duplicates: {dup['exact_duplicates']}, alias duplicates: {dup['alias_duplicates']}")
+
+    growth = report['growth']
+    if growth['days']:
+        print(f"\nGrowth ({growth['days'][0]} to {growth['days'][-1]}):")
+        for day, daily, total in list(zip(growth['days'], growth['daily'], growth['cumulative']))[-14:]:
+            print(f"  {day}: +{daily} ({total} total)")
+
+    print("\nTop domains:")
+    for row in report['domains']:
+        print(f"  {row['domain']}: {row['count']} ({row['share']:.1%})")
+
+    ips = report['ip_concentration']
+    print(f"\nIP concentration (HHI {ips['hhi']}):")
+    print(f"  {ips['ips_over_threshold']} IPs over threshold, {ips['signups_over_threshold']} signups")
+    for row in ips['top']:
+        print(f"  {row['ip']}: {row['count']}")
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Waitlist export analytics')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = sub.add_parser('export', help='Export Firestore entries to JSON Lines')
+    export_parser.add_argument('output')
+
+    report_parser = sub.add_parser('report', help='Analyze an export')
+    report_parser.add_argument('path', help='JSON/JSONL export or .npz cache')
+    report_parser.add_argument('--cache', help='Write loaded columns to this .npz for fast reloads')
+    report_parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export_from_firestore(args.output)
+        return
+
+    if not NUMPY_AVAILABLE:
+        sys.exit(1)
+
+    columns = load_columns(args.path)
+    if args.cache:
+        save_columns(columns, args.cache)
+
+    report = build_report(columns)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()
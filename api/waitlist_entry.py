@@ -0,0 +1,302 @@
+"""
+Typed waitlist entry model.
+WaitlistEntry is a slotted record for single entries; WaitlistEntryBatch is an
+array-backed container for bulk tooling that keeps millions of entries compact.
+
+Measure the memory difference against plain dicts:
+    python waitlist_entry.py --measure 1000000
+"""
+
+import json
+import sys
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+# Sentinel for a missing timestamp in int64 microsecond columns
+MISSING = -(2 ** 63)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_micros(value: Any) -> int:
+    """
+    Convert a timestamp to integer microseconds since the epoch.
+
+    Accepts datetimes (Firestore returns aware ones) and ISO strings; naive
+    values are UTC, matching how created_at is written.
+    """
+    if value is None or value == '':
+        return MISSING
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return MISSING
+    if not isinstance(value, datetime):
+        return MISSING
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def from_micros(micros: int, aware: bool = True) -> Optional[str]:
+    """Convert integer microseconds back to an ISO string (naive UTC when aware is False)."""
+    if micros == MISSING:
+        return None
+    seconds, fraction = divmod(micros, 1000000)
+    value = datetime.fromtimestamp(seconds, timezone.utc).replace(microsecond=fraction)
+    if not aware:
+        value = value.replace(tzinfo=None)
+    return value.isoformat()
+
+
+class WaitlistEntry:
+    """
+    A single waitlist entry.
+
+    Timestamps are held as integer microseconds since the epoch so they are
+    converted once, on the way in, rather than by every consumer.
+    """
+
+    __slots__ = ('email', 'ip', 'timestamp_us', 'created_at_us')
+
+    def __init__(self, email: str, ip: str = 'unknown', timestamp_us: int = MISSING,
+                 created_at_us: int = MISSING):
+        self.email = email
+        self.ip = ip
+        self.timestamp_us = timestamp_us
+        self.created_at_us = created_at_us
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'WaitlistEntry':
+        """Build from a Firestore document dict or a waitlist.json record."""
+        return cls(
+            (data.get('email') or '').lower(),
+            data.get('ip') or 'unknown',
+            to_micros(data.get('timestamp')),
+            to_micros(data.get('created_at')),
+        )
+
+    # Firestore documents and JSON records share the same field names
+    from_firestore = from_dict
+    from_json = from_dict
+
+    @property
+    def timestamp(self) -> Optional[str]:
+        return from_micros(self.timestamp_us)
+
+    @property
+    def created_at(self) -> Optional[str]:
+        return from_micros(self.created_at_us, aware=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the dict shape returned by firestore_service and stored in waitlist.json."""
+        data: Dict[str, Any] = {'email': self.email, 'ip': self.ip}
+        if self.timestamp_us != MISSING:
+            data['timestamp'] = self.timestamp
+        if self.created_at_us != MISSING:
+            data['created_at'] = self.created_at
+        return data
+
+    to_json = to_dict
+
+    def to_firestore(self) -> Dict[str, Any]:
+        """Convert to a Firestore document (timestamp as a datetime)."""
+        data = self.to_dict()
+        if self.timestamp_us != MISSING:
+            data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+        return data
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, WaitlistEntry):
+            return NotImplemented
+        return (self.email, self.ip, self.timestamp_us, self.created_at_us) == \
+            (other.email, other.ip, other.timestamp_us, other.created_at_us)
+
+    def __repr__(self) -> str:
+        return f"WaitlistEntry(email={self.email!r}, ip={self.ip!r}, created_at={self.created_at!r})"
+
+
+class _PackedStrings:
+    """Append-only sequence of strings stored as one UTF-8 buffer plus an offsets array."""
+
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('Q', [0])
+
+    def append(self, value: str) -> None:
+        self.data += value.encode('utf-8')
+        self.offsets.append(len(self.data))
+
+    def __getitem__(self, index: int) -> str:
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        data = self.data
+        offsets = self.offsets
+        for i in range(len(offsets) - 1):
+            yield data[offsets[i]:offsets[i + 1]].decode('utf-8')
+
+
+class WaitlistEntryBatch:
+    """
+    Column-oriented container of waitlist entries.
+
+    Emails and IPs are packed into UTF-8 buffers with offset arrays and
+    timestamps live in int64 arrays, so an entry costs a few dozen bytes
+    instead of a dict plus four string objects.
+    """
+
+    __slots__ = ('_emails', '_ips', '_timestamps', '_created_ats')
+
+    def __init__(self):
+        self._emails = _PackedStrings()
+        self._ips = _PackedStrings()
+        self._timestamps = array('q')
+        self._created_ats = array('q')
+
+    def append(self, entry: WaitlistEntry) -> None:
+        """Add an entry to the batch."""
+        self._append(entry.email, entry.ip, entry.timestamp_us, entry.created_at_us)
+
+    def append_dict(self, data: Dict[str, Any]) -> None:
+        """Add a Firestore document dict or waitlist.json record without building a WaitlistEntry."""
+        self._append(
+            (data.get('email') or '').lower(),
+            data.get('ip') or 'unknown',
+            to_micros(data.get('timestamp')),
+            to_micros(data.get('created_at')),
+        )
+
+    def _append(self, email: str, ip: str, timestamp_us: int, created_at_us: int) -> None:
+        self._emails.append(email)
+        self._ips.append(ip)
+        self._timestamps.append(timestamp_us)
+        self._created_ats.append(created_at_us)
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    def email(self, index: int) -> str:
+        """Get the email at index without materializing the entry."""
+        return self._emails[index]
+
+    def emails(self) -> Iterator[str]:
+        """Iterate over emails in insertion order."""
+        return iter(self._emails)
+
+    def __getitem__(self, index: int) -> WaitlistEntry:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return WaitlistEntry(self._emails[index], self._ips[index],
+                             self._timestamps[index], self._created_ats[index])
+
+    def __iter__(self) -> Iterator[WaitlistEntry]:
+        for email, ip, timestamp_us, created_at_us in zip(
+                self._emails, self._ips, self._timestamps, self._created_ats):
+            yield WaitlistEntry(email, ip, timestamp_us, created_at_us)
+
+    def sorted_indices(self, newest_first: bool = True) -> List[int]:
+        """Indices ordered by created_at, as get_all_waitlist_entries orders entries."""
+        created = self._created_ats
+        return sorted(range(len(self)), key=created.__getitem__, reverse=newest_first)
+
+    @classmethod
+    def from_dicts(cls, records: Iterable[Dict[str, Any]]) -> 'WaitlistEntryBatch':
+        """Build from Firestore document dicts or waitlist.json records."""
+        batch = cls()
+        for record in records:
+            batch.append_dict(record)
+        return batch
+
+    @classmethod
+    def from_firestore_docs(cls, docs: Iterable[Any]) -> 'WaitlistEntryBatch':
+        """Build from a stream of Firestore document snapshots."""
+        return cls.from_dicts(doc.to_dict() for doc in docs)
+
+    @classmethod
+    def from_json_file(cls, path: str) -> 'WaitlistEntryBatch':
+        """Load a waitlist.json list or a JSON Lines export."""
+        with open(path, 'r', encoding='utf-8') as f:
+            first = f.read(1)
+            while first and first.isspace():
+                first = f.read(1)
+            f.seek(0)
+            if first == '[':
+                return cls.from_dicts(json.load(f))
+            return cls.from_dicts(json.loads(line) for line in f if line.strip())
+
+    def to_dicts(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over entries as dicts in the waitlist.json shape."""
+        for entry in self:
+            yield entry.to_dict()
+
+    def to_json_file(self, path: str) -> None:
+        """Write the batch as a waitlist.json-style list."""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('[')
+            for i, record in enumerate(self.to_dicts()):
+                f.write(',\n  ' if i else '\n  ')
+                f.write(json.dumps(record, ensure_ascii=False))
+            f.write('\n]' if len(self) else ']')
+
+
+def _sample_records(count: int) -> Iterator[Dict[str, Any]]:
+    """Generate realistic-looking entries for memory measurement."""
+    for i in range(count):
+        stamp = f"2026-01-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:{(i // 60) % 60:02d}.{i % 1000000:06d}"
+        yield {
+            'email': f"user{i}@example{i % 997}.com",
+            'timestamp': stamp + '+00:00',
+            'ip': f"10.{i % 256}.{(i // 256) % 256}.{i % 7}",
+            'created_at': stamp,
+        }
+
+
+def _measure_one(mode: str, count: int) -> None:
+    """Load count entries as 'dicts' or 'batch' and print the resident memory growth in bytes."""
+    import resource
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if mode == 'dicts':
+        held: Any = list(_sample_records(count))
+    else:
+        held = WaitlistEntryBatch.from_dicts(_sample_records(count))
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    assert len(held) == count
+    # ru_maxrss is in kilobytes on Linux
+    print((after - before) * 1024)
+
+
+def _measure(count: int) -> None:
+    """Compare resident memory of count entries held as dicts versus a WaitlistEntryBatch."""
+    import subprocess
+
+    results = {}
+    for mode in ('dicts', 'batch'):
+        output = subprocess.run(
+            [sys.executable, __file__, '--measure-one', mode, str(count)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results[mode] = int(output.strip().splitlines()[-1])
+
+    print(f"{count} entries")
+    print(f"  dicts:              {results['dicts'] / 1e6:8.1f} MB ({results['dicts'] / count:.0f} B/entry)")
+    print(f"  WaitlistEntryBatch: {results['batch'] / 1e6:8.1f} MB ({results['batch'] / count:.0f} B/entry)")
+    print(f"  reduction:          {results['dicts'] / max(results['batch'], 1):8.1f}x")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == '--measure':
+        _measure(int(sys.argv[2]))
+    elif len(sys.argv) == 4 and sys.argv[1] == '--measure-one':
+        _measure_one(sys.argv[2], int(sys.argv[3]))
+    else:
+        print(__doc__)
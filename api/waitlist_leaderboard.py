@@ -0,0 +1,6 @@
+"""
+Vercel entry point for GET /api/waitlist/leaderboard.
+The handler lives in waitlist.py; Vercel serves one `handler` per file.
+"""
+
+from waitlist import leaderboard_handler as handler  # noqa: F401
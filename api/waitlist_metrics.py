@@ -0,0 +1,6 @@
+"""
+Vercel entry point for GET /api/waitlist/metrics (admin only).
+The handler lives in waitlist.py; Vercel serves one `handler` per file.
+"""
+
+from waitlist import metrics_handler as handler  # noqa: F401
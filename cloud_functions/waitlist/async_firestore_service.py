@@ -0,0 +1,191 @@
+"""
+Async Firestore service for waitlist data storage.
+asyncio-native counterpart of firestore_service, built on Firestore's AsyncClient.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional, Any
+
+try:
+    from google.cloud import firestore
+    from google.cloud.firestore_v1.base_query import FieldFilter
+    from google.api_core.exceptions import AlreadyExists, NotFound
+    ASYNC_FIRESTORE_AVAILABLE = True
+except ImportError:
+    ASYNC_FIRESTORE_AVAILABLE = False
+    print("⚠ Firestore library not available. Install: pip install google-cloud-firestore")
+
+from firestore_service import (
+    COLLECTION_NAME,
+    ROLLUP_COLLECTIONS,
+    add_rollup_increments,
+    add_domain_increment,
+    email_domain,
+    order_shard,
+    update_referral_leaderboard
+)
+from referrals import referral_code_for
+from retry import with_retry_async
+from firestore_cost import count_reads, count_query, count_aggregation, count_writes
+
+
+# The AsyncClient owns a gRPC channel bound to the running event loop, so it
+# is created once per process and reused by every request.
+_async_client = None
+
+
+def get_async_firestore_client() -> Optional[Any]:
+    """
+    Get (or lazily create) the shared Firestore AsyncClient instance.
+
+    Returns:
+        Firestore AsyncClient or None if unavailable
+    """
+    global _async_client
+    if not ASYNC_FIRESTORE_AVAILABLE:
+        return None
+
+    if _async_client is None:
+        try:
+            _async_client = firestore.AsyncClient()
+        except Exception as e:
+            print(f"⚠ Error initializing async Firestore client: {e}")
+            return None
+    return _async_client
+
+
+async def get_waitlist_entry_async(email: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a specific waitlist entry by email.
+
+    Args:
+        email: Email address to lookup
+
+    Returns:
+        Entry dict or None if not found
+    """
+    client = get_async_firestore_client()
+    if not client:
+        return None
+
+    try:
+        doc_ref = client.collection(COLLECTION_NAME).document(email.lower())
+        doc = await with_retry_async(doc_ref.get)
+        count_reads('get_waitlist_entry')
+
+        if doc.exists:
+            data = doc.to_dict()
+            # Convert Firestore timestamp to ISO string if needed
+            if 'timestamp' in data and hasattr(data['timestamp'], 'isoformat'):
+                data['timestamp'] = data['timestamp'].isoformat()
+            return data
+        return None
+    except Exception as e:
+        print(f"⚠ Error getting waitlist entry from Firestore: {e}")
+        return None
+
+
+async def get_waitlist_count_async() -> int:
+    """
+    Get total count of waitlist entries using a server-side count aggregation.
+
+    Returns:
+        Number of entries, or 0 if error
+    """
+    client = get_async_firestore_client()
+    if not client:
+        return 0
+
+    try:
+        results = await with_retry_async(client.collection(COLLECTION_NAME).count().get)
+        count = int(results[0][0].value)
+        count_aggregation('get_waitlist_count', count)
+        return count
+    except Exception as e:
+        print(f"⚠ Error getting waitlist count from Firestore: {e}")
+        return 0
+
+
+async def find_referrer_async(client: Any, referral_code: str) -> Optional[Any]:
+    """
+    Look up the entry that owns a referral code.
+
+    Returns:
+        Document snapshot of the referrer, or None if the code is unknown
+    """
+    query = client.collection(COLLECTION_NAME).where(
+        filter=FieldFilter('referral_code', '==', referral_code)).limit(1)
+
+    async def first():
+        async for doc in query.stream():
+            return doc
+        return None
+
+    referrer = await with_retry_async(first)
+    count_query('find_referrer', referrer is not None)
+    return referrer
+
+
+async def add_waitlist_entry_async(email: str, ip: str = 'unknown', referral_code: Optional[str] = None) -> bool:
+    """
+    Add a new email to the waitlist in Firestore.
+
+    Uses a create (rather than a read followed by a set) so the write fails
+    instead of overwriting when the email is already present. The rollup
+    bucket increments, domain count and referrer credit commit atomically
+    with the entry.
+
+    Args:
+        email: Email address to add
+        ip: IP address of the signup (optional)
+        referral_code: Normalized referral code the signup came with (optional)
+
+    Returns:
+        True if successful (or already present), False otherwise
+    """
+    client = get_async_firestore_client()
+    if not client:
+        return False
+
+    entry = {
+        'email': email.lower(),
+        'timestamp': firestore.SERVER_TIMESTAMP,
+        'ip': ip,
+        'created_at': datetime.utcnow().isoformat(),
+        'email_domain': email_domain(email),
+        'referral_code': referral_code_for(email),
+        'order_shard': order_shard(email)
+    }
+
+    try:
+        referrer = await find_referrer_async(client, referral_code) if referral_code else None
+        if referrer is not None and referrer.id == email.lower():
+            referrer = None  # No credit for referring yourself
+        if referrer is not None:
+            entry['referred_by'] = referral_code
+
+        doc_ref = client.collection(COLLECTION_NAME).document(email.lower())
+        batch = client.batch()
+        batch.create(doc_ref, entry)
+        add_rollup_increments(client, batch, entry['created_at'])
+        add_domain_increment(client, batch, entry['email_domain'])
+        if referrer is not None:
+            batch.update(referrer.reference, {'referral_count': firestore.Increment(1)})
+        try:
+            # A repeat after an ambiguous failure fails with AlreadyExists, never double-counts
+            await with_retry_async(batch.commit)
+        except NotFound:
+            # The referrer was deleted since the lookup; sign up without the credit
+            return await add_waitlist_entry_async(email, ip)
+        count_writes('add_waitlist_entry', 2 + len(ROLLUP_COLLECTIONS) + (referrer is not None))
+
+        if referrer is not None:
+            # The leaderboard transaction uses the sync client; keep it off the event loop
+            await asyncio.to_thread(update_referral_leaderboard, referrer.id)
+        return True
+    except AlreadyExists:
+        return True  # Already exists, consider it success
+    except Exception as e:
+        print(f"⚠ Error adding waitlist entry to Firestore: {e}")
+        return False
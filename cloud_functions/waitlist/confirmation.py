@@ -0,0 +1,104 @@
+"""
+Stateless double opt-in confirmation tokens.
+Tokens are HMAC-signed and carry the email and expiry themselves, so
+confirming a signup needs no datastore read.
+"""
+
+import os
+import hmac
+import time
+import base64
+import hashlib
+from typing import Optional
+from urllib.parse import urlencode
+
+
+# Signing secret; double opt-in is enabled only when this is set
+CONFIRMATION_SECRET = os.environ.get('CONFIRMATION_SECRET', '')
+
+# How long a confirmation link stays valid
+CONFIRMATION_TTL_SECONDS = int(os.environ.get('CONFIRMATION_TTL_SECONDS', str(7 * 24 * 3600)))
+
+# Public URL of waitlist_confirm_handler, used to build confirmation links
+CONFIRMATION_URL = os.environ.get('CONFIRMATION_URL', '')
+
+# Where to send the browser after confirming (optional)
+CONFIRMATION_REDIRECT_URL = os.environ.get('CONFIRMATION_REDIRECT_URL', '')
+
+
+def is_double_opt_in_enabled() -> bool:
+    """Check whether signups must be confirmed by email."""
+    return bool(CONFIRMATION_SECRET and CONFIRMATION_URL)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _sign(payload: bytes, secret: str) -> bytes:
+    return hmac.new(secret.encode('utf-8'), payload, hashlib.sha256).digest()
+
+
+def make_confirmation_token(email: str, now: Optional[float] = None,
+                            secret: Optional[str] = None) -> str:
+    """
+    Create a signed confirmation token for an email.
+
+    Args:
+        email: Normalized email address
+        now: Current time (defaults to time.time())
+        secret: Signing secret (defaults to CONFIRMATION_SECRET)
+
+    Returns:
+        URL-safe token of the form <payload>.<signature>
+    """
+    expires = int((now if now is not None else time.time()) + CONFIRMATION_TTL_SECONDS)
+    payload = f"{email}:{expires}".encode('utf-8')
+    signature = _sign(payload, secret or CONFIRMATION_SECRET)
+    return f"{_b64encode(payload)}.{_b64encode(signature)}"
+
+
+def verify_confirmation_token(token: str, now: Optional[float] = None,
+                              secret: Optional[str] = None) -> Optional[str]:
+    """
+    Verify a confirmation token.
+
+    Args:
+        token: Token from a confirmation link
+        now: Current time (defaults to time.time())
+        secret: Signing secret (defaults to CONFIRMATION_SECRET)
+
+    Returns:
+        The confirmed email, or None if the token is malformed, forged or expired
+    """
+    secret = secret or CONFIRMATION_SECRET
+    if not secret or not token:
+        return None
+
+    try:
+        encoded_payload, _, encoded_signature = token.partition('.')
+        payload = _b64decode(encoded_payload)
+        signature = _b64decode(encoded_signature)
+    except (ValueError, TypeError):
+        return None
+
+    if not hmac.compare_digest(signature, _sign(payload, secret)):
+        return None
+
+    try:
+        email, _, expires = payload.decode('utf-8').rpartition(':')
+        if int(expires) < (now if now is not None else time.time()):
+            return None
+    except (UnicodeDecodeError, ValueError):
+        return None
+    return email or None
+
+
+def confirmation_link(email: str) -> str:
+    """Build the confirmation link emailed to a new signup."""
+    separator = '&' if '?' in CONFIRMATION_URL else '?'
+    return f"{CONFIRMATION_URL}{separator}{urlencode({'token': make_confirmation_token(email)})}"
@@ -4,7 +4,9 @@ Cloud Function version - uses Application Default Credentials.
 """
 
 import os
+import asyncio
 import base64
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Optional
@@ -26,6 +28,9 @@ SCOPES = ['https://www.googleapis.com/auth/gmail.send']
 # Notification email address
 NOTIFICATION_EMAIL = 'v12trinityengine@gmail.com'
 
+# Backend used by send_email: 'gmail' (Gmail API) or 'smtp' (pooled relay, see smtp_transport.py)
+EMAIL_TRANSPORT = os.environ.get('EMAIL_TRANSPORT', 'gmail').lower()
+
 
 def get_gmail_service() -> Optional[object]:
     """
@@ -65,9 +70,9 @@ def get_gmail_service() -> Optional[object]:
         return None
 
 
-def create_message(to: str, subject: str, body: str) -> dict:
+def build_mime_message(to: str, subject: str, body: str) -> MIMEMultipart:
     """
-    Create a message for an email.
+    Build the MIME message for an email, independent of the transport.
     
     Args:
         to: Recipient email address
@@ -75,7 +80,7 @@ def create_message(to: str, subject: str, body: str) -> dict:
         body: Email body (HTML)
     
     Returns:
-        Message dict with base64 encoded content
+        MIME message
     """
     message = MIMEMultipart('alternative')
     message['to'] = to
@@ -84,15 +89,99 @@ def create_message(to: str, subject: str, body: str) -> dict:
     # Add HTML body
     html_part = MIMEText(body, 'html')
     message.attach(html_part)
+    return message
+
+
+def create_message(to: str, subject: str, body: str) -> dict:
+    """
+    Create a message for an email.
     
-    # Encode message
+    Args:
+        to: Recipient email address
+        subject: Email subject
+        body: Email body (HTML)
+    
+    Returns:
+        Message dict with base64 encoded content
+    """
+    return encode_message(build_mime_message(to, subject, body))
+
+
+def encode_message(message: MIMEMultipart) -> dict:
+    """Encode a MIME message in the Gmail API's raw format."""
     raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
     return {'raw': raw_message}
 
 
+class GmailAPITransport:
+    """
+    Email transport that sends through the Gmail API.
+    
+    The authenticated service is built on first use and reused for later
+    sends, one per thread: the transport is shared process-wide and the
+    service's httplib2 connection is not thread-safe. Transports expose
+    send(message) -> bool for a MIME message.
+    """
+    
+    def __init__(self):
+        self._local = threading.local()
+    
+    def send(self, message: MIMEMultipart) -> bool:
+        if not GMAIL_AVAILABLE:
+            print("⚠ Gmail API not available")
+            return False
+        
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = get_gmail_service()
+            if not service:
+                print("⚠ Could not get Gmail service")
+                return False
+            self._local.service = service
+        
+        try:
+            service.users().messages().send(
+                userId='me',
+                body=encode_message(message)
+            ).execute()
+            return True
+        except HttpError as error:
+            print(f"⚠ Error sending email: {error}")
+            return False
+        except Exception as e:
+            print(f"⚠ Unexpected error: {e}")
+            return False
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_email_transport():
+    """
+    Get the shared transport selected by EMAIL_TRANSPORT.
+    
+    Returns:
+        SMTPPoolTransport when EMAIL_TRANSPORT=smtp and SMTP_HOST is set,
+        otherwise GmailAPITransport
+    """
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                transport = None
+                if EMAIL_TRANSPORT == 'smtp':
+                    from smtp_transport import SMTPPoolTransport
+                    transport = SMTPPoolTransport.from_env()
+                    if transport is None:
+                        print("⚠ EMAIL_TRANSPORT=smtp but SMTP_HOST is not set; using the Gmail API")
+                _transport = transport or GmailAPITransport()
+    return _transport
+
+
 def send_email(to: str, subject: str, body: str) -> bool:
     """
-    Send an email using Gmail API.
+    Send an email using the configured transport (Gmail API by default).
     
     Args:
         to: Recipient email address
@@ -102,28 +191,7 @@ def send_email(to: str, subject: str, body: str) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    if not GMAIL_AVAILABLE:
-        print("⚠ Gmail API not available")
-        return False
-    
-    service = get_gmail_service()
-    if not service:
-        print("⚠ Could not get Gmail service")
-        return False
-    
-    try:
-        message = create_message(to, subject, body)
-        service.users().messages().send(
-            userId='me',
-            body=message
-        ).execute()
-        return True
-    except HttpError as error:
-        print(f"⚠ Error sending email: {error}")
-        return False
-    except Exception as e:
-        print(f"⚠ Unexpected error: {e}")
-        return False
+    return get_email_transport().send(build_mime_message(to, subject, body))
 
 
 def send_waitlist_notification(email: str, total_count: int) -> None:
@@ -154,3 +222,49 @@ def send_waitlist_notification(email: str, total_count: int) -> None:
     
     send_email(NOTIFICATION_EMAIL, subject, body)
 
+
+def send_confirmation_email(email: str, confirm_url: str) -> bool:
+    """
+    Send the double opt-in confirmation email to a new signup.
+    
+    Args:
+        email: Email address of the new signup
+        confirm_url: Signed confirmation link
+    
+    Returns:
+        True if sent, False otherwise
+    """
+    subject = "Confirm your spot on the Trinity Engine waitlist"
+    
+    body = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <h2 style="color: #33e7ff;">Confirm your email</h2>
+        <p>Thanks for joining the Trinity Engine waitlist! Please confirm your email address:</p>
+        <p>
+            <a href="{confirm_url}" style="display: inline-block; padding: 10px 18px; background: #33e7ff; color: #000; text-decoration: none; border-radius: 6px;">
+                Confirm my email
+            </a>
+        </p>
+        <p style="margin-top: 20px; color: #666; font-size: 0.9em;">
+            If you didn't sign up, you can ignore this email.
+        </p>
+    </body>
+    </html>
+    """
+    
+    return send_email(email, subject, body)
+
+
+async def send_waitlist_notification_async(email: str, total_count: int) -> None:
+    """
+    Non-blocking variant of send_waitlist_notification for asyncio handlers.
+
+    The Gmail client library is synchronous, so the send runs on the default
+    thread pool and the event loop stays free to serve other signups.
+
+    Args:
+        email: Email address of the new signup
+        total_count: Total number of people on the waitlist
+    """
+    await asyncio.to_thread(send_waitlist_notification, email, total_count)
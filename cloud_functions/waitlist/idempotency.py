@@ -0,0 +1,200 @@
+"""
+Idempotency-Key support for waitlist signups.
+Caches signup responses for a short TTL so client retries are answered
+without repeating Firestore reads, writes or notification emails.
+"""
+
+import os
+import time
+import hashlib
+import threading
+from typing import Callable, Dict, Optional, Tuple, Any
+
+try:
+    from firestore_service import get_firestore_client
+except ImportError:
+    def get_firestore_client():
+        return None
+
+
+# How long a stored response is replayed for
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '600'))
+
+# Optional shared store so replays work across instances ('firestore' or unset)
+IDEMPOTENCY_STORE = os.environ.get('IDEMPOTENCY_STORE', '')
+
+# Firestore collection for the shared store (configure a TTL policy on expires_at)
+IDEMPOTENCY_COLLECTION = 'idempotency_keys'
+
+# How long a duplicate waits for the in-flight original before giving up
+IN_FLIGHT_WAIT_SECONDS = 30
+
+# Upper bound on locally cached keys
+MAX_LOCAL_ENTRIES = 10000
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyConflict(Exception):
+    """Raised when an Idempotency-Key is reused with a different request."""
+
+
+def is_valid_key(key: str) -> bool:
+    """Check an Idempotency-Key header value is usable as a cache key."""
+    return 0 < len(key) <= MAX_KEY_LENGTH and key.isprintable()
+
+
+def request_fingerprint(*parts: str) -> str:
+    """Fingerprint the request parameters a key is bound to."""
+    return hashlib.sha256('\x00'.join(parts).encode('utf-8')).hexdigest()
+
+
+class FirestoreIdempotencyStore:
+    """
+    Shared response store in a Firestore collection.
+
+    A replay costs a single document read, instead of the dedup read,
+    count scan and notification the original signup needed.
+    """
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        client = get_firestore_client()
+        if not client:
+            return None
+        try:
+            doc = client.collection(IDEMPOTENCY_COLLECTION).document(_doc_id(key)).get()
+            if not doc.exists:
+                return None
+            record = doc.to_dict()
+            if record.get('expires_at', 0) < time.time():
+                return None
+            return record
+        except Exception as e:
+            print(f"⚠ Error reading idempotency record: {e}")
+            return None
+
+    def set(self, key: str, record: Dict[str, Any]) -> None:
+        client = get_firestore_client()
+        if not client:
+            return
+        try:
+            client.collection(IDEMPOTENCY_COLLECTION).document(_doc_id(key)).set(record)
+        except Exception as e:
+            print(f"⚠ Error storing idempotency record: {e}")
+
+
+def _doc_id(key: str) -> str:
+    """Firestore-safe document ID for an arbitrary key."""
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+class _Slot:
+    """Local cache entry: either in flight (event unset) or completed."""
+
+    __slots__ = ('fingerprint', 'event', 'record')
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.event = threading.Event()
+        self.record: Optional[Dict[str, Any]] = None
+
+
+class IdempotencyCache:
+    """
+    In-memory TTL cache of responses keyed by Idempotency-Key, with an
+    optional shared backing store.
+
+    Concurrent duplicates of an in-flight request block until the first one
+    finishes and then receive its response.
+    """
+
+    def __init__(self, ttl: int = IDEMPOTENCY_TTL_SECONDS, store: Optional[Any] = None):
+        self.ttl = ttl
+        self.store = store
+        self._slots: Dict[str, _Slot] = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: str, fingerprint: str, func: Callable[[], Tuple[str, int]]) -> Tuple[str, int, bool]:
+        """
+        Return the stored response for key, or compute it once with func.
+
+        Args:
+            key: Idempotency-Key header value
+            fingerprint: Fingerprint of the request parameters
+            func: Produces (body, status) when the key is new
+
+        Returns:
+            Tuple of (body, status, replayed)
+
+        Raises:
+            IdempotencyKeyConflict: If key was used for a different request
+        """
+        now = time.time()
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None and slot.event.is_set() and (
+                    slot.record is None or slot.record['expires_at'] < now):
+                # Expired, or the original failed and was not cached
+                del self._slots[key]
+                slot = None
+            owner = slot is None
+            if owner:
+                if len(self._slots) >= MAX_LOCAL_ENTRIES:
+                    self._evict(now)
+                slot = _Slot(fingerprint)
+                self._slots[key] = slot
+
+        if slot.fingerprint != fingerprint:
+            raise IdempotencyKeyConflict(key)
+
+        if not owner:
+            slot.event.wait(IN_FLIGHT_WAIT_SECONDS)
+            if slot.record is not None:
+                return slot.record['body'], slot.record['status'], True
+            # Original did not produce a cacheable response; process this one normally
+            body, status = func()
+            return body, status, False
+
+        try:
+            record = self.store.get(key) if self.store else None
+            if record is not None:
+                if record.get('fingerprint') != fingerprint:
+                    raise IdempotencyKeyConflict(key)
+                slot.record = record
+                return record['body'], record['status'], True
+
+            body, status = func()
+            # Server errors are worth retrying for real, so they are not stored
+            if status < 500:
+                record = {
+                    'fingerprint': fingerprint,
+                    'body': body,
+                    'status': status,
+                    'expires_at': time.time() + self.ttl,
+                }
+                slot.record = record
+                if self.store:
+                    self.store.set(key, record)
+            return body, status, False
+        finally:
+            slot.event.set()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then the oldest completed ones if still full. Caller holds the lock."""
+        for key in [k for k, s in self._slots.items()
+                    if s.event.is_set() and (s.record is None or s.record['expires_at'] < now)]:
+            del self._slots[key]
+        if len(self._slots) >= MAX_LOCAL_ENTRIES:
+            completed = [k for k, s in self._slots.items() if s.event.is_set()]
+            for key in completed[:len(completed) // 2 or 1]:
+                del self._slots[key]
+
+
+def _default_store():
+    if IDEMPOTENCY_STORE == 'firestore':
+        return FirestoreIdempotencyStore()
+    return None
+
+
+# Process-wide cache used by the HTTP handlers
+idempotency_cache = IdempotencyCache(store=_default_store())
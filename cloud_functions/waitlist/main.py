@@ -4,8 +4,12 @@ Handles email signups and sends notifications via Gmail API.
 Uses Firestore for data storage.
 """
 
+import asyncio
+import hashlib
+import hmac
 import json
-import re
+import os
+import time
 from datetime import datetime
 from typing import Dict, Any
 
@@ -17,50 +21,261 @@ except ImportError:
     def send_waitlist_notification(email: str, total_count: int) -> None:
         print(f"Would send notification for {email} (total: {total_count})")
 
+try:
+    from gmail_service import send_confirmation_email
+except ImportError:
+    def send_confirmation_email(email: str, confirm_url: str) -> bool:
+        print(f"Would send confirmation to {email}: {confirm_url}")
+        return False
+
+try:
+    from gmail_service import send_waitlist_notification_async
+except ImportError:
+    async def send_waitlist_notification_async(email: str, total_count: int) -> None:
+        print(f"Would send notification for {email} (total: {total_count})")
+
 try:
     from firestore_service import (
         add_waitlist_entry,
+        add_waitlist_entries,
         get_waitlist_entry,
         get_waitlist_count,
+        get_waitlist_position,
+        confirm_waitlist_entry,
+        search_waitlist,
+        get_domain_counts,
+        get_referral_leaderboard,
+        SEARCH_PAGE_SIZE,
         FIRESTORE_AVAILABLE
     )
 except ImportError:
     FIRESTORE_AVAILABLE = False
-    def add_waitlist_entry(email: str, ip: str = 'unknown') -> bool:
+    def add_waitlist_entry(email: str, ip: str = 'unknown', referral_code=None) -> bool:
+        return False
+    def add_waitlist_entries(entries) -> bool:
         return False
     def get_waitlist_entry(email: str):
         return None
     def get_waitlist_count() -> int:
         return 0
+    def get_waitlist_position(email: str):
+        return None
+    def confirm_waitlist_entry(email: str):
+        return False
+    def search_waitlist(prefix=None, domain=None, page_size=50, cursor=None):
+        return [], None
+    def get_domain_counts(limit: int = 50):
+        return []
+    def get_referral_leaderboard():
+        return []
+    SEARCH_PAGE_SIZE = 50
+
+
+try:
+    from async_firestore_service import (
+        add_waitlist_entry_async,
+        get_waitlist_entry_async,
+        get_waitlist_count_async,
+        ASYNC_FIRESTORE_AVAILABLE
+    )
+except ImportError:
+    ASYNC_FIRESTORE_AVAILABLE = False
+    async def add_waitlist_entry_async(email: str, ip: str = 'unknown', referral_code=None) -> bool:
+        return False
+    async def get_waitlist_entry_async(email: str):
+        return None
+    async def get_waitlist_count_async() -> int:
+        return 0
+
+
+from idempotency import (
+    idempotency_cache,
+    is_valid_key,
+    request_fingerprint,
+    IdempotencyKeyConflict
+)
+
+
+from confirmation import (
+    is_double_opt_in_enabled,
+    confirmation_link,
+    verify_confirmation_token,
+    CONFIRMATION_REDIRECT_URL
+)
+from count_cache import (
+    StaleWhileRevalidateCache,
+    TTLCache,
+    POSITION_CACHE_TTL_SECONDS,
+    count_cache_headers,
+    versioned_cache_headers,
+    etag_matches
+)
+from write_behind import WriteBehindBuffer, WRITE_BEHIND_ENABLED
+from capture import capture_traffic
+from retry import within_deadline, retry_stats
+from firestore_cost import track_firestore_cost, cost_metrics
+from email_validation import normalize_email, email_problem, is_valid_format, EMAIL_PROBLEM_MESSAGES
+from referrals import referral_code_for, normalize_referral_code, public_leaderboard
+
+
+# Public waitlist count, refreshed at most once per TTL per instance
+waitlist_count_cache = StaleWhileRevalidateCache(lambda: get_waitlist_count())
+
+# Public top referrers; a refresh reads the single leaderboard document
+referral_leaderboard_cache = StaleWhileRevalidateCache(lambda: public_leaderboard(get_referral_leaderboard()))
 
+# Positions only move when entries are deleted, so they are cached per user
+waitlist_position_cache = TTLCache(POSITION_CACHE_TTL_SECONDS)
 
-def validate_email(email: str) -> bool:
-    """Validate email format."""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+# Batches signup writes when WRITE_BEHIND=1 (None when disabled)
+write_behind_buffer = None
+if WRITE_BEHIND_ENABLED and FIRESTORE_AVAILABLE:
+    write_behind_buffer = WriteBehindBuffer(add_waitlist_entries)
+    write_behind_buffer.start()
+
+# Bearer token required by admin endpoints (admin endpoints are disabled when unset)
+ADMIN_API_TOKEN = os.environ.get('ADMIN_API_TOKEN', '')
+
+# Largest page an admin search may request
+MAX_SEARCH_PAGE_SIZE = 500
+
+# Largest request body the ASGI app will buffer (signups are a few bytes)
+MAX_BODY_BYTES = 64 * 1024
+
+
+def signup_success_message() -> str:
+    """Message returned for a new signup."""
+    if is_double_opt_in_enabled():
+        return 'Almost there! Check your inbox and click the link to confirm your spot on the waitlist.'
+    return 'Thank you for joining the waitlist! We\'ll notify you when Trinity Engine is ready.'
+
+
+def send_signup_confirmation(email: str) -> None:
+    """Send the double opt-in email if enabled, logging (not raising) failures."""
+    if not is_double_opt_in_enabled():
+        return
+    try:
+        send_confirmation_email(email, confirmation_link(email))
+    except Exception as e:
+        # Log error but don't fail the signup
+        print(f"Error sending confirmation email: {e}")
+
+
+def signup_total_count(signed_up_at: float) -> int:
+    """
+    Waitlist size to report for a signup committed after signed_up_at (time.time()).
+    
+    Uses the cached count, adding the new signup unless the count was loaded
+    after it was written.
+    """
+    count, loaded_at = waitlist_count_cache.get()
+    return count if loaded_at >= signed_up_at else count + 1
+
+
+def already_on_waitlist_response():
+    """Response for a signup whose email is already on the waitlist."""
+    return (
+        json.dumps({
+            'success': True,
+            'message': 'You are already on the waitlist!'
+        }),
+        200
+    )
+
+
+def process_signup(email: str, ip_address: str, referral_code: str = None):
+    """
+    Add a validated email to the waitlist and send the notification.
+    
+    Args:
+        email: Normalized, validated email address
+        ip_address: Client IP address
+        referral_code: Normalized referral code of the referrer, if any
+    
+    Returns:
+        Tuple of (response body, status code)
+    """
+    # Try Firestore first, fallback to JSON
+    if FIRESTORE_AVAILABLE:
+        # Use Firestore
+        # Check if email already exists (buffered signups count as existing)
+        existing = (write_behind_buffer is not None and write_behind_buffer.contains(email)) \
+            or get_waitlist_entry(email)
+        if existing:
+            return already_on_waitlist_response()
+        
+        signed_up_at = time.time()
+        if write_behind_buffer is not None:
+            # Spool the signup; the flush thread writes it with the next batch
+            if not write_behind_buffer.add(email, ip_address, referral_code):
+                return already_on_waitlist_response()
+            total_count = waitlist_count_cache.get()[0] + write_behind_buffer.pending_count()
+        # Add to Firestore
+        elif add_waitlist_entry(email, ip_address, referral_code):
+            total_count = signup_total_count(signed_up_at)
+        else:
+            # Firestore failed
+            return (
+                json.dumps({
+                    'success': False,
+                    'message': 'Failed to add email to waitlist. Please try again later.'
+                }),
+                500
+            )
+    else:
+        # Firestore not available
+        return (
+            json.dumps({
+                'success': False,
+                'message': 'Service temporarily unavailable. Please try again later.'
+            }),
+            503
+        )
+    
+    # Send confirmation and notification emails
+    send_signup_confirmation(email)
+    try:
+        send_waitlist_notification(email, total_count)
+    except Exception as e:
+        # Log error but don't fail the signup
+        print(f"Error sending notification email: {e}")
+    
+    return (
+        json.dumps({
+            'success': True,
+            'message': signup_success_message(),
+            'referral_code': referral_code_for(email)
+        }),
+        200
+    )
 
 
 @functions_framework.http
+@capture_traffic
+@within_deadline()
+@track_firestore_cost
 def waitlist_handler(request):
     """
     Cloud Function HTTP handler for waitlist signups.
     
     Expected request format:
     {
-        "email": "user@example.com"
+        "email": "user@example.com",
+        "referral_code": "ABC234XYZ9"  (optional)
     }
     
     Returns:
     {
         "success": bool,
-        "message": str
+        "message": str,
+        "referral_code": str  (on signup)
     }
     """
     # Handle CORS
     headers = {
         'Access-Control-Allow-Origin': '*',
         'Access-Control-Allow-Methods': 'POST, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type',
+        'Access-Control-Allow-Headers': 'Content-Type, Idempotency-Key',
         'Content-Type': 'application/json'
     }
     
@@ -89,7 +304,10 @@ def waitlist_handler(request):
             except (json.JSONDecodeError, AttributeError):
                 data = {}
         
-        email = data.get('email', '').strip().lower()
+        email = normalize_email(data.get('email'))
+        
+        # An unknown or malformed referral code never blocks the signup
+        referral_code = normalize_referral_code(data.get('referral_code'))
         
         # Validate email
         if not email:
@@ -102,11 +320,13 @@ def waitlist_handler(request):
                 headers
             )
         
-        if not validate_email(email):
+        # Malformed and disposable addresses are rejected before any I/O
+        problem = email_problem(email)
+        if problem:
             return (
                 json.dumps({
                     'success': False,
-                    'message': 'Invalid email address format'
+                    'message': EMAIL_PROBLEM_MESSAGES[problem]
                 }),
                 400,
                 headers
@@ -117,79 +337,664 @@ def waitlist_handler(request):
         if ip_address == 'unknown':
             ip_address = request.remote_addr or 'unknown'
         
-        # Try Firestore first, fallback to JSON
-        if FIRESTORE_AVAILABLE:
-            # Use Firestore
-            # Check if email already exists
-            existing = get_waitlist_entry(email)
-            if existing:
-                total_count = get_waitlist_count()
-                return (
-                    json.dumps({
-                        'success': True,
-                        'message': 'You are already on the waitlist!'
-                    }),
-                    200,
-                    headers
-                )
-            
-            # Add to Firestore
-            if add_waitlist_entry(email, ip_address):
-                total_count = get_waitlist_count()
-            else:
-                # Firestore failed
-                return (
-                    json.dumps({
-                        'success': False,
-                        'message': 'Failed to add email to waitlist. Please try again later.'
-                    }),
-                    500,
-                    headers
-                )
-        else:
-            # Firestore not available
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key is None:
+            body, status = process_signup(email, ip_address, referral_code)
+            return (body, status, headers)
+        
+        if not is_valid_key(idempotency_key):
             return (
                 json.dumps({
                     'success': False,
-                    'message': 'Service temporarily unavailable. Please try again later.'
+                    'message': 'Invalid Idempotency-Key header'
                 }),
-                503,
+                400,
                 headers
             )
         
-        # Send notification email
+        # Retried submissions replay the stored response; concurrent duplicates
+        # wait for the first request instead of repeating the signup
         try:
-            send_waitlist_notification(email, total_count)
-        except Exception as e:
-            # Log error but don't fail the signup
-            print(f"Error sending notification email: {e}")
+            body, status, replayed = idempotency_cache.run(
+                idempotency_key,
+                request_fingerprint(email),
+                lambda: process_signup(email, ip_address, referral_code)
+            )
+        except IdempotencyKeyConflict:
+            return (
+                json.dumps({
+                    'success': False,
+                    'message': 'Idempotency-Key was already used for a different request'
+                }),
+                422,
+                headers
+            )
         
+        if replayed:
+            headers['Idempotent-Replayed'] = 'true'
+        return (body, status, headers)
+    
+    except json.JSONDecodeError:
+        return (
+            json.dumps({
+                'success': False,
+                'message': 'Invalid request format'
+            }),
+            400,
+            headers
+        )
+    except Exception as e:
+        print(f"Error processing waitlist signup: {e}")
+        return (
+            json.dumps({
+                'success': False,
+                'message': 'An error occurred. Please try again later.'
+            }),
+            500,
+            headers
+        )
+
+
+
+
+@functions_framework.http
+@track_firestore_cost
+def waitlist_count_handler(request):
+    """
+    Cloud Function HTTP handler returning the public waitlist count.
+    
+    Served from an in-process stale-while-revalidate cache with ETag and
+    Cache-Control headers, so browsers and CDNs absorb most page views.
+    
+    Returns:
+    {
+        "success": bool,
+        "count": int
+    }
+    """
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type',
+        'Content-Type': 'application/json'
+    }
+    
+    if request.method == 'OPTIONS':
+        return ('', 200, headers)
+    
+    if request.method not in ('GET', 'HEAD'):
+        return (
+            json.dumps({
+                'success': False,
+                'message': 'Method not allowed'
+            }),
+            405,
+            headers
+        )
+    
+    if not FIRESTORE_AVAILABLE:
+        return (
+            json.dumps({
+                'success': False,
+                'message': 'Service temporarily unavailable. Please try again later.'
+            }),
+            503,
+            headers
+        )
+    
+    count, loaded_at = waitlist_count_cache.get()
+    headers.update(count_cache_headers(count, loaded_at))
+    
+    if etag_matches(request.headers.get('If-None-Match'), headers['ETag']):
+        return ('', 304, headers)
+    
+    return (
+        json.dumps({
+            'success': True,
+            'count': count
+        }),
+        200,
+        headers
+    )
+
+
+@functions_framework.http
+@track_firestore_cost
+def waitlist_leaderboard_handler(request):
+    """
+    Cloud Function HTTP handler returning the top referrers.
+    
+    Signups keep the leaderboard in one Firestore document, so a cache refresh
+    is a single document read however large the waitlist grows.
+    
+    Returns:
+    {
+        "success": bool,
+        "leaderboard": [{"name": str, "count": int}, ...]
+    }
+    """
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type',
+        'Content-Type': 'application/json'
+    }
+    
+    if request.method == 'OPTIONS':
+        return ('', 200, headers)
+    
+    if request.method not in ('GET', 'HEAD'):
+        return (
+            json.dumps({
+                'success': False,
+                'message': 'Method not allowed'
+            }),
+            405,
+            headers
+        )
+    
+    if not FIRESTORE_AVAILABLE:
+        return (
+            json.dumps({
+                'success': False,
+                'message': 'Service temporarily unavailable. Please try again later.'
+            }),
+            503,
+            headers
+        )
+    
+    leaderboard, loaded_at = referral_leaderboard_cache.get()
+    body = json.dumps({
+        'success': True,
+        'leaderboard': leaderboard or []
+    })
+    version = hashlib.sha256(body.encode('utf-8')).hexdigest()[:16]
+    headers.update(versioned_cache_headers(f"leaderboard-{version}", loaded_at))
+    
+    if etag_matches(request.headers.get('If-None-Match'), headers['ETag']):
+        return ('', 304, headers)
+    
+    return (body, 200, headers)
+
+
+@functions_framework.http
+@within_deadline()
+@track_firestore_cost
+def waitlist_position_handler(request):
+    """
+    Cloud Function HTTP handler returning a user's position in line.
+    
+    Expected request format:
+        GET ?email=user@example.com
+    
+    Returns:
+    {
+        "success": bool,
+        "position": int
+    }
+    """
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type',
+        'Content-Type': 'application/json'
+    }
+    
+    if request.method == 'OPTIONS':
+        return ('', 200, headers)
+    
+    if request.method != 'GET':
+        return (
+            json.dumps({
+                'success': False,
+                'message': 'Method not allowed'
+            }),
+            405,
+            headers
+        )
+    
+    email = normalize_email(request.args.get('email'))
+    if not is_valid_format(email):
+        return (
+            json.dumps({
+                'success': False,
+                'message': 'Invalid email address format'
+            }),
+            400,
+            headers
+        )
+    
+    if not FIRESTORE_AVAILABLE:
+        return (
+            json.dumps({
+                'success': False,
+                'message': 'Service temporarily unavailable. Please try again later.'
+            }),
+            503,
+            headers
+        )
+    
+    position = waitlist_position_cache.get(email)
+    if position is None:
+        position = get_waitlist_position(email)
+        if position is None:
+            return (
+                json.dumps({
+                    'success': False,
+                    'message': 'Email address is not on the waitlist'
+                }),
+                404,
+                headers
+            )
+        waitlist_position_cache.set(email, position)
+    
+    headers['Cache-Control'] = 'private, max-age=60'
+    return (
+        json.dumps({
+            'success': True,
+            'position': position
+        }),
+        200,
+        headers
+    )
+
+
+def is_admin_request(request) -> bool:
+    """Check the request carries the admin bearer token."""
+    if not ADMIN_API_TOKEN:
+        return False
+    auth = request.headers.get('Authorization', '')
+    scheme, _, token = auth.partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip(), ADMIN_API_TOKEN)
+
+
+@functions_framework.http
+@within_deadline()
+@track_firestore_cost
+def waitlist_admin_search_handler(request):
+    """
+    Cloud Function HTTP handler for admin search over the waitlist.
+    
+    Expected request format (Authorization: Bearer <ADMIN_API_TOKEN>):
+        GET ?prefix=jane&domain=example.com&limit=50&cursor=<next_cursor>
+        GET ?domains=1  (top domains from the per-domain count table)
+    
+    Returns:
+    {
+        "success": bool,
+        "entries": [...],
+        "next_cursor": str | null
+    }
+    """
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+        'Content-Type': 'application/json',
+        'Cache-Control': 'no-store'
+    }
+    
+    if request.method == 'OPTIONS':
+        return ('', 200, headers)
+    
+    if request.method != 'GET':
+        return (
+            json.dumps({
+                'success': False,
+                'message': 'Method not allowed'
+            }),
+            405,
+            headers
+        )
+    
+    if not is_admin_request(request):
+        return (
+            json.dumps({
+                'success': False,
+                'message': 'Unauthorized'
+            }),
+            401,
+            headers
+        )
+    
+    try:
+        limit = min(int(request.args.get('limit', SEARCH_PAGE_SIZE)), MAX_SEARCH_PAGE_SIZE)
+    except ValueError:
+        limit = SEARCH_PAGE_SIZE
+    
+    if request.args.get('domains'):
         return (
             json.dumps({
                 'success': True,
-                'message': 'Thank you for joining the waitlist! We\'ll notify you when Trinity Engine is ready.'
+                'domains': get_domain_counts(limit=limit)
             }),
             200,
             headers
         )
     
-    except json.JSONDecodeError:
+    prefix = request.args.get('prefix', '').strip()
+    domain = request.args.get('domain', '').strip()
+    if not prefix and not domain:
         return (
             json.dumps({
                 'success': False,
-                'message': 'Invalid request format'
+                'message': 'Provide a prefix or domain to search'
             }),
             400,
             headers
         )
-    except Exception as e:
-        print(f"Error processing waitlist signup: {e}")
+    
+    entries, next_cursor = search_waitlist(
+        prefix=prefix or None,
+        domain=domain or None,
+        page_size=max(limit, 1),
+        cursor=request.args.get('cursor') or None
+    )
+    return (
+        json.dumps({
+            'success': True,
+            'entries': entries,
+            'next_cursor': next_cursor
+        }),
+        200,
+        headers
+    )
+
+
+@functions_framework.http
+def waitlist_metrics_handler(request):
+    """
+    Cloud Function HTTP handler exposing this instance's Firestore cost metrics.
+    
+    Expected request format (Authorization: Bearer <ADMIN_API_TOKEN>):
+        GET
+    
+    Returns:
+    {
+        "success": bool,
+        "firestore": {"totals", "operations", "endpoints", "read_budget", "since"},
+        "retries": {...}
+    }
+    """
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+        'Content-Type': 'application/json',
+        'Cache-Control': 'no-store'
+    }
+    
+    if request.method == 'OPTIONS':
+        return ('', 200, headers)
+    
+    if request.method != 'GET':
         return (
             json.dumps({
                 'success': False,
-                'message': 'An error occurred. Please try again later.'
+                'message': 'Method not allowed'
+            }),
+            405,
+            headers
+        )
+    
+    if not is_admin_request(request):
+        return (
+            json.dumps({
+                'success': False,
+                'message': 'Unauthorized'
             }),
+            401,
+            headers
+        )
+    
+    return (
+        json.dumps({
+            'success': True,
+            'firestore': cost_metrics(),
+            'retries': dict(retry_stats)
+        }),
+        200,
+        headers
+    )
+
+
+@functions_framework.http
+@within_deadline()
+@track_firestore_cost
+def waitlist_confirm_handler(request):
+    """
+    Cloud Function HTTP handler for double opt-in confirmation links.
+    
+    Expected request format:
+        GET ?token=<signed token from the confirmation email>
+    
+    The token is verified by its HMAC signature and expiry alone; confirming
+    is a single Firestore write with no read.
+    """
+    headers = {
+        'Content-Type': 'text/html; charset=utf-8',
+        'Cache-Control': 'no-store'
+    }
+    
+    if request.method != 'GET':
+        return ('Method not allowed', 405, headers)
+    
+    email = verify_confirmation_token(request.args.get('token', ''))
+    if not email:
+        return (
+            '<h1>Link expired or invalid</h1><p>Please sign up again to get a new confirmation link.</p>',
+            400,
+            headers
+        )
+    
+    confirmed = confirm_waitlist_entry(email)
+    if confirmed is None and write_behind_buffer is not None and write_behind_buffer.contains(email):
+        # Signed up moments ago and not written yet; write it now and retry
+        if write_behind_buffer.flush():
+            confirmed = confirm_waitlist_entry(email)
+    if confirmed is None:
+        return (
+            '<h1>Signup not found</h1><p>This signup no longer exists. Please sign up again to join the waitlist.</p>',
+            404,
+            headers
+        )
+    if not confirmed:
+        return (
+            '<h1>Something went wrong</h1><p>We could not confirm your email. Please try again later.</p>',
             500,
             headers
         )
+    
+    if CONFIRMATION_REDIRECT_URL:
+        separator = '&' if '?' in CONFIRMATION_REDIRECT_URL else '?'
+        return ('', 302, {'Location': f"{CONFIRMATION_REDIRECT_URL}{separator}confirmed=1", 'Cache-Control': 'no-store'})
+    
+    return (
+        '<h1>You\'re confirmed!</h1><p>Thanks for confirming. We\'ll notify you when Trinity Engine is ready.</p>',
+        200,
+        headers
+    )
+
+
+# Notification sends scheduled by the ASGI app; kept referenced so they are
+# not garbage collected mid-flight and can be drained on shutdown.
+_pending_notifications = set()
+
+
+async def _send_notification_in_background(email: str, total_count: int) -> None:
+    """Send the confirmation and signup notification, logging (not raising) any failure."""
+    await asyncio.to_thread(send_signup_confirmation, email)
+    try:
+        await send_waitlist_notification_async(email, total_count)
+    except Exception as e:
+        # Log error but don't fail the signup
+        print(f"Error sending notification email: {e}")
+
+
+async def _read_body(receive) -> bytes:
+    """Read the full ASGI request body, refusing anything over MAX_BODY_BYTES."""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise ValueError('Request body too large')
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            break
+    return b''.join(chunks)
 
+
+@within_deadline()
+@track_firestore_cost
+async def handle_signup_async(method: str, body: bytes, ip_address: str):
+    """
+    Async signup pipeline shared by the ASGI app.
+    
+    Args:
+        method: HTTP method of the request
+        body: Raw request body
+        ip_address: Client IP address
+    
+    Returns:
+        Tuple of (response body, status code, headers); track_firestore_cost
+        adds the X-Firestore-* debug headers to the dict when enabled
+    """
+    payload, status = await _signup_async(method, body, ip_address)
+    return (payload, status, {})
+
+
+async def _signup_async(method: str, body: bytes, ip_address: str):
+    """
+    Handle one signup for handle_signup_async.
+    
+    The dedup read and the counter read are independent, so they are issued
+    concurrently; a new signup's total is the pre-insert count plus one.
+    
+    Returns:
+        Tuple of (response body, status code)
+    """
+    if method == 'OPTIONS':
+        return ('', 200)
+    
+    if method != 'POST':
+        return (json.dumps({'success': False, 'message': 'Method not allowed'}), 405)
+    
+    try:
+        data = json.loads(body or b'{}')
+        if not isinstance(data, dict):
+            raise json.JSONDecodeError('Expected a JSON object', '', 0)
+        
+        email = normalize_email(data.get('email'))
+        referral_code = normalize_referral_code(data.get('referral_code'))
+        
+        if not email:
+            return (json.dumps({'success': False, 'message': 'Email address is required'}), 400)
+        
+        problem = email_problem(email)
+        if problem:
+            return (json.dumps({'success': False, 'message': EMAIL_PROBLEM_MESSAGES[problem]}), 400)
+        
+        if not ASYNC_FIRESTORE_AVAILABLE:
+            return (
+                json.dumps({
+                    'success': False,
+                    'message': 'Service temporarily unavailable. Please try again later.'
+                }),
+                503
+            )
+        
+        existing, count_before = await asyncio.gather(
+            get_waitlist_entry_async(email),
+            get_waitlist_count_async()
+        )
+        if existing:
+            return (json.dumps({'success': True, 'message': 'You are already on the waitlist!'}), 200)
+        
+        if not await add_waitlist_entry_async(email, ip_address, referral_code):
+            return (
+                json.dumps({
+                    'success': False,
+                    'message': 'Failed to add email to waitlist. Please try again later.'
+                }),
+                500
+            )
+        total_count = count_before + 1
+        
+        # Send notification email without holding up the response
+        task = asyncio.create_task(_send_notification_in_background(email, total_count))
+        _pending_notifications.add(task)
+        task.add_done_callback(_pending_notifications.discard)
+        
+        return (
+            json.dumps({
+                'success': True,
+                'message': signup_success_message(),
+                'referral_code': referral_code_for(email)
+            }),
+            200
+        )
+    
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return (json.dumps({'success': False, 'message': 'Invalid request format'}), 400)
+    except Exception as e:
+        print(f"Error processing waitlist signup: {e}")
+        return (
+            json.dumps({'success': False, 'message': 'An error occurred. Please try again later.'}),
+            500
+        )
+
+
+async def waitlist_asgi_app(scope, receive, send):
+    """
+    ASGI application for waitlist signups, the asyncio counterpart of waitlist_handler.
+    
+    Run with any ASGI server, e.g.:
+        uvicorn main:waitlist_asgi_app --workers 4
+    """
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if _pending_notifications:
+                    await asyncio.gather(*_pending_notifications, return_exceptions=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    if scope['type'] != 'http':
+        return
+    
+    request_headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope.get('headers', [])}
+    ip_address = request_headers.get('x-forwarded-for', 'unknown')
+    if ip_address == 'unknown' and scope.get('client'):
+        ip_address = scope['client'][0] or 'unknown'
+    
+    try:
+        body = await _read_body(receive)
+        payload, status, extra_headers = await handle_signup_async(scope['method'], body, ip_address)
+    except ValueError:
+        payload, status, extra_headers = (json.dumps({'success': False, 'message': 'Request body too large'}), 413, {})
+    
+    # script.js sends Idempotency-Key; it is not replayed here, but a
+    # repeated signup for the same email is already a no-op
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'POST, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type, Idempotency-Key',
+        'Content-Type': 'application/json'
+    }
+    headers.update(extra_headers)
+    encoded = payload.encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers.items()]
+                   + [(b'content-length', str(len(encoded)).encode('latin-1'))]
+    })
+    await send({'type': 'http.response.body', 'body': encoded})
@@ -0,0 +1,327 @@
+"""
+Retry policy for Firestore calls.
+Classifies errors as transient or permanent, retries transient ones with
+exponential backoff and full jitter inside the request's deadline, and can
+hedge idempotent reads: when a read has not answered after the recent p95
+latency, a duplicate is sent and whichever finishes first wins.
+
+Usage:
+    doc = with_retry(doc_ref.get, hedge=True, name='get_entry')
+    batch_result = with_retry(batch.commit)
+
+    @within_deadline()
+    def handler(request):
+        ...  # every with_retry call inside gives up by the deadline
+"""
+
+import os
+import time
+import random
+import asyncio
+import threading
+import functools
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from firestore_cost import count_reads
+
+
+# Attempts per call, including the first
+RETRY_MAX_ATTEMPTS = int(os.environ.get('FIRESTORE_RETRY_ATTEMPTS', '4'))
+
+# Backoff before retry n is uniform in [0, min(max, base * 2**n)]
+RETRY_BASE_DELAY_SECONDS = float(os.environ.get('FIRESTORE_RETRY_BASE_DELAY_SECONDS', '0.05'))
+RETRY_MAX_DELAY_SECONDS = float(os.environ.get('FIRESTORE_RETRY_MAX_DELAY_SECONDS', '1.0'))
+
+# Time budget per request (within_deadline) and for calls made outside one
+DEFAULT_DEADLINE_SECONDS = float(os.environ.get('FIRESTORE_DEADLINE_SECONDS', '8'))
+
+# Hedged reads are opt-in: each hedge is an extra billed read
+HEDGED_READS_ENABLED = os.environ.get('FIRESTORE_HEDGED_READS', '0') == '1'
+
+# Hedge delay used until enough latencies are recorded, and its floor
+HEDGE_DEFAULT_DELAY_SECONDS = float(os.environ.get('FIRESTORE_HEDGE_DELAY_SECONDS', '0.05'))
+HEDGE_MIN_DELAY_SECONDS = 0.005
+
+# Latencies kept per operation for the p95 estimate, and the minimum to trust it
+LATENCY_WINDOW = 256
+MIN_LATENCY_SAMPLES = 20
+
+# Threads running hedged reads; when all are busy reads run unhedged
+HEDGE_WORKERS = int(os.environ.get('FIRESTORE_HEDGE_WORKERS', '16'))
+
+# Transient errors by class name. google.api_core is optional here and the
+# in-memory stand-in raises the same names, so classes are matched by name
+# anywhere in the error's MRO. Everything else (NotFound, AlreadyExists,
+# InvalidArgument, PermissionDenied, ...) is permanent.
+RETRYABLE_ERROR_NAMES = frozenset({
+    'ServiceUnavailable',      # UNAVAILABLE / 503
+    'DeadlineExceeded',        # DEADLINE_EXCEEDED / 504 from the backend
+    'GatewayTimeout',
+    'BadGateway',
+    'InternalServerError',     # INTERNAL / 500
+    'TooManyRequests',         # 429
+    'ResourceExhausted',       # RESOURCE_EXHAUSTED: back off and retry
+    'Aborted',                 # ABORTED: contention, safe to retry
+})
+
+retry_stats = {'calls': 0, 'retries': 0, 'gave_up': 0, 'hedges': 0, 'hedge_wins': 0}
+_stats_lock = threading.Lock()
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('firestore_deadline', default=None)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True if an error is transient and the call may be repeated."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def backoff_delay(retry: int, rng: Optional[random.Random] = None) -> float:
+    """
+    Full-jitter backoff before a retry.
+
+    Args:
+        retry: 0 for the first retry, 1 for the second, ...
+        rng: Random source (defaults to the module's)
+
+    Returns:
+        Seconds to sleep
+    """
+    cap = min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * (2 ** retry))
+    return (rng or random).uniform(0, cap)
+
+
+@contextmanager
+def request_deadline(seconds: float):
+    """
+    Bound every retried call in this context to one overall deadline.
+
+    Nested deadlines never extend an outer one.
+    """
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def within_deadline(seconds: Optional[float] = None):
+    """
+    Decorator running a handler (sync or async) inside request_deadline.
+
+    Args:
+        seconds: Budget per request (defaults to DEFAULT_DEADLINE_SECONDS)
+    """
+    budget = DEFAULT_DEADLINE_SECONDS if seconds is None else seconds
+
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with request_deadline(budget):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with request_deadline(budget):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current request deadline, or None if none is set."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _count(key: str, amount: int = 1) -> None:
+    with _stats_lock:
+        retry_stats[key] += amount
+
+
+class LatencyTracker:
+    """Rolling window of one operation's latencies with a cached p95."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._p95: Optional[float] = None
+        self._since_update = 0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self._since_update += 1
+            # Re-sorting the window every 16 samples keeps record() cheap
+            if len(self._samples) >= MIN_LATENCY_SAMPLES and (self._p95 is None or self._since_update >= 16):
+                ordered = sorted(self._samples)
+                self._p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+                self._since_update = 0
+
+    def hedge_delay(self) -> float:
+        """How long to wait for the first request before sending a hedge."""
+        with self._lock:
+            p95 = self._p95
+        return HEDGE_DEFAULT_DELAY_SECONDS if p95 is None else max(p95, HEDGE_MIN_DELAY_SECONDS)
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_slots = threading.BoundedSemaphore(HEDGE_WORKERS)
+
+
+def latency_tracker(name: str) -> LatencyTracker:
+    """Shared tracker for an operation name."""
+    with _trackers_lock:
+        tracker = _trackers.get(name)
+        if tracker is None:
+            tracker = _trackers[name] = LatencyTracker()
+        return tracker
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    with _trackers_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS * 2, thread_name_prefix='firestore-hedge')
+        return _hedge_executor
+
+
+def _timed(fn: Callable[[], Any], tracker: LatencyTracker) -> Callable[[], Any]:
+    def run():
+        start = time.monotonic()
+        result = fn()
+        tracker.record(time.monotonic() - start)
+        return result
+    return run
+
+
+def _hedged_call(fn: Callable[[], Any], name: str, remaining: float) -> Any:
+    """
+    Run fn, sending one duplicate if it is slower than the recent p95.
+
+    The slower request is left to finish in the background; its result is
+    discarded. Falls back to a plain call when the hedge pool is busy.
+    """
+    tracker = latency_tracker(name)
+    if not _hedge_slots.acquire(blocking=False):
+        return _timed(fn, tracker)()
+    try:
+        executor = _executor()
+        delay = tracker.hedge_delay()
+        primary = executor.submit(_timed(fn, tracker))
+        done, _ = wait([primary], timeout=min(delay, max(remaining, 0)))
+        if done or remaining <= delay:
+            return primary.result()
+
+        _count('hedges')
+        # Hedges duplicate single-document gets, so each one is a billed read
+        count_reads(f"{name} (hedge)")
+        hedge = executor.submit(_timed(fn, tracker))
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        _count('hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error
+    finally:
+        _hedge_slots.release()
+
+
+def with_retry(fn: Callable[[], Any], hedge: bool = False, name: Optional[str] = None,
+               attempts: Optional[int] = None) -> Any:
+    """
+    Call fn, retrying transient errors with jittered exponential backoff.
+
+    Only wrap calls that are safe to repeat: reads, and writes whose repeat
+    is harmless or fails cleanly (create() raises AlreadyExists, so a batch
+    containing a create is never applied twice).
+
+    Args:
+        fn: Zero-argument callable making one Firestore request
+        hedge: Hedge the call (idempotent reads only; needs FIRESTORE_HEDGED_READS=1)
+        name: Operation name for hedge latency tracking (defaults to fn's name)
+        attempts: Maximum attempts, including the first (defaults to RETRY_MAX_ATTEMPTS)
+
+    Returns:
+        fn's result
+
+    Raises:
+        The last error, once it is permanent, attempts run out, or the
+        deadline leaves no time for another try
+    """
+    _count('calls')
+    deadline = _deadline.get()
+    if deadline is None:
+        deadline = time.monotonic() + DEFAULT_DEADLINE_SECONDS
+    hedge = hedge and HEDGED_READS_ENABLED
+    name = name or getattr(fn, '__qualname__', 'call')
+    attempts = attempts or RETRY_MAX_ATTEMPTS
+
+    for attempt in range(attempts):
+        try:
+            if hedge:
+                return _hedged_call(fn, name, deadline - time.monotonic())
+            return fn()
+        except Exception as e:
+            if not is_retryable(e) or attempt == attempts - 1:
+                if is_retryable(e):
+                    _count('gave_up')
+                raise
+            delay = backoff_delay(attempt)
+            if time.monotonic() + delay >= deadline:
+                _count('gave_up')
+                raise
+            _count('retries')
+            print(f"⚠ Transient Firestore error ({type(e).__name__}), retry {attempt + 1} in {delay * 1000:.0f} ms")
+            time.sleep(delay)
+
+
+async def with_retry_async(fn: Callable[[], Awaitable[Any]], attempts: Optional[int] = None) -> Any:
+    """
+    Async counterpart of with_retry (no hedging) for the AsyncClient.
+
+    Args:
+        fn: Zero-argument callable returning a fresh awaitable per attempt
+        attempts: Maximum attempts, including the first (defaults to RETRY_MAX_ATTEMPTS)
+
+    Returns:
+        The awaited result
+    """
+    _count('calls')
+    deadline = _deadline.get()
+    if deadline is None:
+        deadline = time.monotonic() + DEFAULT_DEADLINE_SECONDS
+    attempts = attempts or RETRY_MAX_ATTEMPTS
+
+    for attempt in range(attempts):
+        try:
+            return await fn()
+        except Exception as e:
+            if not is_retryable(e) or attempt == attempts - 1:
+                if is_retryable(e):
+                    _count('gave_up')
+                raise
+            delay = backoff_delay(attempt)
+            if time.monotonic() + delay >= deadline:
+                _count('gave_up')
+                raise
+            _count('retries')
+            print(f"⚠ Transient Firestore error ({type(e).__name__}), retry {attempt + 1} in {delay * 1000:.0f} ms")
+            await asyncio.sleep(delay)
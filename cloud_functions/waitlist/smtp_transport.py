@@ -0,0 +1,283 @@
+"""
+Pooled SMTP transport for outgoing email.
+Keeps authenticated connections to a relay open between sends, reconnects
+when the relay drops them, pipelines the envelope commands (RFC 2920) when
+the relay supports it, and spreads bulk sends across the pool.
+
+Enable it for send_email with EMAIL_TRANSPORT=smtp and the SMTP_* settings below.
+"""
+
+import io
+import copy
+import os
+import re
+import time
+import queue
+import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.generator import BytesGenerator
+from email.message import Message
+from email.utils import getaddresses
+from typing import List, Optional
+
+
+# Relay settings
+SMTP_HOST = os.environ.get('SMTP_HOST', '')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
+SMTP_USERNAME = os.environ.get('SMTP_USERNAME', '')
+SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD', '')
+
+# 'starttls' (port 587), 'ssl' (port 465) or 'none' (local relays)
+SMTP_SECURITY = os.environ.get('SMTP_SECURITY', 'starttls').lower()
+
+# Envelope and From: header sender
+SMTP_FROM = os.environ.get('SMTP_FROM', SMTP_USERNAME)
+
+# Connections kept open to the relay
+SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', '4'))
+
+SMTP_TIMEOUT_SECONDS = float(os.environ.get('SMTP_TIMEOUT_SECONDS', '10'))
+
+# Connections idle longer than this are checked with NOOP before reuse
+SMTP_IDLE_CHECK_SECONDS = float(os.environ.get('SMTP_IDLE_CHECK_SECONDS', '30'))
+
+# Errors that mean the connection is unusable and the send can be retried on a
+# new one (smtplib.SMTPException subclasses OSError, so catch it first when the
+# connection is still good)
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, OSError)
+
+
+def pipelined_send(smtp: smtplib.SMTP, message: Message, sender: str = '') -> None:
+    """
+    Send a message with the envelope commands pipelined (RFC 2920).
+
+    MAIL, every RCPT and DATA go out in one write and their replies are read
+    together, so a message costs two round trips instead of three plus one
+    per recipient. Raises the same smtplib exceptions as send_message.
+    """
+    from_addr = sender or getaddresses(message.get_all('From', []))[0][1]
+    recipients = [addr for _, addr in getaddresses(
+        message.get_all('To', []) + message.get_all('Cc', []) + message.get_all('Bcc', [])) if addr]
+    if not recipients:
+        raise smtplib.SMTPRecipientsRefused({})
+
+    # Flatten exactly as send_message does (Bcc stripped, CRLF line endings)
+    message = copy.copy(message)
+    del message['Bcc']
+    buffer = io.BytesIO()
+    BytesGenerator(buffer, policy=message.policy.clone(linesep='\r\n')).flatten(message)
+    data = re.sub(rb'(?m)^\.', b'..', buffer.getvalue())
+    if not data.endswith(b'\r\n'):
+        data += b'\r\n'
+
+    commands = [f"MAIL FROM:<{from_addr}>"] + [f"RCPT TO:<{addr}>" for addr in recipients] + ['DATA']
+    smtp.send(''.join(command + '\r\n' for command in commands))
+    replies = [smtp.getreply() for _ in commands]
+
+    mail_reply, rcpt_replies, data_reply = replies[0], replies[1:-1], replies[-1]
+    if mail_reply[0] != 250:
+        smtp.rset()
+        raise smtplib.SMTPSenderRefused(mail_reply[0], mail_reply[1], from_addr)
+    refused = {addr: reply for addr, reply in zip(recipients, rcpt_replies) if reply[0] not in (250, 251)}
+    if len(refused) == len(recipients):
+        smtp.rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+    if data_reply[0] != 354:
+        smtp.rset()
+        raise smtplib.SMTPDataError(data_reply[0], data_reply[1])
+
+    smtp.send(data + b'.\r\n')
+    code, response = smtp.getreply()
+    if code != 250:
+        smtp.rset()
+        raise smtplib.SMTPDataError(code, response)
+
+
+class _PooledConnection:
+    """An open SMTP connection and when it was last used."""
+
+    __slots__ = ('smtp', 'last_used')
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+
+
+class SMTPPoolTransport:
+    """
+    Email transport backed by a pool of persistent SMTP connections.
+
+    Connections are opened lazily, authenticated once and returned to the
+    pool after each message, so steady-state sends skip the TCP, TLS and
+    AUTH round trips. A send that fails because the connection dropped is
+    retried once on a fresh connection.
+    """
+
+    def __init__(self, host: str, port: int = 587, username: str = '', password: str = '',
+                 security: str = 'starttls', sender: str = '', pool_size: int = 4,
+                 timeout: float = 10.0, idle_check_seconds: float = 30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.security = security
+        self.sender = sender or username
+        self.pool_size = max(pool_size, 1)
+        self.timeout = timeout
+        self.idle_check_seconds = idle_check_seconds
+        self._idle: 'queue.LifoQueue[_PooledConnection]' = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional['SMTPPoolTransport']:
+        """Build a transport from the SMTP_* environment variables, or None if SMTP_HOST is unset."""
+        if not SMTP_HOST:
+            return None
+        return cls(SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_SECURITY,
+                   SMTP_FROM, SMTP_POOL_SIZE, SMTP_TIMEOUT_SECONDS, SMTP_IDLE_CHECK_SECONDS)
+
+    def _connect(self) -> _PooledConnection:
+        if self.security == 'ssl':
+            smtp: smtplib.SMTP = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.security == 'starttls':
+                smtp.starttls()
+                smtp.ehlo()
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._close(smtp)
+            raise
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    def _close(smtp: smtplib.SMTP) -> None:
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _acquire(self) -> _PooledConnection:
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - conn.last_used < self.idle_check_seconds:
+                    return conn
+                # Relays close idle connections; probe before reusing
+                try:
+                    if conn.smtp.noop()[0] == 250:
+                        return conn
+                except RECONNECT_ERRORS:
+                    pass
+                self._close(conn.smtp)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, conn: Optional[_PooledConnection]) -> None:
+        if conn is not None:
+            conn.last_used = time.monotonic()
+            self._idle.put(conn)
+        self._slots.release()
+
+    def _send_on(self, conn: _PooledConnection, message: Message) -> None:
+        if self.sender and 'From' not in message:
+            message['From'] = self.sender
+        if conn.smtp.has_extn('pipelining'):
+            pipelined_send(conn.smtp, message, self.sender)
+        else:
+            conn.smtp.send_message(message, from_addr=self.sender or None)
+
+    def send(self, message: Message) -> bool:
+        """
+        Send a MIME message (recipients are taken from its To/Cc/Bcc headers).
+
+        Args:
+            message: Message built by gmail_service.build_mime_message
+
+        Returns:
+            True if the relay accepted the message, False otherwise
+        """
+        for attempt in range(2):
+            try:
+                conn = self._acquire()
+            except Exception as e:
+                print(f"⚠ Error connecting to SMTP relay {self.host}:{self.port}: {e}")
+                return False
+            try:
+                self._send_on(conn, message)
+            except smtplib.SMTPRecipientsRefused as e:
+                # The connection is still good; the relay rejected the address
+                self._release(conn)
+                print(f"⚠ SMTP relay refused recipients: {e.recipients}")
+                return False
+            except smtplib.SMTPServerDisconnected as e:
+                self._close(conn.smtp)
+                self._release(None)
+                if attempt == 0:
+                    continue
+                print(f"⚠ Error sending email over SMTP: {e}")
+                return False
+            except smtplib.SMTPException as e:
+                # Reset the transaction so the connection can be reused
+                try:
+                    conn.smtp.rset()
+                    self._release(conn)
+                except RECONNECT_ERRORS:
+                    self._close(conn.smtp)
+                    self._release(None)
+                print(f"⚠ Error sending email over SMTP: {e}")
+                return False
+            except OSError as e:
+                # Socket error or timeout; the connection is unusable
+                self._close(conn.smtp)
+                self._release(None)
+                if attempt == 0:
+                    continue
+                print(f"⚠ Error sending email over SMTP: {e}")
+                return False
+            self._release(conn)
+            return True
+        return False
+
+    def send_many(self, messages: List[Message]) -> List[bool]:
+        """
+        Send many messages concurrently, one in-flight message per pooled connection.
+
+        Each connection streams its share of the messages back to back, so a
+        bulk send costs one connection setup per pool slot rather than per message.
+
+        Returns:
+            Per-message results in input order
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.pool_size,
+                                                    thread_name_prefix='smtp-pool')
+        return list(self._executor.map(self.send, messages))
+
+    def close(self) -> None:
+        """Close every idle connection and stop the send threads."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close(conn.smtp)
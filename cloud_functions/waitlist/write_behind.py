@@ -0,0 +1,253 @@
+"""
+Write-behind buffer for waitlist signups.
+Accepted signups are appended to a local spool file and held in memory, then
+written to Firestore in batches every WRITE_BEHIND_FLUSH_MS milliseconds or
+WRITE_BEHIND_MAX_ENTRIES entries, whichever comes first. Spooled entries that
+were not flushed (e.g. after a crash) are recovered when the buffer starts.
+
+Opt in with WRITE_BEHIND=1.
+"""
+
+import os
+import glob
+import json
+import atexit
+import signal
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Enables write-behind mode in waitlist_handler
+WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND', '').lower() in ('1', 'true', 'yes')
+
+# Flush at least this often while entries are pending
+WRITE_BEHIND_FLUSH_MS = int(os.environ.get('WRITE_BEHIND_FLUSH_MS', '200'))
+
+# Flush as soon as this many entries are pending
+WRITE_BEHIND_MAX_ENTRIES = int(os.environ.get('WRITE_BEHIND_MAX_ENTRIES', '100'))
+
+# Local spool; one process per path. On Cloud Functions /tmp is an in-memory
+# filesystem private to the instance, so it does not outlive the instance.
+WRITE_BEHIND_SPOOL_PATH = os.environ.get('WRITE_BEHIND_SPOOL_PATH', '/tmp/waitlist_spool.jsonl')
+
+
+class WriteBehindBuffer:
+    """
+    In-process signup buffer backed by an append-only spool file.
+
+    An entry stays pending (and visible to contains()) until the batch that
+    carries it commits. Each flush rotates the spool to a numbered segment
+    and deletes the segment only after the commit succeeds, so a crash at
+    any point leaves every uncommitted entry on disk. The flush function
+    must be idempotent (skip emails that already exist), because a segment
+    whose commit succeeded just before a crash is replayed on restart.
+    """
+
+    def __init__(self, flush_func: Callable[[List[Dict[str, Any]]], bool],
+                 spool_path: str = WRITE_BEHIND_SPOOL_PATH,
+                 flush_interval_ms: int = WRITE_BEHIND_FLUSH_MS,
+                 max_entries: int = WRITE_BEHIND_MAX_ENTRIES):
+        self.flush_func = flush_func
+        self.spool_path = spool_path
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_entries = max_entries
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._segments: List[str] = []
+        self._segment_seq = 0
+        self._spool = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def start(self) -> None:
+        """Recover spooled entries, start the flush thread and register shutdown hooks."""
+        with self._lock:
+            self._recover()
+            self._spool = open(self.spool_path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        _install_sigterm_flush(self)
+
+    def _recover(self) -> None:
+        segments = sorted(path for path in glob.glob(glob.escape(self.spool_path) + '.*')
+                          if path.rpartition('.')[2].isdigit())
+        if segments:
+            self._segment_seq = int(segments[-1].rpartition('.')[2])
+        # Re-home the main spool as a segment so new writes start clean
+        if os.path.exists(self.spool_path):
+            segment = self._next_segment_path()
+            os.replace(self.spool_path, segment)
+            segments.append(segment)
+
+        recovered = 0
+        for path in segments:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn final line from a crash mid-write
+                    self._pending.setdefault(entry['email'], entry)
+                    recovered += 1
+            self._segments.append(path)
+        if recovered:
+            print(f"✓ Recovered {recovered} spooled signups from {self.spool_path}*")
+
+    def _next_segment_path(self) -> str:
+        self._segment_seq += 1
+        return f"{self.spool_path}.{self._segment_seq:06d}"
+
+    def contains(self, email: str) -> bool:
+        """Check whether an email is waiting to be written."""
+        with self._lock:
+            return email in self._pending
+
+    def pending_count(self) -> int:
+        """Number of signups not yet written to Firestore."""
+        with self._lock:
+            return len(self._pending)
+
+    def add(self, email: str, ip: str = 'unknown', referral_code: Optional[str] = None) -> bool:
+        """
+        Accept a signup for a later batched write.
+
+        The entry is spooled before this returns, so an accepted signup
+        survives a crash of the process.
+
+        Args:
+            email: Normalized email address
+            ip: IP address of the signup
+            referral_code: Referral code the signup came with, if any
+
+        Returns:
+            True if accepted, False if the email is already pending
+        """
+        entry = {
+            'email': email,
+            'ip': ip,
+            'created_at': datetime.utcnow().isoformat()
+        }
+        if referral_code:
+            entry['referred_by'] = referral_code
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Write-behind buffer is closed')
+            if email in self._pending:
+                return False
+            self._spool.write(json.dumps(entry) + '\n')
+            self._spool.flush()
+            self._pending[email] = entry
+            if len(self._pending) == self.max_entries:
+                self._wakeup.notify()
+        return True
+
+    def flush(self) -> bool:
+        """
+        Write every pending entry now.
+
+        Returns:
+            True if the buffer was empty or the write succeeded
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return True
+                # Rotate the spool; entries added from here on go to a new file
+                if self._spool is not None:
+                    self._spool.close()
+                    segment = self._next_segment_path()
+                    os.replace(self.spool_path, segment)
+                    self._segments.append(segment)
+                    self._spool = None if self._closed else open(self.spool_path, 'a', encoding='utf-8')
+                batch = list(self._pending.values())
+                segments = list(self._segments)
+
+            try:
+                ok = self.flush_func(batch)
+            except Exception as e:
+                print(f"⚠ Error flushing write-behind buffer: {e}")
+                ok = False
+            if not ok:
+                # Entries stay pending and their segments stay on disk for the next flush
+                return False
+
+            with self._lock:
+                for entry in batch:
+                    if self._pending.get(entry['email']) is entry:
+                        del self._pending[entry['email']]
+                for segment in segments:
+                    self._segments.remove(segment)
+                    try:
+                        os.remove(segment)
+                    except OSError:
+                        pass
+            return True
+
+    def _run(self) -> None:
+        failures = 0
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                if failures:
+                    # Back off while Firestore is failing instead of retrying in a tight loop
+                    self._wakeup.wait(min(self.flush_interval * 2 ** failures, 30.0))
+                elif len(self._pending) < self.max_entries:
+                    self._wakeup.wait(self.flush_interval)
+                if self._closed:
+                    return
+            failures = 0 if self.flush() else failures + 1
+
+    def close(self) -> None:
+        """Stop the flush thread and write everything still pending."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if not self.flush():
+            print(f"⚠ {self.pending_count()} signups left in {self.spool_path}* for recovery on restart")
+        with self._lock:
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+
+
+def _install_sigterm_flush(buffer: WriteBehindBuffer) -> None:
+    """
+    Flush on SIGTERM (sent before an instance is shut down), then defer to the previous handler.
+
+    The signal can interrupt the main thread while it holds the buffer's
+    locks (inside add() or flush()), so the handler itself takes no locks.
+    It restores the previous handler and starts a thread that drains the
+    buffer once the interrupted code has released them, then re-sends
+    SIGTERM so the previous handler or default action runs as before.
+    """
+    try:
+        previous = signal.getsignal(signal.SIGTERM)
+    except ValueError:
+        return
+    if previous is None:
+        # Installed outside Python; the closest equivalent is the default action
+        previous = signal.SIG_DFL
+
+    def drain_and_resend():
+        buffer.close()
+        if previous != signal.SIG_IGN:
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    def handle_sigterm(signum, frame):
+        signal.signal(signal.SIGTERM, previous)
+        threading.Thread(target=drain_and_resend, name='write-behind-sigterm').start()
+
+    try:
+        signal.signal(signal.SIGTERM, handle_sigterm)
+    except ValueError:
+        # Not the main thread; rely on atexit
+        pass
@@ -53,6 +53,22 @@ document.querySelectorAll('.feature-card, .process-step, .pricing-card').forEach
     observer.observe(el);
 });
 
+// Referral code from a shared link (?ref=CODE), kept for the rest of the visit
+const REFERRAL_STORAGE_KEY = 'trinity-referral-code';
+const referralCode = (() => {
+    const fromUrl = new URLSearchParams(window.location.search).get('ref');
+    try {
+        if (fromUrl) {
+            sessionStorage.setItem(REFERRAL_STORAGE_KEY, fromUrl);
+            return fromUrl;
+        }
+        return sessionStorage.getItem(REFERRAL_STORAGE_KEY);
+    } catch (error) {
+        // Storage can be unavailable (private mode); the URL still works
+        return fromUrl;
+    }
+})();
+
 // CTA form handling
 const ctaForm = document.querySelector('.cta-form');
 if (ctaForm) {
@@ -60,6 +76,11 @@ if (ctaForm) {
     const input = form.querySelector('.cta-input');
     const button = form.querySelector('.btn-secondary-large') || form.querySelector('.btn-primary-large') || form.querySelector('button');
     
+    // Idempotency key for the current signup; reused when the same email is
+    // resubmitted after a failed or interrupted attempt so the server can
+    // replay its original response instead of processing the signup again
+    let pendingSignup = null;
+    
     if (button) {
         button.addEventListener('click', async (e) => {
             e.preventDefault();
@@ -72,6 +93,10 @@ if (ctaForm) {
             const email = input.value.trim();
             const originalButtonText = button.textContent;
             
+            if (!pendingSignup || pendingSignup.email !== email) {
+                pendingSignup = { email: email, key: generateIdempotencyKey() };
+            }
+            
             // Show loading state
             button.disabled = true;
             button.textContent = 'Joining...';
@@ -84,15 +109,24 @@ if (ctaForm) {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
+                        'Idempotency-Key': pendingSignup.key,
                     },
-                    body: JSON.stringify({ email: email })
+                    body: JSON.stringify(referralCode
+                        ? { email: email, referral_code: referralCode }
+                        : { email: email })
                 });
                 
                 const data = await response.json();
                 
                 if (data.success) {
-                    showFormMessage(data.message, 'success');
+                    if (data.referral_code) {
+                        const shareUrl = `${window.location.origin}${window.location.pathname}?ref=${encodeURIComponent(data.referral_code)}`;
+                        showFormMessage(`${data.message} Share your link to move up: ${shareUrl}`, 'success');
+                    } else {
+                        showFormMessage(data.message, 'success');
+                    }
                     input.value = '';
+                    pendingSignup = null;
                 } else {
                     showFormMessage(data.message || 'An error occurred. Please try again.', 'error');
                 }
@@ -118,6 +152,56 @@ if (ctaForm) {
     }
 }
 
+// Live waitlist count ("N people waiting")
+const waitlistCountEl = document.getElementById('waitlist-count');
+if (waitlistCountEl) {
+    const countUrl = window.WAITLIST_COUNT_URL || '/api/waitlist/count';
+    
+    fetch(countUrl)
+        .then((response) => (response.ok ? response.json() : null))
+        .then((data) => {
+            if (data && data.success && data.count > 0) {
+                const noun = data.count === 1 ? 'person' : 'people';
+                waitlistCountEl.textContent = `${data.count.toLocaleString()} ${noun} waiting`;
+                waitlistCountEl.hidden = false;
+            }
+        })
+        .catch(() => {
+            // Count is decorative; leave it hidden on failure
+        });
+}
+
+// Top referrers leaderboard
+const leaderboardEl = document.getElementById('referral-leaderboard');
+if (leaderboardEl) {
+    const leaderboardUrl = window.WAITLIST_LEADERBOARD_URL || '/api/waitlist/leaderboard';
+    
+    fetch(leaderboardUrl)
+        .then((response) => (response.ok ? response.json() : null))
+        .then((data) => {
+            if (data && data.success && data.leaderboard && data.leaderboard.length) {
+                data.leaderboard.forEach((entry) => {
+                    const item = document.createElement('li');
+                    const noun = entry.count === 1 ? 'referral' : 'referrals';
+                    item.textContent = `${entry.name} — ${entry.count.toLocaleString()} ${noun}`;
+                    leaderboardEl.appendChild(item);
+                });
+                leaderboardEl.hidden = false;
+            }
+        })
+        .catch(() => {
+            // Leaderboard is decorative; leave it hidden on failure
+        });
+}
+
+// Generate a random key identifying one signup attempt
+function generateIdempotencyKey() {
+    if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+        return window.crypto.randomUUID();
+    }
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+}
+
 // Show form message (success or error)
 function showFormMessage(message, type) {
     const ctaForm = document.querySelector('.cta-form');